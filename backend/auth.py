@@ -1,16 +1,23 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from models import User
 from config import settings
+from principal import Principal, user_cache
 
-# 密碼加密
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密碼加密（第一次雜湊或驗證密碼時才建立，匯入 auth 不載入 passlib 與 bcrypt）
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+    return _pwd_context
 
 # JWT 設定
 security = HTTPBearer()
@@ -20,14 +27,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     # bcrypt 限制密碼長度為 72 字節，需要截斷
     if len(plain_password.encode('utf-8')) > 72:
         plain_password = plain_password[:72]
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """生成密碼雜湊"""
     # bcrypt 限制密碼長度為 72 字節，需要截斷
     if len(password.encode('utf-8')) > 72:
         password = password[:72]
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """建立 JWT Token"""
@@ -38,45 +45,74 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
     to_encode.update({"exp": expire})
+    # python-jose 連帶載入 cryptography（約 0.1 秒），第一次簽發或驗證 Token 時才匯入
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """驗證 JWT Token"""
+def decode_token(token: str) -> Optional[dict]:
+    """解碼 JWT Token，失敗時回傳 None"""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def verify_token(token: str) -> Optional[str]:
+    """驗證 JWT Token"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload["sub"]
+
+def create_user_token(user: User) -> str:
+    """為使用者建立 JWT Token，claims 包含 ID 與公開資料供 stateless 模式使用"""
+    return create_access_token(data=Principal.from_user(user).to_claims())
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """取得當前使用者"""
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """取得當前使用者
+
+    stateless 模式直接由 Token claims 建立 Principal，不查詢資料庫；
+    database 模式查詢 users 表（可選擇經過短 TTL 的使用者快取）。
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        token = credentials.credentials
-        username = verify_token(token)
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_token(credentials.credentials)
+    if payload is None:
         raise credentials_exception
+    username = payload["sub"]
+    
+    if settings.auth_mode == "stateless":
+        principal = Principal.from_claims(payload)
+        if principal is not None:
+            return principal
+        # 舊版 Token 缺少 claims 時退回查詢資料庫
+    
+    if settings.user_cache_enabled:
+        principal = user_cache.get(username)
+        if principal is not None:
+            return principal
     
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = Principal.from_user(user)
+    if settings.user_cache_enabled:
+        user_cache.set(principal)
+    return principal
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """取得當前活躍使用者"""
     return current_user
@@ -0,0 +1,110 @@
+"""
+黑名單索引
+每位使用者的封鎖名單（blocked）與被誰封鎖（blocked_by）以 frozenset 快取在行程內，
+權限檢查改為集合查找，不需每次查詢 blacklists 表。
+封鎖、解除封鎖時同步更新雙向的快取項目；LRU 上限控制記憶體，短 TTL 讓多個 worker 間的變更最終一致。
+"""
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Blacklist
+
+# 大多數使用者沒有黑名單，共用同一個空集合以節省記憶體
+EMPTY = frozenset()
+
+
+class BlacklistIndex:
+    """以使用者 ID 為鍵的雙向黑名單快取（TTL + LRU）"""
+
+    def __init__(self, max_size: int = 100000, ttl_seconds: float = 30):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # (方向, user_id) -> (過期時間, frozenset)；方向為 "blocked" 或 "blocked_by"
+        self._entries = OrderedDict()
+        # 每次封鎖/解除封鎖遞增，載入期間若有變更則不寫入快取，避免存入過期的集合
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def blocked(self, db: AsyncSession, user_id: int) -> FrozenSet[int]:
+        """使用者封鎖的使用者 ID"""
+        return await self._get(db, "blocked", user_id)
+
+    async def blocked_by(self, db: AsyncSession, user_id: int) -> FrozenSet[int]:
+        """封鎖了該使用者的使用者 ID"""
+        return await self._get(db, "blocked_by", user_id)
+
+    async def is_blocked(self, db: AsyncSession, user_id: int, other_user_id: Optional[int]) -> bool:
+        """user_id 是否封鎖了 other_user_id"""
+        return other_user_id in await self.blocked(db, user_id)
+
+    async def _get(self, db: AsyncSession, direction: str, user_id: int) -> FrozenSet[int]:
+        key = (direction, user_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+
+        version = self._version
+        if direction == "blocked":
+            query = select(Blacklist.blocked_user_id).where(Blacklist.user_id == user_id)
+        else:
+            query = select(Blacklist.user_id).where(Blacklist.blocked_user_id == user_id)
+        ids = frozenset((await db.execute(query)).scalars().all()) or EMPTY
+
+        if version == self._version:
+            self._store(key, ids)
+        return ids
+
+    def _store(self, key, ids: FrozenSet[int]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, ids)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _update(self, key, change):
+        """就地更新已快取的集合；未快取時不載入，下次查詢再從資料庫取得"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = (entry[0], change(entry[1]) or EMPTY)
+
+    def on_block(self, user_id: int, blocked_user_id: int):
+        """封鎖成功（已 commit）後呼叫"""
+        self._version += 1
+        self._update(("blocked", user_id), lambda ids: ids | {blocked_user_id})
+        self._update(("blocked_by", blocked_user_id), lambda ids: ids | {user_id})
+
+    def on_unblock(self, user_id: int, blocked_user_id: int):
+        """解除封鎖成功（已 commit）後呼叫"""
+        self._version += 1
+        self._update(("blocked", user_id), lambda ids: ids - {blocked_user_id})
+        self._update(("blocked_by", blocked_user_id), lambda ids: ids - {user_id})
+
+    def clear(self):
+        self._version += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 全域黑名單索引
+blacklist_index = BlacklistIndex(
+    max_size=settings.blacklist_cache_max_size,
+    ttl_seconds=settings.blacklist_cache_ttl_seconds
+)
@@ -0,0 +1,161 @@
+"""
+批次寫入（按讚、黑名單）
+供匯入、同步資料的工具一次送出多筆：存在性、權限與重複檢查皆以集合查詢完成（每種檢查一次 IN 查詢），
+通過檢查的項目以單一多列 INSERT ... ON CONFLICT DO NOTHING 寫入，整批在同一個交易中完成。
+每一筆回傳各自的結果，單筆失敗不影響其他項目。
+"""
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from blacklist import blacklist_index
+from database import dialect_insert
+from jobs import enqueue, job_label
+from models import Post, Comment, Like, Blacklist, User, TargetType
+from schemas import LikeCreate
+from timeline import on_block_many
+
+# 每筆結果的狀態
+CREATED = "created"
+EXISTS = "exists"
+DUPLICATE = "duplicate"
+NOT_FOUND = "not_found"
+FORBIDDEN = "forbidden"
+INVALID = "invalid"
+
+
+def _result(index: int, status: str, detail: str = None, id: int = None, **fields) -> dict:
+    return {"index": index, "status": status, "id": id, "detail": detail, **fields}
+
+
+async def _like_targets(db: AsyncSession, items: List[LikeCreate]) -> Dict[Tuple[TargetType, int], int]:
+    """存在（且貼文未刪除）的按讚目標 -> 作者 ID；貼文與留言各一次 IN 查詢"""
+    owners = {}
+    post_ids = {item.target_id for item in items if item.target_type == TargetType.POST}
+    comment_ids = {item.target_id for item in items if item.target_type == TargetType.COMMENT}
+    if post_ids:
+        result = await db.execute(
+            select(Post.id, Post.user_id).where(Post.id.in_(post_ids), Post.deleted_at.is_(None))
+        )
+        owners.update({(TargetType.POST, row.id): row.user_id for row in result})
+    if comment_ids:
+        result = await db.execute(
+            select(Comment.id, Comment.user_id).join(Post, Post.id == Comment.post_id)
+            .where(Comment.id.in_(comment_ids), Post.deleted_at.is_(None))
+        )
+        owners.update({(TargetType.COMMENT, row.id): row.user_id for row in result})
+    return owners
+
+
+async def _liked_targets(db: AsyncSession, user_id: int, targets: Set[Tuple[TargetType, int]]):
+    """使用者已按讚的目標（一次查詢）"""
+    conditions = []
+    for target_type in TargetType:
+        ids = [target_id for kind, target_id in targets if kind == target_type]
+        if ids:
+            conditions.append(and_(Like.target_type == target_type, Like.target_id.in_(ids)))
+    if not conditions:
+        return set()
+    result = await db.execute(
+        select(Like.target_type, Like.target_id).where(Like.user_id == user_id, or_(*conditions))
+    )
+    return {(row.target_type, row.target_id) for row in result}
+
+
+async def bulk_create_likes(db: AsyncSession, user_id: int, items: List[LikeCreate]) -> List[dict]:
+    """批次按讚（不 commit）；按讚數以每種目標類型一個工作批次增加"""
+    owners = await _like_targets(db, items)
+    blocked = await blacklist_index.blocked(db, user_id)
+    liked = await _liked_targets(db, user_id, set(owners))
+
+    results, pending, seen = [], {}, set()
+    for index, item in enumerate(items):
+        key = (item.target_type, item.target_id)
+        fields = {"target_type": item.target_type, "target_id": item.target_id}
+        if key in seen:
+            results.append(_result(index, DUPLICATE, "同一批次中重複的目標", **fields))
+            continue
+        seen.add(key)
+        if key not in owners:
+            results.append(_result(index, NOT_FOUND, "目標不存在", **fields))
+        elif owners[key] in blocked:
+            results.append(_result(index, FORBIDDEN, "無權限對此內容按讚", **fields))
+        elif key in liked:
+            results.append(_result(index, EXISTS, "已經按過讚", **fields))
+        else:
+            results.append(None)
+            pending[key] = index
+
+    if pending:
+        # 並發寫入的重複按讚由唯一索引擋下，不回傳 ID 的項目視為已按讚
+        inserted = await db.execute(
+            dialect_insert(db, Like).values([
+                {"user_id": user_id, "target_type": target_type, "target_id": target_id}
+                for target_type, target_id in pending
+            ]).on_conflict_do_nothing(
+                index_elements=["user_id", "target_type", "target_id"]
+            ).returning(Like.id, Like.target_type, Like.target_id)
+        )
+        created = {(row.target_type, row.target_id): row.id for row in inserted}
+        for key, index in pending.items():
+            fields = {"target_type": key[0], "target_id": key[1]}
+            if key in created:
+                results[index] = _result(index, CREATED, id=created[key], **fields)
+            else:
+                results[index] = _result(index, EXISTS, "已經按過讚", **fields)
+
+        for target_type in TargetType:
+            target_ids = sorted(target_id for kind, target_id in created if kind == target_type)
+            if target_ids:
+                first_like_id = min(created[(target_type, target_id)] for target_id in target_ids)
+                await enqueue(
+                    db, "adjust_like_counts",
+                    {"target_type": target_type.value, "target_ids": target_ids, "delta": 1},
+                    label=job_label("like_counts", first_like_id, "add")
+                )
+    return results
+
+
+async def bulk_block_users(db: AsyncSession, user_id: int, blocked_user_ids: List[int]) -> Tuple[List[dict], List[int]]:
+    """批次加入黑名單（不 commit）；回傳每筆結果與新封鎖的使用者 ID（commit 後更新黑名單索引）"""
+    result = await db.execute(select(User.id).where(User.id.in_(set(blocked_user_ids))))
+    existing_users = set(result.scalars().all())
+    already = await blacklist_index.blocked(db, user_id)
+
+    results, pending, seen = [], {}, set()
+    for index, blocked_user_id in enumerate(blocked_user_ids):
+        fields = {"blocked_user_id": blocked_user_id}
+        if blocked_user_id in seen:
+            results.append(_result(index, DUPLICATE, "同一批次中重複的使用者", **fields))
+            continue
+        seen.add(blocked_user_id)
+        if blocked_user_id == user_id:
+            results.append(_result(index, INVALID, "不能將自己加入黑名單", **fields))
+        elif blocked_user_id not in existing_users:
+            results.append(_result(index, NOT_FOUND, "目標使用者不存在", **fields))
+        elif blocked_user_id in already:
+            results.append(_result(index, EXISTS, "該使用者已在黑名單中", **fields))
+        else:
+            results.append(None)
+            pending[blocked_user_id] = index
+
+    created = {}
+    if pending:
+        inserted = await db.execute(
+            dialect_insert(db, Blacklist).values([
+                {"user_id": user_id, "blocked_user_id": blocked_user_id} for blocked_user_id in pending
+            ]).on_conflict_do_nothing(
+                index_elements=["user_id", "blocked_user_id"]
+            ).returning(Blacklist.id, Blacklist.blocked_user_id)
+        )
+        created = {row.blocked_user_id: row.id for row in inserted}
+        for blocked_user_id, index in pending.items():
+            fields = {"blocked_user_id": blocked_user_id}
+            if blocked_user_id in created:
+                results[index] = _result(index, CREATED, id=created[blocked_user_id], **fields)
+            else:
+                results[index] = _result(index, EXISTS, "該使用者已在黑名單中", **fields)
+        if created:
+            await on_block_many(db, user_id, sorted(created))
+    return results, sorted(created)
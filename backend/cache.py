@@ -0,0 +1,381 @@
+"""
+共用快取層
+以 CacheBackend 介面抽象快取後端，依 CACHE_BACKEND 設定選用：
+  - none：不快取（預設）
+  - memory：行程內 LRU，適合單一 worker
+  - redis：Redis 協定後端，多個 uvicorn worker 共用（需安裝 redis 套件）
+  - local：LocalRedis 以記憶體模擬 Redis 指令，供測試與開發使用，走與 redis 相同的程式路徑
+每個項目可附帶標籤（tag），寫入時依標籤一次失效所有相關項目。
+
+失效時同時遞增標籤版本。從資料庫讀取後寫回快取（set_if_unchanged）前比對讀取前記下的版本，
+讀取期間有寫入 commit 並失效時不寫回，避免舊值覆蓋失效結果、直到 TTL 才更新。
+"""
+import itertools
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from config import settings
+
+
+class CacheBackend(ABC):
+    """快取後端介面；值為字串（已序列化的 JSON），統計命中率"""
+
+    name = "base"
+    enabled = True
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """依序回傳每個鍵的值，未命中為 None"""
+        if not keys:
+            return []
+        values = await self._get_many(keys)
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        return values
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_many([key]))[0]
+
+    async def invalidate_tags(self, *tags: str):
+        """移除帶有任一標籤的所有項目；先遞增標籤版本，再移除項目"""
+        self.invalidations += 1
+        await self._bump_tags(tags)
+        await self._invalidate_tags(tags)
+
+    async def set_if_unchanged(self, key: str, value: str, ttl: int, tags: Iterable[str], versions: List[int]) -> bool:
+        """寫回從資料庫讀取的值；versions 為讀取前以 tag_versions 取得的標籤版本
+
+        寫入前後各比對一次：期間標籤被失效則不寫入，或移除剛寫入的項目。回傳是否保留寫入的值。
+        """
+        tags = list(tags)
+        if await self.tag_versions(tags) != versions:
+            return False
+        await self.set(key, value, ttl, tags)
+        if await self.tag_versions(tags) != versions:
+            await self.delete(key)
+            return False
+        return True
+
+    @abstractmethod
+    async def tag_versions(self, tags: List[str]) -> List[int]:
+        """各標籤目前的版本（未失效過為 0）"""
+        ...
+
+    @abstractmethod
+    async def _bump_tags(self, tags: Iterable[str]):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def _get_many(self, keys: List[str]) -> List[Optional[str]]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int, tags: Iterable[str] = ()):
+        ...
+
+    @abstractmethod
+    async def _invalidate_tags(self, tags: Iterable[str]):
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "size": self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+class NullCache(CacheBackend):
+    """停用快取：一律未命中，不計入統計"""
+
+    name = "none"
+    enabled = False
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return [None] * len(keys)
+
+    async def _get_many(self, keys):
+        return [None] * len(keys)
+
+    async def set(self, key, value, ttl, tags=()):
+        pass
+
+    async def _invalidate_tags(self, tags):
+        pass
+
+    async def tag_versions(self, tags):
+        return [0] * len(tags)
+
+    async def _bump_tags(self, tags):
+        pass
+
+    async def delete(self, key):
+        pass
+
+    async def clear(self):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """行程內 TTL + LRU 快取"""
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__()
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (過期時間, 值, 標籤)
+        self._tags: Dict[str, set] = defaultdict(set)  # tag -> keys
+        # tag -> (版本, 過期時間)；版本取自全域遞增的計數，過期後視為 0 只會讓讀取前記下的版本不符
+        self._versions: OrderedDict = OrderedDict()
+        self._counter = itertools.count(1)
+
+    async def _get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            values.append(entry[1] if entry else None)
+        return values
+
+    async def set(self, key, value, ttl, tags=()):
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags[tag].add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    async def _invalidate_tags(self, tags):
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                if key in self._entries:
+                    self._remove(key)
+
+    async def tag_versions(self, tags):
+        now = time.monotonic()
+        versions = []
+        for tag in tags:
+            version = self._versions.get(tag)
+            versions.append(version[0] if version is not None and version[1] >= now else 0)
+        return versions
+
+    async def _bump_tags(self, tags):
+        # 保留兩倍 TTL：失效前開始的讀取寫回的項目一定比版本先過期
+        expires = time.monotonic() + 2 * settings.cache_ttl_seconds
+        for tag in tags:
+            self._versions.pop(tag, None)
+            self._versions[tag] = (next(self._counter), expires)
+        while self._versions and next(iter(self._versions.values()))[1] < time.monotonic():
+            self._versions.popitem(last=False)
+
+    async def delete(self, key):
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self._versions.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisCache(CacheBackend):
+    """Redis 協定後端
+
+    client 需提供 redis.asyncio.Redis 的指令子集：mget / set / sadd / expire / smembers / delete / incr / flushdb。
+    標籤以 Redis set 記錄其下的鍵，失效時刪除這些鍵與標籤本身；標籤版本以 INCR 計數，
+    保留兩倍 TTL（過期後視為 0，只會讓讀取前記下的版本不符而不寫回）。
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "social:"):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _version_key(self, tag: str) -> str:
+        return f"{self.prefix}version:{tag}"
+
+    async def _get_many(self, keys):
+        values = await self.client.mget([self.prefix + key for key in keys])
+        return [value.decode("utf-8") if isinstance(value, bytes) else value for value in values]
+
+    async def set(self, key, value, ttl, tags=()):
+        full_key = self.prefix + key
+        await self.client.set(full_key, value, ex=ttl)
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            await self.client.sadd(tag_key, full_key)
+            # 標籤存活時間與最後寫入的項目一致，過期的成員在失效時刪除也無副作用
+            await self.client.expire(tag_key, ttl)
+
+    async def _invalidate_tags(self, tags):
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = await self.client.smembers(tag_key)
+            await self.client.delete(*keys, tag_key)
+
+    async def tag_versions(self, tags):
+        if not tags:
+            return []
+        values = await self.client.mget([self._version_key(tag) for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    async def _bump_tags(self, tags):
+        for tag in tags:
+            version_key = self._version_key(tag)
+            await self.client.incr(version_key)
+            await self.client.expire(version_key, 2 * settings.cache_ttl_seconds)
+
+    async def delete(self, key):
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self):
+        await self.client.flushdb()
+
+
+class LocalRedis:
+    """以記憶體模擬 RedisCache 使用的 Redis 指令（類似 fakeredis），值以 bytes 回傳"""
+
+    def __init__(self):
+        self._data = {}  # key -> (過期時間或 None, 值)
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] < time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    async def mget(self, keys):
+        values = []
+        for key in keys:
+            entry = self._live(key)
+            values.append(entry[1] if entry and isinstance(entry[1], bytes) else None)
+        return values
+
+    async def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        self._data[key] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    async def incr(self, key):
+        entry = self._live(key)
+        value = int(entry[1]) + 1 if entry and isinstance(entry[1], bytes) else 1
+        self._data[key] = (entry[0] if entry else None, str(value).encode("utf-8"))
+        return value
+
+    async def sadd(self, key, *members):
+        entry = self._live(key)
+        current = entry[1] if entry and isinstance(entry[1], set) else set()
+        added = {member.encode("utf-8") if isinstance(member, str) else member for member in members}
+        self._data[key] = (entry[0] if entry else None, current | added)
+        return len(added - current)
+
+    async def expire(self, key, seconds):
+        entry = self._live(key)
+        if entry is None:
+            return False
+        self._data[key] = (time.monotonic() + seconds, entry[1])
+        return True
+
+    async def smembers(self, key):
+        entry = self._live(key)
+        return set(entry[1]) if entry and isinstance(entry[1], set) else set()
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            if self._live(key) is not None:
+                del self._data[key]
+                removed += 1
+        return removed
+
+    async def flushdb(self):
+        self._data.clear()
+        return True
+
+    def __len__(self):
+        return sum(self._live(key) is not None for key in list(self._data))
+
+
+def create_cache(backend: str, url: Optional[str] = None, max_size: int = 10000) -> CacheBackend:
+    """依設定建立快取後端"""
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return MemoryCache(max_size=max_size)
+    if backend == "local":
+        return RedisCache(LocalRedis())
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis 需要安裝 redis 套件：pip install redis")
+        return RedisCache(redis_asyncio.from_url(url or "redis://localhost:6379/0"))
+    raise ValueError(f"未知的快取後端: {backend}")
+
+
+_cache: Optional[CacheBackend] = None
+
+
+def get_cache() -> CacheBackend:
+    """取得全域快取後端（首次使用時依設定建立）"""
+    global _cache
+    if _cache is None:
+        _cache = create_cache(settings.cache_backend, settings.cache_url, settings.cache_max_size)
+    return _cache
+
+
+def set_cache(backend: Optional[CacheBackend]):
+    """替換全域快取後端（測試用）；None 代表下次依設定重新建立"""
+    global _cache
+    _cache = backend
@@ -0,0 +1,31 @@
+"""
+貼文串聯刪除
+刪除貼文時先寫入墓碑（posts.deleted_at）並移除時報項目，所有讀取立即視為不存在，API 不需等待刪除完成；
+留言與按讚再以批次刪除：每批依 ID 由大到小取出一批留言（回覆一定晚於父留言建立，子留言會先於父留言刪除），
+刪除這批留言上的按讚與留言本身，留言刪完後再刪除貼文的按讚與貼文。
+留言帶有 post_id，整棵留言樹以 (post_id, parent_id) 索引即可取得，不需遞迴查詢。
+"""
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Post, Comment, Like, TargetType
+from timeline import remove_post
+
+
+async def delete_comment_batch(db: AsyncSession, post_id: int, batch_size: int) -> int:
+    """刪除貼文的一批留言與其按讚（不 commit）；回傳刪除的留言數"""
+    result = await db.execute(
+        select(Comment.id).where(Comment.post_id == post_id).order_by(Comment.id.desc()).limit(batch_size)
+    )
+    comment_ids = list(result.scalars().all())
+    if comment_ids:
+        await db.execute(delete(Like).where(Like.target_type == TargetType.COMMENT, Like.target_id.in_(comment_ids)))
+        await db.execute(delete(Comment).where(Comment.id.in_(comment_ids)).execution_options(synchronize_session=False))
+    return len(comment_ids)
+
+
+async def delete_post_row(db: AsyncSession, post_id: int):
+    """留言刪完後刪除貼文的按讚、時報項目與貼文本身（不 commit）"""
+    await db.execute(delete(Like).where(Like.target_type == TargetType.POST, Like.target_id == post_id))
+    await remove_post(db, post_id)
+    await db.execute(delete(Post).where(Post.id == post_id))
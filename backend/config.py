@@ -4,12 +4,84 @@ from typing import Optional
 class Settings(BaseSettings):
     # 資料庫設定
     database_url: str = "sqlite:///./social_platform.db"
+    # 非同步驅動 URL（未設定時由 database_url 推導：aiosqlite / asyncpg）
+    async_database_url: Optional[str] = None
+    # SQLite 連線設定檔：default（SQLite 預設值）/ production（WAL、synchronous=NORMAL、busy_timeout 等 PRAGMA 與固定大小的連線池）
+    sqlite_profile: str = "default"
+    sqlite_busy_timeout_ms: int = 5000  # 等待其他連線釋放寫入鎖的時間，超過才回報 database is locked
+    sqlite_cache_size_kib: int = 65536  # 每個連線的頁面快取
+    sqlite_mmap_size: int = 268435456  # 以記憶體映射讀取資料庫檔案的上限（位元組）
+    # 唯讀副本：以逗號分隔的資料庫 URL（格式同 database_url），GET 請求輪流使用；未設定時全部使用主資料庫
+    read_replica_urls: str = ""
+    # 寫入後此秒數內，同一個用戶端（cookie）的讀取仍使用主資料庫，確保讀得到自己的寫入
+    read_your_writes_seconds: float = 5.0
+    # 連線池大小（PostgreSQL，以及 production 設定檔下的 SQLite 檔案資料庫）
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
     
     # JWT 設定
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # 認證模式：database（每次請求查詢使用者）/ stateless（由 JWT claims 建立使用者身分）
+    auth_mode: str = "database"
+    # database 模式下的使用者快取（短 TTL + LRU 上限）
+    user_cache_enabled: bool = False
+    user_cache_ttl_seconds: int = 30
+    user_cache_max_size: int = 10000
+    
+    # 黑名單索引（行程內快取每位使用者的封鎖 / 被封鎖集合）
+    blacklist_cache_max_size: int = 100000
+    blacklist_cache_ttl_seconds: int = 30
+    
+    # 共用快取：none / memory（行程內 LRU）/ redis（多 worker 共用）/ local（模擬 Redis，測試用）
+    cache_backend: str = "none"
+    cache_url: Optional[str] = None  # redis://host:6379/0
+    cache_ttl_seconds: int = 60
+    cache_max_size: int = 10000  # memory 後端的項目上限
+    
+    # 貼文列表：global（直接查詢 posts）/ timeline（讀取實體化的動態時報）
+    feed_mode: str = "global"
+    # 每個動態時報保留的項目上限，更舊的貼文讀取時從 posts 接續
+    timeline_max_entries: int = 500
+    # 作者近 24 小時發文數達此上限後不再推送到各時報，改在讀取時合併
+    timeline_fanout_max_daily_posts: int = 50
+    
+    # 寫入副作用（計數、快取失效、時報推送、串聯刪除）的執行方式：
+    # inline（在請求中同一交易執行）/ background（行程內 asyncio 佇列）/ worker（僅寫入 jobs 表，由 worker.py 處理）
+    jobs_mode: str = "inline"
+    jobs_workers: int = 4
+    jobs_max_attempts: int = 5
+    jobs_retry_base_seconds: float = 1.0  # 第 n 次重試延遲 base * 2^(n-1) 秒
+    jobs_poll_interval_seconds: float = 1.0  # 輪詢到期工作（重試、其他行程寫入）的間隔
+    jobs_lease_seconds: int = 300  # running 超過此時間視為中斷，由輪詢重新排入
+    jobs_shutdown_timeout_seconds: float = 30.0  # 停止佇列時等待執行中工作完成的上限
+    # 單一寫入者 group commit：建立貼文 / 留言 / 按讚交給一個寫入工作，每隔數毫秒合併為一個交易 commit
+    write_pipeline_enabled: bool = False
+    write_pipeline_max_batch: int = 256
+    write_pipeline_max_delay_ms: float = 2.0
+    # 按讚列表每頁筆數上限，以及 NDJSON 匯出每批查詢的筆數
+    likes_page_max_size: int = 200
+    likes_export_batch_size: int = 1000
+    # 快速序列化：貼文與留言列表直接序列化為 JSON（有安裝 orjson 時使用），略過 response_model 的重複驗證
+    fast_serialization: bool = False
+    # 串流回應（stream=true）每批從資料庫取出的筆數與每次送出的位元組數
+    stream_yield_per: int = 1000
+    stream_chunk_bytes: int = 65536
+    # 批次按讚 / 封鎖 API 每次請求的項目上限
+    bulk_max_items: int = 1000
+    # 刪除貼文時每批刪除的留言數（background / worker 模式每批為一個工作）
+    post_delete_batch_size: int = 500
+    
+    # 密碼雜湊設定
+    bcrypt_rounds: int = 12  # bcrypt cost factor，每 +1 運算時間約加倍
+    password_hash_executor: str = "thread"  # thread / process
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64  # 等待中的雜湊工作上限，超過時回傳 503
+    password_hash_retry_after: int = 1  # 503 回應的 Retry-After 秒數
+    
     # 應用程式設定
     app_name: str = "Social Platform API"
     debug: bool = True
@@ -0,0 +1,93 @@
+"""
+反正規化計數欄位維護
+posts.like_count / posts.top_level_comment_count / comments.like_count / comments.reply_count
+在寫入按讚、留言的同一個交易中以原子 UPDATE 增減，讀取時不需再 COUNT(*)；
+reconcile_counters 以批次 UPDATE 重新計算偏移的計數。
+計數變更不代表內容被編輯，UPDATE 一律保留 updated_at（不觸發 onupdate）。
+"""
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from models import Post, Comment, Like, TargetType
+from versions import bump_post_version, bump_comment_post_versions
+
+
+async def adjust_like_count(db: AsyncSession, target_type: TargetType, target_id: int, delta: int):
+    """增減貼文或留言的按讚數並遞增貼文版本（不 commit，由呼叫端控制交易）"""
+    await adjust_like_counts(db, target_type, [target_id], delta)
+
+
+async def adjust_like_counts(db: AsyncSession, target_type: TargetType, target_ids: List[int], delta: int):
+    """以一個 UPDATE 增減多個目標的按讚數，每個目標增減相同數量，並遞增所屬貼文的版本（不 commit）"""
+    model = Post if target_type == TargetType.POST else Comment
+    await db.execute(
+        update(model).where(model.id.in_(target_ids)).values(
+            like_count=model.like_count + delta, updated_at=model.updated_at
+        )
+    )
+    if target_type == TargetType.POST:
+        await bump_post_version(db, *target_ids)
+    else:
+        await bump_comment_post_versions(db, target_ids)
+
+
+async def adjust_comment_count(db: AsyncSession, post_id: int, parent_id: Optional[int], delta: int):
+    """增減父留言的回覆數，或貼文的頂層留言數，並遞增貼文版本（不 commit）"""
+    if parent_id is not None:
+        await db.execute(
+            update(Comment).where(Comment.id == parent_id).values(
+                reply_count=Comment.reply_count + delta, updated_at=Comment.updated_at
+            )
+        )
+    else:
+        await db.execute(
+            update(Post).where(Post.id == post_id).values(
+                top_level_comment_count=Post.top_level_comment_count + delta, updated_at=Post.updated_at
+            )
+        )
+    await bump_post_version(db, post_id)
+
+
+def reconcile_counters(db: Session) -> dict:
+    """重新計算所有計數欄位，只更新與實際數量不符的列
+
+    回傳每個欄位修正的列數。
+    """
+    post_likes = select(func.count(Like.id)).where(
+        Like.target_type == TargetType.POST,
+        Like.target_id == Post.id
+    ).scalar_subquery()
+    post_comments = select(func.count(Comment.id)).where(
+        Comment.post_id == Post.id,
+        Comment.parent_id.is_(None)
+    ).scalar_subquery()
+
+    comment_likes = select(func.count(Like.id)).where(
+        Like.target_type == TargetType.COMMENT,
+        Like.target_id == Comment.id
+    ).scalar_subquery()
+
+    # 自我參照需要別名區分外層留言與子查詢中的回覆
+    child = aliased(Comment)
+    comment_replies = select(func.count(child.id)).where(
+        child.parent_id == Comment.id
+    ).scalar_subquery()
+
+    fixed = {}
+    for key, model, column, actual in (
+        ("posts.like_count", Post, Post.like_count, post_likes),
+        ("posts.top_level_comment_count", Post, Post.top_level_comment_count, post_comments),
+        ("comments.like_count", Comment, Comment.like_count, comment_likes),
+        ("comments.reply_count", Comment, Comment.reply_count, comment_replies),
+    ):
+        result = db.execute(
+            update(model).where(column != actual).values({column.key: actual, "updated_at": model.updated_at}).execution_options(
+                synchronize_session=False
+            )
+        )
+        fixed[key] = result.rowcount
+    db.commit()
+    return fixed
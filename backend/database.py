@@ -1,27 +1,227 @@
-from sqlalchemy import create_engine, MetaData
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, MetaData
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
 
-# 建立資料庫引擎
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+
+def get_async_database_url(database_url: str) -> str:
+    """將同步資料庫 URL 轉為對應的非同步驅動（aiosqlite / asyncpg）"""
+    if database_url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + database_url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if database_url.startswith(prefix):
+            return "postgresql+asyncpg:" + database_url[len(prefix):]
+    return database_url
+
+
+def sqlite_pragmas(profile: str) -> List[Tuple[str, object]]:
+    """SQLite 設定檔對應的 PRAGMA，每個新連線建立時執行
+
+    production：
+    - journal_mode=WAL：讀取不阻塞寫入，寫入不阻塞讀取（設定寫入資料庫檔案，持續有效）
+    - synchronous=NORMAL：WAL 模式下只在 checkpoint 時 fsync，斷電最多遺失最後幾筆交易，不會損毀資料庫
+    - busy_timeout：寫入鎖被佔用時等待而非立即回報 database is locked
+    - cache_size / mmap_size / temp_store=MEMORY：減少讀取與排序暫存的磁碟 I/O
+    """
+    if profile == "default":
+        return []
+    if profile == "production":
+        return [
+            ("journal_mode", "WAL"),
+            ("synchronous", "NORMAL"),
+            ("busy_timeout", settings.sqlite_busy_timeout_ms),
+            ("cache_size", -settings.sqlite_cache_size_kib),
+            ("mmap_size", settings.sqlite_mmap_size),
+            ("temp_store", "MEMORY"),
+        ]
+    raise ValueError(f"未知的 SQLite 設定檔: {profile}")
+
+
+def _is_file_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _engine_options(url: str, profile: str, is_async: bool) -> dict:
+    """建立引擎的參數：SQLite 連線設定與連線池大小"""
+    backend = make_url(url).get_backend_name()
+    options = {}
+    if backend == "sqlite" and not is_async:
+        options["connect_args"] = {"check_same_thread": False}
+    if backend != "sqlite" or (profile == "production" and _is_file_sqlite(url)):
+        if backend == "sqlite" and is_async:
+            # aiosqlite 預設每次取用都開新連線（NullPool），重複使用連線才不必每次執行 PRAGMA
+            options["poolclass"] = AsyncAdaptedQueuePool
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+        )
+    return options
+
+
+def _apply_sqlite_pragmas(engine: Engine, pragmas: List[Tuple[str, object]]):
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_db_engine(url: str, profile: Optional[str] = None) -> Engine:
+    """建立同步引擎，SQLite 依設定檔（未指定時為 SQLITE_PROFILE）套用 PRAGMA 與連線池"""
+    profile = profile or settings.sqlite_profile
+    db_engine = create_engine(url, **_engine_options(url, profile, is_async=False))
+    if db_engine.dialect.name == "sqlite":
+        _apply_sqlite_pragmas(db_engine, sqlite_pragmas(profile))
+    return db_engine
+
+
+def create_async_db_engine(url: str, profile: Optional[str] = None) -> AsyncEngine:
+    """建立非同步引擎，設定檔同 create_db_engine"""
+    profile = profile or settings.sqlite_profile
+    db_engine = create_async_engine(url, **_engine_options(url, profile, is_async=True))
+    if db_engine.dialect.name == "sqlite":
+        _apply_sqlite_pragmas(db_engine.sync_engine, sqlite_pragmas(profile))
+    return db_engine
+
+
+# 建立資料庫引擎（同步，供 init_db.py、seed_data.py 等管理腳本使用）
+engine = create_db_engine(settings.database_url)
 
 # 建立 SessionLocal 類別
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 建立非同步資料庫引擎（供 API 路由使用，查詢不會阻塞事件迴圈）
+async_database_url = settings.async_database_url or get_async_database_url(settings.database_url)
+async_engine = create_async_db_engine(async_database_url)
+
+# 建立 AsyncSessionLocal 類別
+# expire_on_commit=False：commit 後仍可讀取屬性，不會在序列化時觸發隱式 I/O
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+def dialect_insert(db: AsyncSession, model):
+    """依連線的資料庫（PostgreSQL / SQLite）建立支援 ON CONFLICT 的 insert"""
+    insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    return insert(model)
+
 # 建立 Base 類別
 Base = declarative_base()
 
 # 建立 metadata
 metadata = MetaData()
 
-# 依賴注入：取得資料庫會話
-async def get_db():
-    db = SessionLocal()
+# 寫入後的讀取黏著期間（到期時間，UNIX 秒）記錄在 cookie，多個 worker 都能判斷
+READ_PRIMARY_COOKIE = "read_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReadRouter:
+    """讀寫分流：GET 請求輪流使用唯讀副本，寫入請求與寫入後的黏著期間使用主資料庫"""
+
+    def __init__(self):
+        self._replicas: List[async_sessionmaker] = []
+        self._next = 0
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._replicas)
+
+    async def configure(self, urls: List[str]):
+        """設定唯讀副本（同步資料庫 URL）；空列表代表停用"""
+        await self.dispose()
+        self._replicas = [
+            async_sessionmaker(
+                bind=create_async_db_engine(get_async_database_url(url)),
+                class_=AsyncSession,
+                autoflush=False,
+                expire_on_commit=False
+            )
+            for url in urls
+        ]
+
+    async def dispose(self):
+        for factory in self._replicas:
+            await factory.kw["bind"].dispose()
+        self._replicas = []
+
+    def sessionmaker_for(self, request: Request) -> async_sessionmaker:
+        if not self._replicas or request.method not in SAFE_METHODS:
+            return AsyncSessionLocal
+        try:
+            sticky = float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        if sticky:
+            self.primary_reads += 1
+            return AsyncSessionLocal
+        self.replica_reads += 1
+        factory = self._replicas[self._next % len(self._replicas)]
+        self._next += 1
+        return factory
+
+    def mark_write(self, request: Request, response: Response):
+        """寫入請求：設定黏著 cookie，之後一段時間內此用戶端的讀取使用主資料庫"""
+        if not self._replicas or request.method in SAFE_METHODS:
+            return
+        seconds = settings.read_your_writes_seconds
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, f"{time.time() + seconds:.3f}",
+            max_age=max(int(seconds), 1), httponly=True, samesite="lax"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self._replicas),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+        }
+
+
+# 全域讀寫路由（READ_REPLICA_URLS 於應用程式啟動時設定）
+read_router = ReadRouter()
+
+
+def is_primary(db: AsyncSession) -> bool:
+    """會話是否連到主資料庫（唯讀副本不可寫入）"""
+    return db.bind is async_engine
+
+
+def copy_sqlite_database(target_path: str):
+    """以 SQLite backup API 將主資料庫完整複製到 target_path（在本機模擬唯讀副本）"""
+    source_path = make_url(settings.database_url).database
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
     try:
-        yield db
+        source.backup(target)
     finally:
-        db.close()
+        target.close()
+        source.close()
+
+
+# 依賴注入：取得資料庫會話
+async def get_db(request: Request, response: Response):
+    """GET 請求在設定唯讀副本時使用副本（寫入後的黏著期間除外），其餘請求使用主資料庫"""
+    read_router.mark_write(request, response)
+    async with read_router.sessionmaker_for(request)() as db:
+        yield db
@@ -0,0 +1,268 @@
+"""
+貼文列表與留言樹組裝層
+先取出一頁貼文（或整篇貼文的留言），按讚數與留言數直接讀取反正規化計數欄位，
+再以一次查詢補齊當前使用者的按讚狀態，讓 SQL 次數固定，不隨資料筆數增加。
+留言可分頁載入：頂層留言以游標分頁，每層回覆以一次視窗函式查詢取出前幾則預覽，
+未展開的節點附上 reply_count 與 replies_cursor 供用戶端延遲載入。
+啟用共用快取時，貼文（不含 is_liked）以序列化後的 PostResponse 快取，寫入時依 post 標籤失效。
+"""
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from cache import get_cache
+from config import settings
+from models import Post, Comment, Like, TargetType
+from pagination import encode_cursor
+from schemas import PostResponse
+
+# 頂層留言：置頂優先，其次依建立時間；回覆只依建立時間
+TOP_LEVEL_ORDER = (Comment.is_top_comment.desc(), Comment.created_at.asc(), Comment.id.asc())
+REPLY_ORDER = (Comment.created_at.asc(), Comment.id.asc())
+
+
+async def liked_by(db: AsyncSession, user_id: int, target_type: TargetType, target_ids) -> Set[int]:
+    """一次取得使用者在多個目標中已按讚的 ID（target_ids 可為 ID 列表或子查詢）"""
+    if isinstance(target_ids, list) and not target_ids:
+        return set()
+    result = await db.execute(
+        select(Like.target_id).where(
+            Like.user_id == user_id,
+            Like.target_type == target_type,
+            Like.target_id.in_(target_ids)
+        )
+    )
+    return set(result.scalars().all())
+
+
+def serialize_post(post: Post, is_liked: bool) -> dict:
+    """將貼文轉為 PostResponse 所需的 dict（author 需已載入）"""
+    return {
+        "id": post.id,
+        "user_id": post.user_id,
+        "content": post.content,
+        "is_pinned": getattr(post, "is_pinned", False),
+        "created_at": post.created_at,
+        "updated_at": post.updated_at,
+        "author": post.author,
+        "likes_count": post.like_count,
+        "comments_count": post.top_level_comment_count,
+        "is_liked": is_liked,
+    }
+
+
+async def assemble_posts(db: AsyncSession, posts: List[Post], viewer_id: int) -> List[dict]:
+    """為一頁貼文補上 likes_count / comments_count / is_liked
+
+    不論貼文數量多少，只會發出一個按讚狀態查詢。
+    """
+    liked = await liked_by(db, viewer_id, TargetType.POST, [post.id for post in posts])
+    return [serialize_post(post, is_liked=post.id in liked) for post in posts]
+
+
+def post_cache_key(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def post_tag(post_id: int) -> str:
+    """貼文內容、計數或置頂狀態變更時失效的標籤"""
+    return f"post:{post_id}"
+
+
+async def load_posts(db: AsyncSession, post_ids: List[int]) -> Dict[int, dict]:
+    """依 ID 取得貼文（不含 is_liked），先查快取，未命中的以一次查詢載入並寫回快取"""
+    cache = get_cache()
+    cached = await cache.get_many([post_cache_key(post_id) for post_id in post_ids])
+    posts = {post_id: json.loads(value) for post_id, value in zip(post_ids, cached) if value is not None}
+
+    missing = [post_id for post_id in post_ids if post_id not in posts]
+    if missing:
+        # 讀取前記下標籤版本：讀取期間有寫入 commit 並失效的貼文不寫回快取
+        versions = await cache.tag_versions([post_tag(post_id) for post_id in missing])
+        version_of = dict(zip(missing, versions))
+        result = await db.execute(
+            select(Post).options(joinedload(Post.author)).where(Post.id.in_(missing), Post.deleted_at.is_(None))
+        )
+        for post in result.scalars().all():
+            posts[post.id] = serialize_post(post, is_liked=False)
+            if cache.enabled:
+                value = PostResponse.model_validate(posts[post.id]).model_dump_json(exclude={"is_liked"})
+                await cache.set_if_unchanged(post_cache_key(post.id), value, ttl=settings.cache_ttl_seconds,
+                                             tags=(post_tag(post.id),), versions=[version_of[post.id]])
+    return posts
+
+
+async def with_is_liked(db: AsyncSession, posts: List[dict], viewer_id: int) -> List[dict]:
+    """為 load_posts 取得的貼文補上當前使用者的 is_liked（一次查詢）"""
+    liked = await liked_by(db, viewer_id, TargetType.POST, [post["id"] for post in posts])
+    return [{**post, "is_liked": post["id"] in liked} for post in posts]
+
+
+async def assemble_cached_posts(db: AsyncSession, post_ids: List[int], viewer_id: int) -> List[dict]:
+    """依 ID 順序組裝貼文並補上 is_liked（不存在的 ID 略過）"""
+    posts = await load_posts(db, post_ids)
+    return await with_is_liked(db, [posts[post_id] for post_id in post_ids if post_id in posts], viewer_id)
+
+
+async def invalidate_post(*post_ids: int):
+    """貼文寫入（已 commit）後失效其快取"""
+    await get_cache().invalidate_tags(*(post_tag(post_id) for post_id in post_ids))
+
+
+def serialize_comment(comment: Comment, is_liked: bool) -> dict:
+    """將留言轉為 CommentResponse 所需的 dict（replies 由呼叫端填入）"""
+    return {
+        "id": comment.id,
+        "post_id": comment.post_id,
+        "user_id": comment.user_id,
+        "parent_id": comment.parent_id,
+        "content": comment.content,
+        "is_top_comment": comment.is_top_comment,
+        "created_at": comment.created_at,
+        "updated_at": comment.updated_at,
+        "author": comment.author,
+        "likes_count": comment.like_count,
+        "is_liked": is_liked,
+        "reply_count": comment.reply_count,
+        "replies_cursor": None,
+        "replies": [],
+    }
+
+
+def comment_stream_query(post_id: int):
+    """串流整篇貼文的留言（扁平陣列）：與留言樹相同排序，父留言一定先於其回覆輸出"""
+    return select(Comment).options(joinedload(Comment.author)).where(
+        Comment.post_id == post_id
+    ).order_by(*TOP_LEVEL_ORDER)
+
+
+async def assemble_comment_tree(db: AsyncSession, post_id: int, viewer_id: int) -> List[dict]:
+    """載入貼文的整棵留言樹
+
+    一次查詢取出貼文的所有留言（含按讚數），一次查詢取出當前使用者的按讚狀態，
+    再以 parent_id 索引在記憶體中 O(n) 建立樹狀結構。
+    """
+    result = await db.execute(
+        select(Comment).options(joinedload(Comment.author)).where(
+            Comment.post_id == post_id
+        ).order_by(Comment.is_top_comment.desc(), Comment.created_at.asc(), Comment.id.asc())
+    )
+    comments = result.scalars().all()
+
+    # 以子查詢限定範圍，避免數千則留言時 IN 參數過多
+    post_comment_ids = select(Comment.id).where(Comment.post_id == post_id)
+    liked = await liked_by(db, viewer_id, TargetType.COMMENT, post_comment_ids)
+
+    nodes = {}
+    children = defaultdict(list)
+    for comment in comments:
+        nodes[comment.id] = serialize_comment(comment, is_liked=comment.id in liked)
+        children[comment.parent_id].append(nodes[comment.id])
+
+    for comment_id, node in nodes.items():
+        node["replies"] = children.get(comment_id, [])
+
+    # 頂層留言（置頂優先，其次依建立時間）
+    return children.get(None, [])
+
+
+def comment_cursor_types(top_level: bool) -> tuple:
+    """頂層留言游標為 (is_top_comment, created_at, id)，回覆游標為 (created_at, id)"""
+    return (int, datetime, int) if top_level else (datetime, int)
+
+
+def comment_cursor(comment: Comment, top_level: bool) -> str:
+    if top_level:
+        return encode_cursor([bool(comment.is_top_comment), comment.created_at, comment.id])
+    return encode_cursor([comment.created_at, comment.id])
+
+
+def _after_cursor(after: list, top_level: bool):
+    """游標之後的條件；頂層排序混合 DESC/ASC，無法直接以單一 row value 比較"""
+    if not top_level:
+        return tuple_(Comment.created_at, Comment.id) > tuple(after)
+    is_top, created_at, comment_id = after
+    later = tuple_(Comment.created_at, Comment.id) > (created_at, comment_id)
+    if is_top:
+        # 置頂留言之後：其餘置頂留言，以及所有一般留言
+        return or_(Comment.is_top_comment == False, and_(Comment.is_top_comment == True, later))
+    return and_(Comment.is_top_comment == False, later)
+
+
+async def _load_replies(db: AsyncSession, parent_ids: List[int], per_parent: Optional[int]) -> List[Comment]:
+    """一次查詢取出多個父留言的回覆，per_parent 限制每個父留言最多幾則（None 為全部）"""
+    if not parent_ids or per_parent == 0:
+        return []
+    query = select(Comment).where(Comment.parent_id.in_(parent_ids))
+    if per_parent is not None:
+        # 以 ROW_NUMBER 在資料庫端取每個父留言的前 N 則，不需逐一查詢
+        ranked = select(
+            Comment.id,
+            func.row_number().over(partition_by=Comment.parent_id, order_by=REPLY_ORDER).label("position")
+        ).where(Comment.parent_id.in_(parent_ids)).subquery()
+        query = query.join(ranked, ranked.c.id == Comment.id).where(ranked.c.position <= per_parent)
+    result = await db.execute(
+        query.options(joinedload(Comment.author)).order_by(Comment.parent_id, *REPLY_ORDER)
+    )
+    return list(result.scalars().all())
+
+
+async def assemble_comment_page(
+    db: AsyncSession,
+    post_id: int,
+    viewer_id: int,
+    parent_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    after: Optional[list] = None,
+    max_depth: Optional[int] = None,
+    reply_preview: Optional[int] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """載入一頁留言（parent_id 為 None 時為頂層留言，否則為該留言的回覆）
+
+    每頁最多 limit 則，往下展開至 max_depth 層（本頁為第 1 層），每個節點最多預覽 reply_preview 則回覆。
+    查詢次數為 1（本頁）+ 展開層數 + 1（按讚狀態），與留言總數無關。
+    回傳 (節點列表, 下一頁游標)。
+    """
+    top_level = parent_id is None
+    query = select(Comment).options(joinedload(Comment.author)).where(
+        Comment.post_id == post_id,
+        Comment.parent_id.is_(None) if top_level else Comment.parent_id == parent_id
+    ).order_by(*(TOP_LEVEL_ORDER if top_level else REPLY_ORDER))
+    if after is not None:
+        query = query.where(_after_cursor(after, top_level))
+    if limit is not None:
+        # 多取一筆判斷是否還有下一頁
+        query = query.limit(limit + 1)
+    page = list((await db.execute(query)).scalars().all())
+
+    next_cursor = None
+    if limit is not None and len(page) > limit:
+        page = page[:limit]
+        next_cursor = comment_cursor(page[-1], top_level)
+
+    # 逐層展開：每層一次查詢，只展開仍有回覆的節點
+    loaded = list(page)
+    frontier, depth = page, 1
+    while frontier and (max_depth is None or depth < max_depth):
+        frontier = await _load_replies(db, [c.id for c in frontier if c.reply_count], reply_preview)
+        loaded.extend(frontier)
+        depth += 1
+
+    liked = await liked_by(db, viewer_id, TargetType.COMMENT, [c.id for c in loaded])
+    nodes = {c.id: serialize_comment(c, is_liked=c.id in liked) for c in loaded}
+    for comment in loaded:
+        if comment.parent_id in nodes:
+            nodes[comment.parent_id]["replies"].append(nodes[comment.id])
+
+    # 未完整載入回覆的節點：replies_cursor 接續最後一則已載入的回覆，未展開時為空字串（從頭載入）
+    for node in nodes.values():
+        replies = node["replies"]
+        if len(replies) < node["reply_count"]:
+            node["replies_cursor"] = encode_cursor([replies[-1]["created_at"], replies[-1]["id"]]) if replies else ""
+
+    return [nodes[c.id] for c in page], next_cursor
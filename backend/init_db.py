@@ -4,10 +4,15 @@
 用於建立資料庫表和初始資料
 """
 import asyncio
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-from database import engine, SessionLocal, Base
+from database import engine, SessionLocal, Base, copy_sqlite_database
 from models import User
 from auth import get_password_hash
+from counters import reconcile_counters
+from timeline import reset_timelines
+from jobs import purge_finished_jobs
+from migrations import run_migrations, applied_versions, head_version
 
 def init_database():
     """初始化資料庫"""
@@ -15,7 +20,7 @@ def init_database():
     
     # 建立所有資料表
     print("📋 建立資料表...")
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print("✅ 資料表建立完成")
     
     # 建立資料庫會話
@@ -83,7 +88,7 @@ def init_with_seed():
     
     # 建立所有資料表
     print("📋 建立資料表...")
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print("✅ 資料表建立完成")
     
     # 匯入並執行種子資料腳本
@@ -109,11 +114,80 @@ def reset_database():
     print("✅ 資料表已刪除")
     
     print("🔄 重新建立資料表...")
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     print("✅ 資料表重新建立完成")
     
     print("🎉 資料庫重置完成！")
 
+def migrate_database():
+    """套用尚未套用的結構遷移（部署時執行一次，API 行程啟動時不變更結構）"""
+    print("🛠️  檢查資料庫結構版本...")
+    try:
+        applied = run_migrations(engine)
+        if applied:
+            print(f"✅ 已套用遷移 {applied}，目前版本 {head_version()}")
+        else:
+            print(f"ℹ️  資料庫已是最新版本 {head_version()}")
+    except Exception as e:
+        print(f"❌ 執行遷移時發生錯誤: {e}")
+        raise SystemExit(1)
+
+def show_migration_status():
+    """顯示已套用的遷移版本"""
+    applied = applied_versions(engine) if inspect(engine).has_table("schema_migrations") else []
+    print(f"📊 目前結構版本: {max(applied, default=0)}（程式需要 {head_version()}）")
+    print(f"  已套用: {applied}")
+
+def reconcile_database_counters():
+    """重新計算反正規化計數欄位（按讚數、留言數、回覆數）"""
+    print("🔢 重新計算計數欄位...")
+    db = SessionLocal()
+    try:
+        fixed = reconcile_counters(db)
+        for column, rows in fixed.items():
+            print(f"  {column}: 修正 {rows} 筆")
+        print("✅ 計數欄位已與實際資料一致")
+    except Exception as e:
+        print(f"❌ 重新計算計數時發生錯誤: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def reset_user_timelines():
+    """清除所有動態時報，使用者下次讀取貼文列表時重建（在 API 之外匯入貼文後執行）"""
+    print("🗂️  清除動態時報...")
+    db = SessionLocal()
+    try:
+        cleared = reset_timelines(db)
+        print(f"✅ 已清除 {cleared} 份動態時報，將於下次讀取時重建")
+    except Exception as e:
+        print(f"❌ 清除動態時報時發生錯誤: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def purge_jobs(older_than_days: int = 7):
+    """刪除已完成超過保留天數的背景工作"""
+    print("🧹 清理已完成的背景工作...")
+    db = SessionLocal()
+    try:
+        purged = purge_finished_jobs(db, older_than_days)
+        print(f"✅ 已刪除 {purged} 個完成超過 {older_than_days} 天的工作")
+    except Exception as e:
+        print(f"❌ 清理背景工作時發生錯誤: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def copy_replica(target_path: str):
+    """將 SQLite 主資料庫複製為唯讀副本（本機模擬複寫，重新執行即同步到最新）"""
+    print(f"📋 複製資料庫到 {target_path}...")
+    try:
+        copy_sqlite_database(target_path)
+        print(f"✅ 已複製，設定 READ_REPLICA_URLS=sqlite:///{target_path} 後 GET 請求將讀取此副本")
+    except Exception as e:
+        print(f"❌ 複製資料庫時發生錯誤: {e}")
+
 def show_database_info():
     """顯示資料庫資訊"""
     print("📊 資料庫資訊:")
@@ -136,9 +210,21 @@ if __name__ == "__main__":
             reset_database()
         elif command == "info":
             show_database_info()
+        elif command == "migrate":
+            migrate_database()
+        elif command == "migrate-status":
+            show_migration_status()
+        elif command == "reconcile":
+            reconcile_database_counters()
+        elif command == "reset-timelines":
+            reset_user_timelines()
+        elif command == "purge-jobs":
+            purge_jobs(int(sys.argv[2]) if len(sys.argv) > 2 else 7)
+        elif command == "copy-replica":
+            copy_replica(sys.argv[2] if len(sys.argv) > 2 else "./social_platform_replica.db")
         else:
             print("❌ 未知命令")
-            print("可用命令: init, seed, reset, info")
+            print("可用命令: init, seed, reset, info, migrate, migrate-status, reconcile, reset-timelines, purge-jobs, copy-replica")
     else:
         print("🔧 資料庫管理工具")
         print("\n可用命令:")
@@ -146,6 +232,12 @@ if __name__ == "__main__":
         print("  python init_db.py seed   - 初始化資料庫並建立種子資料")
         print("  python init_db.py reset  - 重置資料庫")
         print("  python init_db.py info   - 顯示資料庫資訊")
+        print("  python init_db.py migrate - 套用資料庫結構遷移（部署時執行，升級舊資料庫）")
+        print("  python init_db.py migrate-status - 顯示資料庫結構版本")
+        print("  python init_db.py reconcile - 重新計算按讚數與留言數計數")
+        print("  python init_db.py reset-timelines - 清除動態時報（下次讀取時重建）")
+        print("  python init_db.py purge-jobs [天數] - 刪除已完成超過天數（預設 7）的背景工作")
+        print("  python init_db.py copy-replica [路徑] - 將資料庫複製為唯讀副本（本機模擬讀寫分流）")
         print("\n範例:")
         print("  python init_db.py init   # 基本初始化")
         print("  python init_db.py seed   # 完整初始化（推薦）")
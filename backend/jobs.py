@@ -0,0 +1,366 @@
+"""
+寫入副作用的工作佇列
+請求只負責主要寫入，計數維護、快取失效、時報推送、串聯刪除等副作用以工作（job）表示：
+
+- inline：在請求的同一個交易中直接執行（預設，行為與同步寫入相同）
+- background：工作寫入 jobs 表（與主要寫入同一交易），commit 後交給行程內的 asyncio 佇列執行
+- worker：只寫入 jobs 表，由獨立的 worker 行程（python worker.py）輪詢執行，可開多個行程
+
+每個工作的資料庫副作用與「標記完成」在同一個交易中 commit，失敗時回滾並以指數退避重試；
+標記完成以取得工作時的 attempts 為條件，租約逾時被重新取得的工作不會被套用兩次。
+快取失效等非資料庫動作以 after_commit 登記，於 commit 後執行。
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import settings
+from cascade import delete_comment_batch, delete_post_row
+from counters import adjust_like_count, adjust_like_counts, adjust_comment_count
+from database import AsyncSessionLocal
+from feed import invalidate_post
+from models import Post, Job, TargetType
+from timeline import fan_out, is_high_volume, remove_post
+
+HANDLERS: Dict[str, Callable[..., Awaitable[None]]] = {}
+
+
+def job_handler(kind: str):
+    """註冊工作類型；處理函式在傳入的會話中執行，不自行 commit"""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def after_commit(db: AsyncSession, fn: Callable[..., Awaitable[None]], *args):
+    """登記交易 commit 後才執行的動作（例如快取失效）"""
+    db.info.setdefault("after_commit", []).append((fn, args))
+
+
+async def run_after_commit(db: AsyncSession):
+    for fn, args in db.info.pop("after_commit", []):
+        try:
+            await fn(*args)
+        except Exception as e:
+            print(f"⚠️  commit 後動作失敗 {fn.__name__}{args}: {e}")
+
+
+def job_label(*parts) -> str:
+    """組成工作的可讀標籤（例如 like_count:3:add）
+
+    標籤不唯一也不用於去重：SQLite 會重新使用刪除後的最大 rowid，相同標籤可能屬於不同的寫入。
+    """
+    return ":".join(str(part) for part in parts)
+
+
+async def enqueue(db: AsyncSession, kind: str, payload: dict, label: Optional[str] = None):
+    """建立工作（不 commit）；inline 模式直接在目前的交易中執行"""
+    if settings.jobs_mode == "inline":
+        await HANDLERS[kind](db, **payload)
+        return
+
+    result = await db.execute(
+        insert(Job).values(
+            kind=kind,
+            payload=json.dumps(payload),
+            label=label,
+            status="pending",
+            attempts=0,
+            run_after=utcnow(),
+        ).returning(Job.id)
+    )
+    db.info.setdefault("enqueued_jobs", []).append(result.scalar_one())
+
+
+async def dispatch(db: AsyncSession):
+    """主要寫入 commit 後呼叫：執行 commit 後動作，background 模式將新工作交給佇列"""
+    await run_after_commit(db)
+    job_ids = db.info.pop("enqueued_jobs", [])
+    if settings.jobs_mode == "background":
+        job_queue.notify(job_ids)
+
+
+async def run_job(job_id: int) -> Optional[bool]:
+    """執行一個工作；回傳 True 成功、False 失敗（已排定重試或放棄）、None 未取得（他人處理中或未到期）"""
+    async with AsyncSessionLocal() as db:
+        # 以條件式 UPDATE 取得工作，多個 worker 行程同時執行也只有一個會成功
+        claimed = await db.execute(
+            update(Job).where(
+                Job.id == job_id, Job.status == "pending", Job.run_after <= utcnow()
+            ).values(status="running", attempts=Job.attempts + 1)
+        )
+        await db.commit()
+        if claimed.rowcount != 1:
+            return None
+
+        job = await db.get(Job, job_id)
+        kind, attempts = job.kind, job.attempts
+        # 之後的狀態更新都以本次取得為條件：執行超過租約時工作會被重新排入並由其他 worker 取得
+        claim = (Job.id == job_id, Job.status == "running", Job.attempts == attempts)
+        try:
+            await HANDLERS[kind](db, **json.loads(job.payload))
+            done = await db.execute(
+                update(Job).where(*claim).values(status="done", last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+            if done.rowcount != 1:
+                # 已被其他 worker 重新取得：回滾本次的副作用，由持有者完成
+                await db.rollback()
+                db.info.pop("after_commit", None)
+                print(f"⚠️  工作 {kind}#{job_id} 已被重新取得，捨棄本次執行結果")
+                return None
+            await db.commit()
+        except asyncio.CancelledError:
+            # 停止佇列時逾時被取消：放回待處理，不計入嘗試次數，避免停留在 running 直到租約到期
+            await db.rollback()
+            db.info.pop("after_commit", None)
+            await db.execute(update(Job).where(*claim).values(status="pending", attempts=attempts - 1))
+            await db.commit()
+            raise
+        except Exception as e:
+            await db.rollback()
+            db.info.pop("after_commit", None)
+            values = {"last_error": f"{type(e).__name__}: {e}"}
+            if attempts >= settings.jobs_max_attempts:
+                values["status"] = "failed"
+                print(f"❌ 工作 {kind}#{job_id} 已失敗 {attempts} 次，放棄重試: {e}")
+            else:
+                values["status"] = "pending"
+                values["run_after"] = utcnow() + timedelta(
+                    seconds=settings.jobs_retry_base_seconds * 2 ** (attempts - 1)
+                )
+            await db.execute(update(Job).where(*claim).values(**values))
+            await db.commit()
+            return False
+
+        await dispatch(db)
+        return True
+
+
+async def due_job_ids(limit: int = 100) -> List[int]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Job.id).where(Job.status == "pending", Job.run_after <= utcnow()).order_by(Job.id).limit(limit)
+        )
+        return list(result.scalars().all())
+
+
+async def requeue_stale_jobs() -> int:
+    """將中斷（running 超過租約時間）的工作重新排入（啟動時與輪詢時定期執行）"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job).where(
+                Job.status == "running",
+                Job.updated_at < utcnow() - timedelta(seconds=settings.jobs_lease_seconds)
+            ).values(status="pending")
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def job_depth() -> Dict[str, int]:
+    """jobs 表中各狀態的工作數"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Job.status, func.count(Job.id)).group_by(Job.status))
+        return dict(result.all())
+
+
+def purge_finished_jobs(db: Session, older_than_days: int = 7) -> int:
+    """刪除已完成且超過保留天數的工作"""
+    result = db.execute(delete(Job).where(
+        Job.status == "done",
+        Job.updated_at < utcnow() - timedelta(days=older_than_days)
+    ))
+    db.commit()
+    return result.rowcount
+
+
+class JobQueue:
+    """行程內的 asyncio 工作佇列：新工作由 notify 直接排入，重試與其他行程寫入的工作由輪詢取得
+
+    輪詢也定期將超過租約仍為 running 的工作（執行中的行程被終止）重新排入。
+    """
+
+    def __init__(self, workers: int = 4, poll_interval: float = 1.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        # 租約以秒計，不需每次輪詢都檢查
+        self.requeue_interval = max(poll_interval, settings.jobs_lease_seconds / 5)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._poller_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        await self._requeue_stale()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._poller_task = asyncio.create_task(self._poller())
+        self._tasks.append(self._poller_task)
+
+    async def stop(self, timeout: Optional[float] = None):
+        """停止輪詢與取出新工作，等待執行中的工作完成（最多 timeout 秒）後取消
+
+        尚未開始的工作仍為 pending，由下次啟動或其他行程執行；逾時被取消的工作由 run_job 放回 pending。
+        """
+        timeout = settings.jobs_shutdown_timeout_seconds if timeout is None else timeout
+        self._stopping = True
+        if self._poller_task is not None:
+            self._poller_task.cancel()
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self.in_flight and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.05)
+        if self.in_flight:
+            print(f"⚠️  停止工作佇列逾時，取消 {self.in_flight} 個執行中的工作")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._poller_task = None
+
+    def notify(self, job_ids: Iterable[int]):
+        if self._queue is None:
+            return
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+
+    async def drain(self):
+        """等待目前已排入與到期的工作全部處理完（測試與關閉前使用）"""
+        while True:
+            self.notify(await due_job_ids())
+            await self._queue.join()
+            if not await due_job_ids(limit=1):
+                return
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            if self._stopping:
+                self._queue.task_done()
+                continue
+            self.in_flight += 1
+            try:
+                result = await run_job(job_id)
+                if result is True:
+                    self.processed += 1
+                elif result is False:
+                    self.failed += 1
+            except Exception as e:
+                print(f"⚠️  執行工作 #{job_id} 時發生錯誤: {e}")
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    async def _requeue_stale(self):
+        requeued = await requeue_stale_jobs()
+        if requeued:
+            print(f"🔁 已重新排入 {requeued} 個中斷的工作")
+
+    async def _poller(self):
+        loop = asyncio.get_running_loop()
+        next_requeue = loop.time() + self.requeue_interval
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if loop.time() >= next_requeue:
+                    next_requeue = loop.time() + self.requeue_interval
+                    await self._requeue_stale()
+                if self._queue.qsize() == 0:
+                    self.notify(await due_job_ids())
+            except Exception as e:
+                print(f"⚠️  輪詢工作失敗: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "mode": settings.jobs_mode,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+# 全域工作佇列（background 模式由應用程式啟動，worker 模式由 worker.py 啟動）
+job_queue = JobQueue(workers=settings.jobs_workers, poll_interval=settings.jobs_poll_interval_seconds)
+
+
+# 工作類型
+@job_handler("fan_out_post")
+async def _fan_out_post(db: AsyncSession, post_id: int):
+    """推送貼文到動態時報；高發文量作者改為讀取時合併"""
+    post = await db.get(Post, post_id)
+    if post is None or post.deleted_at is not None:
+        return
+    if await is_high_volume(db, post.user_id, before_post_id=post.id):
+        # 內部旗標，不應更新貼文的 updated_at
+        await db.execute(
+            update(Post).where(Post.id == post_id).values(fanned_out=False, updated_at=Post.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        # 工作延遲執行期間新建立的時報可能已回填此貼文
+        await remove_post(db, post_id)
+    else:
+        await fan_out(db, post)
+    after_commit(db, invalidate_post, post_id)
+
+
+@job_handler("adjust_like_count")
+async def _adjust_like_count(db: AsyncSession, target_type: str, target_id: int, delta: int):
+    target_type = TargetType(target_type)
+    await adjust_like_count(db, target_type, target_id, delta)
+    if target_type == TargetType.POST:
+        after_commit(db, invalidate_post, target_id)
+
+
+@job_handler("adjust_like_counts")
+async def _adjust_like_counts(db: AsyncSession, target_type: str, target_ids: List[int], delta: int):
+    target_type = TargetType(target_type)
+    await adjust_like_counts(db, target_type, target_ids, delta)
+    if target_type == TargetType.POST:
+        after_commit(db, invalidate_post, *target_ids)
+
+
+@job_handler("adjust_comment_count")
+async def _adjust_comment_count(db: AsyncSession, post_id: int, parent_id: Optional[int], delta: int):
+    await adjust_comment_count(db, post_id, parent_id, delta)
+    if parent_id is None:
+        # 頂層留言數是貼文快取內容的一部分
+        after_commit(db, invalidate_post, post_id)
+
+
+@job_handler("delete_post")
+async def _delete_post(db: AsyncSession, post_id: int, batch: int = 0):
+    """串聯刪除已標記墓碑的貼文
+
+    inline 模式在同一交易中逐批刪完；其他模式每個工作刪除一批留言，未刪完時排入下一批，
+    每批各自 commit，大型留言串不會形成長交易。
+    """
+    batch_size = settings.post_delete_batch_size
+    if settings.jobs_mode == "inline":
+        while await delete_comment_batch(db, post_id, batch_size) == batch_size:
+            pass
+    elif await delete_comment_batch(db, post_id, batch_size) == batch_size:
+        await enqueue(db, "delete_post", {"post_id": post_id, "batch": batch + 1},
+                      label=job_label("delete_post", post_id, batch + 1))
+        return
+    await delete_post_row(db, post_id)
+    after_commit(db, invalidate_post, post_id)
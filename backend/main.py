@@ -1,72 +1,91 @@
 
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List
-import uvicorn
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional
 import os
 
-from database import get_db, engine, Base, SessionLocal
-from models import User, Post, Comment, Like, Blacklist, TargetType
+from database import (
+    get_db, async_engine, AsyncSessionLocal, dialect_insert, read_router, is_primary
+)
+from models import User, Post, Comment, Like, Blacklist, Timeline, TargetType
 from schemas import (
     UserCreate, UserLogin, UserResponse, Token,
     PostCreate, PostUpdate, PostResponse,
     CommentCreate, CommentUpdate, CommentResponse,
-    LikeCreate, LikeResponse,
-    BlacklistCreate, BlacklistResponse
+    LikeCreate, LikeResponse, LikeState, LikeCount, LikeBulkCreate, LikeBulkResult,
+    BlacklistCreate, BlacklistResponse, BlacklistBulkCreate, BlacklistBulkResult
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
-    get_current_active_user, verify_token
+    create_user_token, get_current_active_user
 )
+from principal import Principal, user_cache
+from blacklist import blacklist_index
 from config import settings
+from password_pool import password_pool
+from pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from feed import (
+    assemble_posts, assemble_cached_posts, assemble_comment_tree, assemble_comment_page,
+    serialize_comment, comment_cursor_types, comment_stream_query, load_posts, with_is_liked, liked_by,
+    invalidate_post
+)
+from cache import get_cache
+from timeline import (
+    ensure_timeline, read_timeline, set_pinned, remove_post,
+    on_block as timeline_on_block, on_unblock as timeline_on_unblock
+)
+from jobs import enqueue, job_label, dispatch, job_queue, job_depth, utcnow
+from bulk import bulk_create_likes, bulk_block_users
+from streaming import stream_scalars, stream_json_array
+from serialization import dumps, json_response
+from versions import bump_post_version, post_etag, conditional_response
+from write_pipeline import write_pipeline, run_write
+from migrations import head_version, schema_version
 
-# 建立資料庫表
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """應用程式生命週期：匯入 main 只定義路由，連線資料庫與啟動背景元件都在此進行
 
-# 檢查並初始化資料庫（如果沒有資料）
-def check_and_init_db():
-    """檢查資料庫是否需要初始化"""
-    db = SessionLocal()
+    啟動：檢查資料庫結構版本（不執行 DDL，結構變更由部署流程執行 python init_db.py migrate）；
+    設定唯讀副本；background 模式在應用程式的事件迴圈中啟動工作佇列；啟用時啟動寫入管線。
+    結束：停止寫入管線與工作佇列，關閉非同步引擎（含唯讀副本）的連線池與密碼雜湊工作池。
+    密碼雜湊（passlib）與 JWT（python-jose）在第一次使用時才載入，見 auth.py。
+    """
+    async with AsyncSessionLocal() as db:
+        current = await schema_version(db)
+    if current < head_version():
+        print(f"⚠️  資料庫結構版本 {current} 落後於程式的 {head_version()}，請執行: python init_db.py migrate")
+    replica_urls = [url.strip() for url in settings.read_replica_urls.split(",") if url.strip()]
+    if replica_urls:
+        await read_router.configure(replica_urls)
+    if settings.jobs_mode == "background":
+        await job_queue.start()
+    if settings.write_pipeline_enabled:
+        await write_pipeline.start()
     try:
-        # 檢查是否已有使用者資料
-        user_count = db.query(User).count()
-        if user_count == 0:
-            print("ℹ️  資料庫為空，建議執行: python init_db.py init")
-        # 檢查 posts.is_pinned 欄位是否存在，若不存在則新增（SQLite 專用）
-        try:
-            conn = engine.raw_connection()
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(posts);")
-            columns = [row[1] for row in cursor.fetchall()]
-            if "is_pinned" not in columns:
-                print("🛠️  偵測到缺少 posts.is_pinned 欄位，正在新增...")
-                cursor.execute("ALTER TABLE posts ADD COLUMN is_pinned BOOLEAN DEFAULT 0;")
-                conn.commit()
-                print("✅ 已新增 posts.is_pinned 欄位")
-        except Exception as migrate_err:
-            print(f"⚠️  自動遷移 is_pinned 欄位失敗: {migrate_err}")
-        finally:
-            try:
-                cursor.close()
-                conn.close()
-            except Exception:
-                pass
-    except Exception as e:
-        print(f"⚠️  資料庫檢查失敗: {e}")
+        yield
     finally:
-        db.close()
-
-# 在應用程式啟動時檢查資料庫
-check_and_init_db()
+        if write_pipeline.running:
+            await write_pipeline.stop()
+        if job_queue.running:
+            await job_queue.stop()
+        await read_router.dispose()
+        await async_engine.dispose()
+        password_pool.shutdown()
 
 # 建立 FastAPI 應用程式
 app = FastAPI(
     title=settings.app_name,
     description="社群平台後端 API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS 設定
@@ -76,6 +95,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # 靜態文件服務
@@ -102,26 +122,41 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+# 效能指標
+@app.get("/metrics")
+async def metrics():
+    return {
+        "password_hashing": password_pool.stats(),
+        "user_cache": user_cache.stats(),
+        "blacklist_index": blacklist_index.stats(),
+        "cache": get_cache().stats(),
+        "jobs": {**job_queue.stats(), "depth": await job_depth()},
+        "write_pipeline": write_pipeline.stats(),
+        "read_replicas": read_router.stats(),
+    }
+
 # 使用者相關 API
 @api_router.post("/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """使用者註冊"""
     # 檢查使用者名是否已存在
-    if db.query(User).filter(User.username == user.username).first():
+    result = await db.execute(select(User.id).where(User.username == user.username))
+    if result.first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="使用者名已存在"
         )
     
     # 檢查電子郵件是否已存在
-    if db.query(User).filter(User.email == user.email).first():
+    result = await db.execute(select(User.id).where(User.email == user.email))
+    if result.first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="電子郵件已存在"
         )
     
     # 建立新使用者
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_pool.hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -129,18 +164,19 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @api_router.post("/auth/login", response_model=Token)
-async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """使用者登入"""
     # 驗證使用者
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    result = await db.execute(select(User).where(User.username == user_credentials.username))
+    user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_credentials.password, user.password_hash):
+    if not user or not await password_pool.verify(user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="使用者名或密碼錯誤",
@@ -148,159 +184,169 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
         )
     
     # 建立 JWT Token
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_user_token(user)
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @api_router.get("/auth/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_active_user)):
     """取得當前使用者資訊"""
     return current_user
 
 # 貼文相關 API
+async def get_live_post(db: AsyncSession, post_id: int, **kwargs) -> Optional[Post]:
+    """取得貼文；已標記刪除（等待串聯刪除）的貼文視同不存在"""
+    post = await db.get(Post, post_id, **kwargs)
+    if post is None or post.deleted_at is not None:
+        return None
+    return post
+
 @api_router.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
 async def create_post(
     post: PostCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """建立貼文"""
-    db_post = Post(
-        content=post.content,
-        user_id=current_user.id
-    )
-    
-    db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    async def write(db: AsyncSession) -> Post:
+        db_post = Post(
+            content=post.content,
+            user_id=current_user.id
+        )
+        
+        db.add(db_post)
+        await db.flush()
+        # 推送到動態時報（高發文量作者改為讀取時合併）
+        await enqueue(db, "fan_out_post", {"post_id": db_post.id}, label=job_label("fan_out_post", db_post.id))
+        return db_post
+
+    db_post = await run_write(db, write)
+    await db.refresh(db_post, attribute_names=["author"])
     
-    return db_post
+    return (await assemble_posts(db, [db_post], current_user.id))[0]
 
 @api_router.get("/posts", response_model=List[PostResponse])
 async def get_posts(
-    skip: int = 0,
-    limit: int = 10,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """取得貼文列表"""
-    # 取得黑名單使用者 ID
-    blacklisted_users = db.query(Blacklist.blocked_user_id).filter(
-        Blacklist.user_id == current_user.id
-    ).subquery()
-    
-    # 查詢貼文（排除黑名單使用者的貼文）
-    posts = db.query(Post).filter(
-        Post.user_id.notin_(blacklisted_users)
-    ).order_by(Post.is_pinned.desc(), Post.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # 為每個貼文添加按讚狀態和計數
-    result = []
-    for post in posts:
-        # 計算按讚數量
-        likes_count = db.query(Like).filter(
-            Like.target_type == TargetType.POST,
-            Like.target_id == post.id
-        ).count()
-        
-        # 檢查當前用戶是否已按讚
-        is_liked = db.query(Like).filter(
-            Like.user_id == current_user.id,
-            Like.target_type == TargetType.POST,
-            Like.target_id == post.id
-        ).first() is not None
-        
-        # 計算留言數量
-        comments_count = db.query(Comment).filter(
-            Comment.post_id == post.id,
-            Comment.parent_id.is_(None)
-        ).count()
-        
-        # 創建響應對象
-        post_dict = {
-            "id": post.id,
-            "user_id": post.user_id,
-            "content": post.content,
-            "is_pinned": getattr(post, "is_pinned", False),
-            "created_at": post.created_at,
-            "updated_at": post.updated_at,
-            "author": post.author,
-            "likes_count": likes_count,
-            "comments_count": comments_count,
-            "is_liked": is_liked
-        }
-        result.append(post_dict)
-    
-    return result
+    """取得貼文列表
+
+    傳入 cursor（第一頁為空字串）時使用游標分頁，忽略 skip，
+    下一頁游標放在 X-Next-Cursor Header；沒有下一頁時不回傳該 Header。
+    FEED_MODE=timeline 時讀取使用者的動態時報，global 時直接查詢 posts。
+    """
+    cache = get_cache()
+    # 排除黑名單使用者的貼文（封鎖名單由行程內索引提供）
+    blocked = await blacklist_index.blocked(db, current_user.id)
+    # 游標分頁：從上一頁最後一筆的 (is_pinned, created_at, id) 之後接續，並多取一筆判斷是否還有下一頁
+    after = decode_cursor(cursor, (int, datetime, int)) if cursor is not None else None
+    fetch = limit if cursor is None else limit + 1
+    offset = skip if cursor is None else 0
+    
+    if settings.feed_mode == "timeline":
+        if not is_primary(db) and await db.get(Timeline, current_user.id) is None:
+            # 時報需在主資料庫建立，副本複製到之前這次讀取也由主資料庫回應
+            async with AsyncSessionLocal() as primary:
+                await ensure_timeline(primary, current_user.id)
+                posts = await read_timeline(primary, current_user.id, blocked, fetch, after=after, skip=offset)
+        else:
+            await ensure_timeline(db, current_user.id)
+            posts = await read_timeline(db, current_user.id, blocked, fetch, after=after, skip=offset)
+    else:
+        query = select(Post).where(Post.deleted_at.is_(None)).order_by(
+            Post.is_pinned.desc(), Post.created_at.desc(), Post.id.desc()
+        )
+        if cache.enabled:
+            # 只取排序鍵（走覆蓋索引、不 JOIN 作者），貼文內容由快取補齊
+            query = query.with_only_columns(Post.id, Post.is_pinned, Post.created_at)
+        else:
+            # 查詢貼文，作者以 JOIN 一併載入
+            query = query.options(joinedload(Post.author))
+        if blocked:
+            query = query.where(Post.user_id.notin_(sorted(blocked)))
+        if after is not None:
+            query = query.where(tuple_(Post.is_pinned, Post.created_at, Post.id) < tuple(after))
+        result = await db.execute(query.offset(offset).limit(fetch))
+        posts = result.all() if cache.enabled else result.scalars().all()
+    
+    if cursor is not None and len(posts) > limit:
+        posts = posts[:limit]
+        last = posts[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([bool(last.is_pinned), last.created_at, last.id])
+    
+    # 以一次查詢補齊整頁的按讚狀態
+    if settings.feed_mode == "timeline" or cache.enabled:
+        page = await assemble_cached_posts(db, [row.id for row in posts], current_user.id)
+    else:
+        page = await assemble_posts(db, posts, current_user.id)
+    if settings.fast_serialization:
+        return json_response(page, response)
+    return page
 
 @api_router.get("/posts/{post_id}", response_model=PostResponse)
 async def get_post(
     post_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """取得單一貼文（包含 likes_count / comments_count / is_liked）"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    """取得單一貼文（包含 likes_count / comments_count / is_liked）
 
-    if not post:
+    回應附 ETag / Last-Modified；帶 If-None-Match 且貼文版本未變時回傳 304，不載入貼文內容。
+    """
+    result = await db.execute(
+        select(Post.user_id, Post.version, Post.modified_at, Post.created_at)
+        .where(Post.id == post_id, Post.deleted_at.is_(None))
+    )
+    validator = result.one_or_none()
+
+    if not validator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="貼文不存在"
         )
 
     # 檢查是否在黑名單中
-    blacklist = db.query(Blacklist).filter(
-        Blacklist.user_id == current_user.id,
-        Blacklist.blocked_user_id == post.user_id
-    ).first()
-
-    if blacklist:
+    if await blacklist_index.is_blocked(db, current_user.id, validator.user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="無權限查看此貼文"
         )
 
-    # 計算貼文按讚數量
-    likes_count = db.query(Like).filter(
-        Like.target_type == TargetType.POST,
-        Like.target_id == post.id
-    ).count()
-
-    # 檢查當前用戶是否已按讚
-    is_liked = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.target_type == TargetType.POST,
-        Like.target_id == post.id
-    ).first() is not None
-
-    # 計算留言數量（僅頂層留言數）
-    comments_count = db.query(Comment).filter(
-        Comment.post_id == post.id,
-        Comment.parent_id.is_(None)
-    ).count()
+    not_modified = conditional_response(
+        request, response, post_etag("post", post_id, validator.version, current_user.id),
+        validator.modified_at or validator.created_at
+    )
+    if not_modified:
+        return not_modified
 
-    return {
-        "id": post.id,
-        "user_id": post.user_id,
-        "content": post.content,
-        "is_pinned": getattr(post, "is_pinned", False),
-        "created_at": post.created_at,
-        "updated_at": post.updated_at,
-        "author": post.author,
-        "likes_count": likes_count,
-        "comments_count": comments_count,
-        "is_liked": is_liked,
-    }
+    # 啟用共用快取時優先由快取取得
+    post = (await load_posts(db, [post_id])).get(post_id)
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="貼文不存在"
+        )
+    post = (await with_is_liked(db, [post], current_user.id))[0]
+    if settings.fast_serialization:
+        return json_response(post, response)
+    return post
 
 @api_router.put("/posts/{post_id}", response_model=PostResponse)
 async def update_post(
     post_id: int,
     post_update: PostUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """更新貼文"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await get_live_post(db, post_id, options=[joinedload(Post.author)])
     
     if not post:
         raise HTTPException(
@@ -316,51 +362,59 @@ async def update_post(
     
     if post_update.content is not None:
         post.content = post_update.content
+        await bump_post_version(db, post_id)
     
-    db.commit()
-    db.refresh(post)
+    await db.commit()
+    await invalidate_post(post_id)
+    await db.refresh(post)
     
-    return post
+    return (await assemble_posts(db, [post], current_user.id))[0]
 
 # 置頂/取消置頂 API（僅作者可操作）
 @api_router.put("/posts/{post_id}/pin")
 async def pin_post(
     post_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await get_live_post(db, post_id)
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="貼文不存在")
     if post.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="無權限置頂此貼文")
     post.is_pinned = True
-    db.commit()
+    await set_pinned(db, post)
+    await bump_post_version(db, post_id)
+    await db.commit()
+    await invalidate_post(post_id)
     return {"message": "貼文已置頂"}
 
 @api_router.put("/posts/{post_id}/unpin")
 async def unpin_post(
     post_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await get_live_post(db, post_id)
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="貼文不存在")
     if post.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="無權限取消置頂此貼文")
     post.is_pinned = False
-    db.commit()
+    await set_pinned(db, post)
+    await bump_post_version(db, post_id)
+    await db.commit()
+    await invalidate_post(post_id)
     return {"message": "貼文已取消置頂"}
 
 @api_router.delete("/posts/{post_id}")
 async def delete_post(
     post_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """刪除貼文"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await get_live_post(db, post_id)
     
     if not post:
         raise HTTPException(
@@ -374,8 +428,13 @@ async def delete_post(
             detail="無權限刪除此貼文"
         )
     
-    db.delete(post)
-    db.commit()
+    # 先寫入墓碑並移出動態時報，留言、按讚與貼文本身由工作批次刪除
+    post.deleted_at = utcnow()
+    await remove_post(db, post_id)
+    await enqueue(db, "delete_post", {"post_id": post_id}, label=job_label("delete_post", post_id))
+    await db.commit()
+    await invalidate_post(post_id)
+    await dispatch(db)
     
     return {"message": "貼文已刪除"}
 
@@ -384,12 +443,12 @@ async def delete_post(
 async def create_comment(
     post_id: int,
     comment: CommentCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """建立留言"""
     # 檢查貼文是否存在
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await get_live_post(db, post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -397,12 +456,7 @@ async def create_comment(
         )
     
     # 檢查是否在黑名單中
-    blacklist = db.query(Blacklist).filter(
-        Blacklist.user_id == current_user.id,
-        Blacklist.blocked_user_id == post.user_id
-    ).first()
-    
-    if blacklist:
+    if await blacklist_index.is_blocked(db, current_user.id, post.user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="無權限對此貼文留言"
@@ -410,7 +464,7 @@ async def create_comment(
     
     # 如果是回覆留言，檢查父留言是否存在
     if comment.parent_id:
-        parent_comment = db.query(Comment).filter(Comment.id == comment.parent_id).first()
+        parent_comment = await db.get(Comment, comment.parent_id)
         if not parent_comment or parent_comment.post_id != post_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -418,39 +472,37 @@ async def create_comment(
             )
         
         # 檢查父留言作者是否在黑名單中
-        parent_blacklist = db.query(Blacklist).filter(
-            Blacklist.user_id == current_user.id,
-            Blacklist.blocked_user_id == parent_comment.user_id
-        ).first()
-        
-        if parent_blacklist:
+        if await blacklist_index.is_blocked(db, current_user.id, parent_comment.user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="無權限對此留言進行回覆"
             )
     
-    db_comment = Comment(
-        post_id=post_id,
-        user_id=current_user.id,
-        parent_id=comment.parent_id,
-        content=comment.content
-    )
-    
-    db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    async def write(db: AsyncSession) -> Comment:
+        db_comment = Comment(
+            post_id=post_id,
+            user_id=current_user.id,
+            parent_id=comment.parent_id,
+            content=comment.content
+        )
+        
+        db.add(db_comment)
+        await db.flush()
+        await enqueue(
+            db, "adjust_comment_count", {"post_id": post_id, "parent_id": comment.parent_id, "delta": 1},
+            label=job_label("comment_count", db_comment.id, "add")
+        )
+        return db_comment
+
+    db_comment = await run_write(db, write)
+    await db.refresh(db_comment, attribute_names=["author"])
     
-    return db_comment
+    return serialize_comment(db_comment, is_liked=False)
 
-@api_router.get("/posts/{post_id}/comments", response_model=List[CommentResponse])
-async def get_comments(
-    post_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """取得貼文留言列表"""
+async def get_viewable_post(db: AsyncSession, post_id: int, current_user: Principal) -> Post:
+    """取得可查看留言的貼文：貼文不存在回傳 404，作者在黑名單中回傳 403"""
     # 檢查貼文是否存在
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await get_live_post(db, post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -458,146 +510,375 @@ async def get_comments(
         )
     
     # 檢查是否在黑名單中
-    blacklist = db.query(Blacklist).filter(
-        Blacklist.user_id == current_user.id,
-        Blacklist.blocked_user_id == post.user_id
-    ).first()
-    
-    if blacklist:
+    if await blacklist_index.is_blocked(db, current_user.id, post.user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="無權限查看此貼文留言"
         )
-    
-    # 取得貼文的頂層留言（置頂優先，其次依建立時間）
-    top_level_comments = db.query(Comment).filter(
-        Comment.post_id == post_id,
-        Comment.parent_id.is_(None)
-    ).order_by(Comment.is_top_comment.desc(), Comment.created_at.asc()).all()
-
-    def build_comment_tree(node: Comment) -> dict:
-        """遞迴建立留言樹，包含 likes 資訊與所有子回覆。"""
-        likes_count = db.query(Like).filter(
-            Like.target_type == TargetType.COMMENT,
-            Like.target_id == node.id
-        ).count()
-
-        is_liked = db.query(Like).filter(
-            Like.user_id == current_user.id,
-            Like.target_type == TargetType.COMMENT,
-            Like.target_id == node.id
-        ).first() is not None
-
-        # 查詢子回覆
-        child_comments = db.query(Comment).filter(
-            Comment.post_id == node.post_id,
-            Comment.parent_id == node.id
-        ).all()
-
-        return {
-            "id": node.id,
-            "post_id": node.post_id,
-            "user_id": node.user_id,
-            "parent_id": node.parent_id,
-            "content": node.content,
-            "is_top_comment": node.is_top_comment,
-            "created_at": node.created_at,
-            "updated_at": node.updated_at,
-            "author": node.author,
-            "likes_count": likes_count,
-            "is_liked": is_liked,
-            "replies": [build_comment_tree(child) for child in child_comments]
-        }
-
-    # 建立整棵留言樹
-    result = [build_comment_tree(c) for c in top_level_comments]
-    return result
+    return post
 
-# 按讚相關 API
-@api_router.post("/likes", response_model=LikeResponse, status_code=status.HTTP_201_CREATED)
-async def create_like(
-    like: LikeCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+@api_router.get("/posts/{post_id}/comments", response_model=List[CommentResponse])
+async def get_comments(
+    post_id: int,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    max_depth: Optional[int] = Query(None, ge=1),
+    reply_preview: Optional[int] = Query(None, ge=0),
+    stream: bool = False,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """建立按讚"""
-    # 檢查是否已經按過讚
-    existing_like = db.query(Like).filter(
-        Like.user_id == current_user.id,
-        Like.target_type == like.target_type,
-        Like.target_id == like.target_id
-    ).first()
-    
-    if existing_like:
+    """取得貼文留言列表
+
+    stream=true 時以扁平陣列串流回傳所有留言（replies 為空，依 parent_id 在用戶端組成樹），
+    不在記憶體中組裝整棵樹，不可與分頁參數併用。
+    未帶任何分頁參數時回傳整棵留言樹；否則：
+    - limit / cursor：頂層留言的游標分頁，下一頁游標放在 X-Next-Cursor Header
+    - max_depth：展開的層數（1 為只有頂層留言）
+    - reply_preview：每則留言最多預覽幾則回覆
+    未完整展開的留言附上 reply_count 與 replies_cursor，可由 replies 端點接續載入。
+    回應附 ETag / Last-Modified（依貼文版本，留言、按讚、置頂留言變更時更新）；
+    帶 If-None-Match 且未變更時回傳 304，不組裝留言樹。
+    """
+    post = await get_viewable_post(db, post_id, current_user)
+    paginated = not (limit is None and cursor is None and max_depth is None and reply_preview is None)
+
+    if stream and paginated:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="已經按過讚"
+            detail="串流模式不支援分頁參數"
         )
-    
-    # 檢查目標是否存在
-    if like.target_type.value == "post":
-        target = db.query(Post).filter(Post.id == like.target_id).first()
+
+    # ETag 以 URL（含查詢參數）為範圍，同一貼文的各種留言查詢共用貼文版本
+    not_modified = conditional_response(
+        request, response, post_etag("comments", post_id, post.version, current_user.id),
+        post.modified_at or post.created_at
+    )
+    if not_modified:
+        return not_modified
+
+    if stream:
+        # 按讚狀態只取當前使用者在此貼文的按讚，其餘欄位逐筆序列化
+        liked = await liked_by(db, current_user.id, TargetType.COMMENT,
+                               select(Comment.id).where(Comment.post_id == post_id))
+        if settings.fast_serialization:
+            serialize = lambda comment: dumps(serialize_comment(comment, is_liked=comment.id in liked)).decode()
+        else:
+            serialize = lambda comment: CommentResponse.model_validate(
+                serialize_comment(comment, is_liked=comment.id in liked)
+            ).model_dump_json()
+        # 直接回傳的 Response 不會合併注入的 response 上的 Header
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+        return stream_json_array(stream_scalars(comment_stream_query(post_id)), serialize, headers)
+
+    if not paginated:
+        # 一次載入整棵留言樹（含按讚數與按讚狀態）
+        comments = await assemble_comment_tree(db, post_id, current_user.id)
+        if settings.fast_serialization:
+            return json_response(comments, response)
+        return comments
+
+    comments, next_cursor = await assemble_comment_page(
+        db, post_id, current_user.id,
+        limit=limit,
+        after=decode_cursor(cursor or "", comment_cursor_types(top_level=True)),
+        max_depth=max_depth,
+        reply_preview=reply_preview,
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if settings.fast_serialization:
+        return json_response(comments, response)
+    return comments
+
+@api_router.get("/posts/{post_id}/comments/{comment_id}/replies", response_model=List[CommentResponse])
+async def get_comment_replies(
+    post_id: int,
+    comment_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1),
+    cursor: Optional[str] = None,
+    max_depth: Optional[int] = Query(1, ge=1),
+    reply_preview: Optional[int] = Query(None, ge=0),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """載入留言的更多回覆
+
+    cursor 為留言節點上的 replies_cursor（空字串代表從第一則開始），
+    下一頁游標放在 X-Next-Cursor Header；max_depth / reply_preview 與留言列表相同。
+    """
+    await get_viewable_post(db, post_id, current_user)
+
+    parent = await db.get(Comment, comment_id)
+    if not parent or parent.post_id != post_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="留言不存在"
+        )
+
+    replies, next_cursor = await assemble_comment_page(
+        db, post_id, current_user.id,
+        parent_id=comment_id,
+        limit=limit,
+        after=decode_cursor(cursor or "", comment_cursor_types(top_level=False)),
+        max_depth=max_depth,
+        reply_preview=reply_preview,
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if settings.fast_serialization:
+        return json_response(replies, response)
+    return replies
+
+# 按讚相關 API
+async def get_like_target(db: AsyncSession, target_type: TargetType, target_id: int):
+    """取得按讚目標（貼文或留言）：不存在回傳 404"""
+    if target_type == TargetType.POST:
+        target = await get_live_post(db, target_id)
     else:  # comment
-        target = db.query(Comment).filter(Comment.id == like.target_id).first()
+        target = await db.get(Comment, target_id)
+        # 已刪除貼文的留言等待串聯刪除，視同不存在
+        if target and await get_live_post(db, target.post_id) is None:
+            target = None
     
     if not target:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="目標不存在"
         )
-    
-    # 檢查黑名單
-    target_user_id = target.user_id if hasattr(target, 'user_id') else target.author.id
-    blacklist = db.query(Blacklist).filter(
-        Blacklist.user_id == current_user.id,
-        Blacklist.blocked_user_id == target_user_id
-    ).first()
-    
-    if blacklist:
+    return target
+
+async def check_can_like(db: AsyncSession, current_user: Principal, target):
+    """目標作者在黑名單中時回傳 403"""
+    if await blacklist_index.is_blocked(db, current_user.id, target.user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="無權限對此內容按讚"
         )
+
+@api_router.post("/likes", response_model=LikeResponse, status_code=status.HTTP_201_CREATED)
+async def create_like(
+    like: LikeCreate,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """建立按讚"""
+    # 檢查目標是否存在
+    target = await get_like_target(db, like.target_type, like.target_id)
     
-    db_like = Like(
-        user_id=current_user.id,
-        target_type=like.target_type,
-        target_id=like.target_id
-    )
+    # 檢查黑名單
+    await check_can_like(db, current_user, target)
     
-    db.add(db_like)
-    db.commit()
-    db.refresh(db_like)
+    async def write(db: AsyncSession) -> Like:
+        db_like = Like(
+            user_id=current_user.id,
+            target_type=like.target_type,
+            target_id=like.target_id
+        )
+        
+        db.add(db_like)
+        await db.flush()
+        await enqueue(
+            db, "adjust_like_count", {"target_type": like.target_type.value, "target_id": like.target_id, "delta": 1},
+            label=job_label("like_count", db_like.id, "add")
+        )
+        return db_like
+
+    # 重複按讚由唯一索引 (user_id, target_type, target_id) 擋下
+    try:
+        db_like = await run_write(db, write)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="已經按過讚"
+        )
+    await db.refresh(db_like)
     
     return db_like
 
+async def set_like_state(
+    db: AsyncSession, current_user: Principal, target_type: TargetType, target_id: int, liked: bool
+) -> dict:
+    """以 INSERT ... ON CONFLICT DO NOTHING / DELETE 設定按讚狀態，重複呼叫結果相同；回傳最新狀態與按讚數"""
+    target = await get_like_target(db, target_type, target_id)
+    if liked:
+        await check_can_like(db, current_user, target)
+        result = await db.execute(
+            dialect_insert(db, Like).values(
+                user_id=current_user.id, target_type=target_type, target_id=target_id
+            ).on_conflict_do_nothing(index_elements=["user_id", "target_type", "target_id"]).returning(Like.id)
+        )
+    else:
+        result = await db.execute(
+            delete(Like).where(
+                Like.user_id == current_user.id, Like.target_type == target_type, Like.target_id == target_id
+            ).returning(Like.id)
+        )
+    like_id = result.scalar_one_or_none()
+    
+    # 狀態有變更時才增減計數；計數工作延後執行時，回傳值先計入本次變更
+    delta = 0
+    if like_id is not None:
+        delta = 1 if liked else -1
+        await enqueue(
+            db, "adjust_like_count", {"target_type": target_type.value, "target_id": target_id, "delta": delta},
+            label=job_label("like_count", like_id, "add" if liked else "remove")
+        )
+    model = Post if target_type == TargetType.POST else Comment
+    likes_count = (await db.execute(select(model.like_count).where(model.id == target_id))).scalar_one()
+    if settings.jobs_mode != "inline":
+        likes_count += delta
+    await db.commit()
+    await dispatch(db)
+    
+    return {"target_type": target_type, "target_id": target_id, "is_liked": liked, "likes_count": likes_count}
+
+@api_router.put("/likes/{target_type}/{target_id}", response_model=LikeState)
+async def like_target(
+    target_type: TargetType,
+    target_id: int,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """按讚（冪等：已按讚時不變更），回傳按讚狀態與最新按讚數"""
+    return await set_like_state(db, current_user, target_type, target_id, liked=True)
+
+@api_router.delete("/likes/{target_type}/{target_id}", response_model=LikeState)
+async def unlike_target(
+    target_type: TargetType,
+    target_id: int,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """取消按讚（冪等：未按讚時不變更），回傳按讚狀態與最新按讚數"""
+    return await set_like_state(db, current_user, target_type, target_id, liked=False)
+
+def check_bulk_size(count: int):
+    if count > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"一次最多 {settings.bulk_max_items} 筆"
+        )
+
+@api_router.post("/likes/bulk", response_model=List[LikeBulkResult])
+async def create_likes_bulk(
+    bulk: LikeBulkCreate,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """批次按讚：整批在同一交易中寫入，依請求順序回傳每一筆的結果"""
+    check_bulk_size(len(bulk.items))
+    results = await bulk_create_likes(db, current_user.id, bulk.items)
+    await db.commit()
+    await dispatch(db)
+    return results
+
+def check_like_filters(target_type: Optional[TargetType], target_id: Optional[int]):
+    if target_id is not None and target_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="指定 target_id 時需同時指定 target_type"
+        )
+
+def filter_likes(query, user_id: Optional[int], target_type: Optional[TargetType], target_id: Optional[int]):
+    """按讚列表與匯出共用的篩選條件"""
+    if user_id is not None:
+        query = query.where(Like.user_id == user_id)
+    if target_type is not None:
+        query = query.where(Like.target_type == target_type)
+    if target_id is not None:
+        query = query.where(Like.target_id == target_id)
+    return query
+
 @api_router.get("/likes", response_model=List[LikeResponse])
 async def get_likes(
-    target_type: TargetType = None,
-    target_id: int = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    user_id: Optional[int] = None,
+    target_type: Optional[TargetType] = None,
+    target_id: Optional[int] = None,
+    limit: int = Query(50, ge=1),
+    cursor: str = "",
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """取得按讚列表"""
-    query = db.query(Like)
-    
-    if target_type and target_id:
-        query = query.filter(
-            Like.target_type == target_type,
-            Like.target_id == target_id
-        )
+    """取得按讚列表
+
+    一律以 id 游標分頁（由新到舊，每頁最多 LIKES_PAGE_MAX_SIZE 筆），
+    下一頁游標放在 X-Next-Cursor Header；可依使用者、目標類型與目標篩選。
+    """
+    check_like_filters(target_type, target_id)
+    limit = min(limit, settings.likes_page_max_size)
+    query = filter_likes(select(Like), user_id, target_type, target_id).order_by(Like.id.desc())
+    after = decode_cursor(cursor, (int,))
+    if after is not None:
+        query = query.where(Like.id < after[0])
     
-    likes = query.all()
+    likes = (await db.execute(query.limit(limit + 1))).scalars().all()
+    if len(likes) > limit:
+        likes = likes[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([likes[-1].id])
     return likes
 
+@api_router.get("/likes/counts", response_model=List[LikeCount])
+async def get_like_counts(
+    target_type: TargetType,
+    target_ids: List[int] = Query(...),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """依目標彙總按讚數（?target_type=post&target_ids=1&target_ids=2）
+
+    直接讀取反正規化的按讚數欄位，依請求順序回傳，不存在的目標略過。
+    """
+    check_bulk_size(len(target_ids))
+    model = Post if target_type == TargetType.POST else Comment
+    query = select(model.id, model.like_count).where(model.id.in_(set(target_ids)))
+    if model is Post:
+        query = query.where(Post.deleted_at.is_(None))
+    counts = dict((await db.execute(query)).all())
+    return [
+        {"target_type": target_type, "target_id": target_id, "likes_count": counts[target_id]}
+        for target_id in dict.fromkeys(target_ids) if target_id in counts
+    ]
+
+async def stream_likes(user_id: Optional[int], target_type: Optional[TargetType], target_id: Optional[int]):
+    """以 id 游標分批查詢並逐行輸出 NDJSON，記憶體用量只與批次大小有關"""
+    last_id = 0
+    while True:
+        # 每批使用獨立的短會話，匯出期間不長時間佔用連線與交易
+        async with AsyncSessionLocal() as db:
+            query = filter_likes(select(Like), user_id, target_type, target_id).where(
+                Like.id > last_id
+            ).order_by(Like.id).limit(settings.likes_export_batch_size)
+            likes = (await db.execute(query)).scalars().all()
+        if not likes:
+            return
+        yield "".join(LikeResponse.model_validate(like).model_dump_json() + "\n" for like in likes)
+        last_id = likes[-1].id
+
+@api_router.get("/likes/export")
+async def export_likes(
+    user_id: Optional[int] = None,
+    target_type: Optional[TargetType] = None,
+    target_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """以 NDJSON 串流匯出按讚記錄（每行一筆，依 id 由舊到新），供分析工作使用"""
+    check_like_filters(target_type, target_id)
+    return StreamingResponse(stream_likes(user_id, target_type, target_id), media_type="application/x-ndjson")
+
 @api_router.delete("/likes/{like_id}")
 async def delete_like(
     like_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """取消按讚"""
-    like = db.query(Like).filter(Like.id == like_id).first()
+    like = await db.get(Like, like_id)
     
     if not like:
         raise HTTPException(
@@ -611,8 +892,13 @@ async def delete_like(
             detail="無權限取消此按讚"
         )
     
-    db.delete(like)
-    db.commit()
+    await db.delete(like)
+    await enqueue(
+        db, "adjust_like_count", {"target_type": like.target_type.value, "target_id": like.target_id, "delta": -1},
+        label=job_label("like_count", like_id, "remove")
+    )
+    await db.commit()
+    await dispatch(db)
     
     return {"message": "已取消按讚"}
 
@@ -620,8 +906,8 @@ async def delete_like(
 @api_router.post("/blacklist", response_model=BlacklistResponse, status_code=status.HTTP_201_CREATED)
 async def add_to_blacklist(
     blacklist: BlacklistCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """加入黑名單"""
     # 檢查不能將自己加入黑名單
@@ -632,53 +918,75 @@ async def add_to_blacklist(
         )
     
     # 檢查目標使用者是否存在
-    target_user = db.query(User).filter(User.id == blacklist.blocked_user_id).first()
+    target_user = await db.get(User, blacklist.blocked_user_id)
     if not target_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="目標使用者不存在"
         )
     
-    # 檢查是否已經在黑名單中
-    existing_blacklist = db.query(Blacklist).filter(
-        Blacklist.user_id == current_user.id,
-        Blacklist.blocked_user_id == blacklist.blocked_user_id
-    ).first()
-    
-    if existing_blacklist:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="該使用者已在黑名單中"
-        )
-    
     db_blacklist = Blacklist(
         user_id=current_user.id,
         blocked_user_id=blacklist.blocked_user_id
     )
     
     db.add(db_blacklist)
-    db.commit()
-    db.refresh(db_blacklist)
+    await timeline_on_block(db, current_user.id, blacklist.blocked_user_id)
+    # 重複封鎖由唯一索引 (user_id, blocked_user_id) 擋下
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="該使用者已在黑名單中"
+        )
+    blacklist_index.on_block(current_user.id, blacklist.blocked_user_id)
+    await db.refresh(db_blacklist, attribute_names=["blocked_user"])
     
     return db_blacklist
 
+@api_router.post("/blacklist/bulk", response_model=List[BlacklistBulkResult])
+async def add_to_blacklist_bulk(
+    bulk: BlacklistBulkCreate,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """批次加入黑名單：整批在同一交易中寫入，依請求順序回傳每一筆的結果"""
+    check_bulk_size(len(bulk.blocked_user_ids))
+    results, blocked_user_ids = await bulk_block_users(db, current_user.id, bulk.blocked_user_ids)
+    await db.commit()
+    for blocked_user_id in blocked_user_ids:
+        blacklist_index.on_block(current_user.id, blocked_user_id)
+    return results
+
 @api_router.get("/blacklist", response_model=List[BlacklistResponse])
 async def get_blacklist(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    stream: bool = False,
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """取得黑名單列表"""
-    blacklist = db.query(Blacklist).filter(Blacklist.user_id == current_user.id).all()
+    """取得黑名單列表（stream=true 時逐筆串流回傳）"""
+    query = select(Blacklist).options(joinedload(Blacklist.blocked_user)).where(
+        Blacklist.user_id == current_user.id
+    ).order_by(Blacklist.id)
+    if stream:
+        return stream_json_array(
+            stream_scalars(query),
+            lambda entry: BlacklistResponse.model_validate(entry).model_dump_json()
+        )
+    result = await db.execute(query)
+    blacklist = result.scalars().all()
     return blacklist
 
 @api_router.delete("/blacklist/{blacklist_id}")
 async def remove_from_blacklist(
     blacklist_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """從黑名單移除"""
-    blacklist = db.query(Blacklist).filter(Blacklist.id == blacklist_id).first()
+    blacklist = await db.get(Blacklist, blacklist_id)
     
     if not blacklist:
         raise HTTPException(
@@ -692,8 +1000,10 @@ async def remove_from_blacklist(
             detail="無權限移除此黑名單記錄"
         )
     
-    db.delete(blacklist)
-    db.commit()
+    await db.delete(blacklist)
+    await timeline_on_unblock(db, blacklist.user_id, blacklist.blocked_user_id)
+    await db.commit()
+    blacklist_index.on_unblock(blacklist.user_id, blacklist.blocked_user_id)
     
     return {"message": "已從黑名單移除"}
 
@@ -702,12 +1012,12 @@ async def remove_from_blacklist(
 async def set_top_comment(
     post_id: int,
     comment_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """設定置頂留言"""
     # 檢查貼文是否存在且為當前使用者所有
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await get_live_post(db, post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -721,10 +1031,11 @@ async def set_top_comment(
         )
     
     # 檢查留言是否存在且屬於該貼文
-    comment = db.query(Comment).filter(
+    result = await db.execute(select(Comment).where(
         Comment.id == comment_id,
         Comment.post_id == post_id
-    ).first()
+    ))
+    comment = result.scalar_one_or_none()
     
     if not comment:
         raise HTTPException(
@@ -740,14 +1051,17 @@ async def set_top_comment(
         )
 
     # 先取消其他置頂留言
-    db.query(Comment).filter(
-        Comment.post_id == post_id,
-        Comment.is_top_comment == True
-    ).update({"is_top_comment": False})
+    await db.execute(
+        update(Comment).where(
+            Comment.post_id == post_id,
+            Comment.is_top_comment == True
+        ).values(is_top_comment=False)
+    )
     
     # 設定新的置頂留言
     comment.is_top_comment = True
-    db.commit()
+    await bump_post_version(db, post_id)
+    await db.commit()
     
     return {"message": "置頂留言已設定"}
 
@@ -774,4 +1088,5 @@ async def serve_frontend(path: str):
     raise HTTPException(status_code=404, detail="Not found")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
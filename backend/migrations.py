@@ -0,0 +1,411 @@
+"""
+資料庫結構遷移
+遷移依版本號依序執行，已套用的版本記錄在 schema_migrations；由部署流程執行一次（python init_db.py migrate），
+API 行程啟動時不執行任何 DDL，只檢查結構版本並在落後時提示。
+
+- 鎖：執行前在 schema_migration_lock 插入固定 id 的列，多個行程同時執行時只有一個取得，其餘等待後發現已套用而略過；
+  持有超過 stale_after 秒的鎖視為中斷的行程遺留，可被取代
+- 每個遷移在自己的交易中執行並記錄版本；transactional=False 的遷移（建立索引）在交易外逐一執行，
+  PostgreSQL 使用 CREATE INDEX CONCURRENTLY，不阻塞寫入
+- 每個遷移都先檢查現況，中途失敗後重新執行是安全的；較早部署的資料庫（由啟動時 create_all 建立）同樣可升級
+- 遷移只使用撰寫當時的結構定義，模型變更一律以新版本的遷移加入
+"""
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    delete, func, insert, inspect, literal, select, text
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from jobs import utcnow
+from models import SchemaMigration, SchemaMigrationLock
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+    transactional: bool
+
+
+MIGRATIONS: Dict[int, Migration] = {}
+
+
+def migration(version: int, name: str, transactional: bool = True):
+    """註冊遷移；版本號只增不改，已發佈的遷移不可修改內容"""
+    def register(fn):
+        if version in MIGRATIONS:
+            raise ValueError(f"重複的遷移版本: {version}")
+        MIGRATIONS[version] = Migration(version, name, fn, transactional)
+        return fn
+    return register
+
+
+def head_version() -> int:
+    return max(MIGRATIONS)
+
+
+# 遷移
+# 遷移內的資料表、欄位與索引都是撰寫當時的定義，不引用 models.py：模型之後的變更必須新增遷移，
+# 不會改變已發佈遷移的結果（tests/test_migrations.py 比對遷移後的結構與模型是否一致）
+
+_schema = MetaData()
+
+_users = Table(
+    "users", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, index=True, nullable=False),
+    Column("email", String(100), unique=True, index=True, nullable=False),
+    Column("password_hash", String(255), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+_posts = Table(
+    "posts", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("is_pinned", Boolean, default=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+_comments = Table(
+    "comments", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("post_id", Integer, ForeignKey("posts.id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("parent_id", Integer, ForeignKey("comments.id"), nullable=True),
+    Column("content", Text, nullable=False),
+    Column("is_top_comment", Boolean, default=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+_likes = Table(
+    "likes", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("target_type", Enum("POST", "COMMENT", name="targettype"), nullable=False),
+    Column("target_id", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+_blacklists = Table(
+    "blacklists", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("blocked_user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+@migration(1, "create_baseline_tables")
+def _create_baseline_tables(conn: Connection):
+    """建立最初版本的資料表（使用者、貼文、留言、按讚、黑名單）；已存在的資料表略過"""
+    for table in (_users, _posts, _comments, _likes, _blacklists):
+        table.create(bind=conn, checkfirst=True)
+
+
+# 舊資料庫可能缺少的欄位：(資料表, 欄位, 型別, 預設值, NOT NULL)
+LEGACY_COLUMNS = [
+    ("posts", "is_pinned", Boolean(), False, False),
+    ("posts", "like_count", Integer(), 0, True),
+    ("posts", "top_level_comment_count", Integer(), 0, True),
+    ("posts", "fanned_out", Boolean(), True, True),
+    ("posts", "deleted_at", DateTime(timezone=True), None, False),
+    ("posts", "version", Integer(), 1, True),
+    ("posts", "modified_at", DateTime(timezone=True), None, False),
+    ("comments", "like_count", Integer(), 0, True),
+    ("comments", "reply_count", Integer(), 0, True),
+]
+
+
+@migration(2, "add_legacy_columns")
+def _add_legacy_columns(conn: Connection):
+    """補上最初版本之後新增的欄位；新增計數欄位後依現有資料重新計算"""
+    added_counters = False
+    for table, column, column_type, default, not_null in LEGACY_COLUMNS:
+        if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+            continue
+        ddl = f"ALTER TABLE {table} ADD COLUMN {column} {column_type.compile(dialect=conn.dialect)}"
+        if default is not None:
+            value = literal(default, column_type).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+            ddl += f"{' NOT NULL' if not_null else ''} DEFAULT {value}"
+        conn.execute(text(ddl))
+        print(f"✅ 已新增 {table}.{column} 欄位")
+        added_counters = added_counters or column.endswith("_count")
+    if added_counters:
+        print(f"✅ 已重新計算計數欄位: {_reconcile_counters(conn)}")
+
+
+# 反正規化計數欄位與實際數量的子查詢：(資料表, 欄位, 子查詢)
+COUNTER_COLUMNS = [
+    ("posts", "like_count",
+     "SELECT COUNT(*) FROM likes WHERE likes.target_type = 'POST' AND likes.target_id = posts.id"),
+    ("posts", "top_level_comment_count",
+     "SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id AND comments.parent_id IS NULL"),
+    ("comments", "like_count",
+     "SELECT COUNT(*) FROM likes WHERE likes.target_type = 'COMMENT' AND likes.target_id = comments.id"),
+    ("comments", "reply_count",
+     "SELECT COUNT(*) FROM comments AS replies WHERE replies.parent_id = comments.id"),
+]
+
+
+def _reconcile_counters(conn: Connection) -> dict:
+    """重新計算計數欄位，只更新與實際數量不符的列（不更新 updated_at），回傳每個欄位修正的列數
+
+    不使用 counters.reconcile_counters：它引用目前的模型，模型之後的變更會改變已發佈遷移的結果。
+    """
+    fixed = {}
+    for table, column, actual in COUNTER_COLUMNS:
+        result = conn.execute(text(f"UPDATE {table} SET {column} = ({actual}) WHERE {column} != ({actual})"))
+        fixed[f"{table}.{column}"] = result.rowcount
+    return fixed
+
+
+# 唯一索引涵蓋的欄位：(資料表, 索引名稱, 欄位)
+UNIQUE_INDEX_COLUMNS = [
+    ("likes", "uq_likes_user_target", "user_id, target_type, target_id"),
+    ("blacklists", "uq_blacklists_user_blocked", "user_id, blocked_user_id"),
+]
+
+
+@migration(3, "dedupe_before_unique_indexes")
+def _dedupe(conn: Connection):
+    """建立唯一索引前移除重複的按讚與黑名單（保留最早的一筆），並重新計算計數"""
+    removed = 0
+    for table, index_name, columns in UNIQUE_INDEX_COLUMNS:
+        if index_name in {index["name"] for index in inspect(conn).get_indexes(table)}:
+            continue
+        result = conn.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table} GROUP BY {columns})"
+        ))
+        if result.rowcount:
+            print(f"🧹 已移除 {table} 的 {result.rowcount} 筆重複資料")
+            removed += result.rowcount
+    if removed:
+        print(f"✅ 已重新計算計數欄位: {_reconcile_counters(conn)}")
+
+
+# 最初版本的資料表上新增的索引：(資料表, 索引名稱, 欄位, 是否唯一)
+BASELINE_INDEXES = [
+    ("posts", "ix_posts_pinned_created", "is_pinned, created_at", False),
+    ("posts", "ix_posts_fanout_pinned_created", "fanned_out, is_pinned, created_at", False),
+    ("posts", "ix_posts_user_created", "user_id, created_at", False),
+    ("comments", "ix_comments_post_parent", "post_id, parent_id", False),
+    ("likes", "ix_likes_target", "target_type, target_id", False),
+    ("likes", "ix_likes_user", "user_id, id", False),
+    ("likes", "uq_likes_user_target", "user_id, target_type, target_id", True),
+    ("blacklists", "ix_blacklists_blocked_user", "blocked_user_id", False),
+    ("blacklists", "uq_blacklists_user_blocked", "user_id, blocked_user_id", True),
+]
+
+
+@migration(4, "create_indexes", transactional=False)
+def _create_indexes(conn: Connection):
+    """在既有的資料表上建立尚不存在的索引（含唯一索引）"""
+    for table, name, columns, unique in BASELINE_INDEXES:
+        if name not in {index["name"] for index in inspect(conn).get_indexes(table)}:
+            create_index_online(conn, table, name, columns, unique)
+
+
+def create_index_online(conn: Connection, table: str, name: str, columns: str, unique: bool = False):
+    """在交易外建立索引：PostgreSQL 使用 CONCURRENTLY 不鎖住寫入；SQLite 每個索引為一個短交易"""
+    concurrently = " CONCURRENTLY" if conn.dialect.name == "postgresql" else ""
+    print(f"🛠️  建立索引 {name}...")
+    start = time.perf_counter()
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX{concurrently} {name} ON {table} ({columns})"))
+    print(f"✅ 已建立索引 {name}（{time.perf_counter() - start:.2f} 秒）")
+
+
+_timelines = Table(
+    "timelines", _schema,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+_timeline_entries = Table(
+    "timeline_entries", _schema,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
+    Column("author_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("is_pinned", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Index("ix_timeline_entries_feed", "user_id", "is_pinned", "created_at", "post_id"),
+    Index("ix_timeline_entries_post", "post_id"),
+    Index("ix_timeline_entries_user_author", "user_id", "author_id"),
+)
+
+
+@migration(5, "create_timeline_tables")
+def _create_timeline_tables(conn: Connection):
+    """建立動態時報的資料表（新資料表為空，索引隨資料表在交易中建立）"""
+    for table in (_timelines, _timeline_entries):
+        table.create(bind=conn, checkfirst=True)
+
+
+_jobs = Table(
+    "jobs", _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("kind", String(50), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("idempotency_key", String(200), unique=True, nullable=True),
+    Column("status", String(20), nullable=False, server_default="pending"),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("last_error", Text, nullable=True),
+    Column("run_after", DateTime(timezone=True), server_default=func.now()),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_jobs_status_run_after", "status", "run_after"),
+)
+
+
+@migration(6, "create_jobs_table")
+def _create_jobs_table(conn: Connection):
+    """建立背景工作的資料表"""
+    _jobs.create(bind=conn, checkfirst=True)
+
+
+_jobs_v7 = Table(
+    "jobs", MetaData(),
+    Column("id", Integer, primary_key=True, index=True),
+    Column("kind", String(50), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("label", String(200), nullable=True),
+    Column("status", String(20), nullable=False, server_default="pending"),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("last_error", Text, nullable=True),
+    Column("run_after", DateTime(timezone=True), server_default=func.now()),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_jobs_status_run_after", "status", "run_after"),
+)
+
+_JOB_COLUMNS = "id, kind, payload, {label}, status, attempts, last_error, run_after, created_at, updated_at"
+
+
+@migration(7, "replace_job_idempotency_key_with_label")
+def _replace_job_idempotency_key(conn: Connection):
+    """移除 jobs.idempotency_key 的唯一限制並改名為 label
+
+    SQLite 會重新使用刪除後的 rowid，以資料列 ID 組成的鍵無法可靠去重；鍵只保留為可讀的標籤。
+    SQLite 無法移除唯一限制，以新結構重建資料表並複製既有工作。
+    """
+    if "idempotency_key" not in {column["name"] for column in inspect(conn).get_columns("jobs")}:
+        return
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ALTER TABLE jobs RENAME TO jobs_v6"))
+        for index_name in ("ix_jobs_id", "ix_jobs_status_run_after"):
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        _jobs_v7.create(bind=conn)
+        conn.execute(text(
+            f"INSERT INTO jobs ({_JOB_COLUMNS.format(label='label')}) "
+            f"SELECT {_JOB_COLUMNS.format(label='idempotency_key')} FROM jobs_v6"
+        ))
+        conn.execute(text("DROP TABLE jobs_v6"))
+        return
+    for constraint in inspect(conn).get_unique_constraints("jobs"):
+        if constraint["column_names"] == ["idempotency_key"]:
+            conn.execute(text(f"ALTER TABLE jobs DROP CONSTRAINT {constraint['name']}"))
+    conn.execute(text("ALTER TABLE jobs RENAME COLUMN idempotency_key TO label"))
+
+
+# 執行
+
+def _create_bookkeeping_tables(db_engine: Engine):
+    for table in (SchemaMigration.__table__, SchemaMigrationLock.__table__):
+        try:
+            table.create(bind=db_engine, checkfirst=True)
+        except (OperationalError, ProgrammingError):
+            # 另一個行程同時建立
+            pass
+
+
+def _refresh_schema_cache(conn: Connection):
+    """SQLite 連線會快取資料表結構，inspect 使用的 PRAGMA 不會察覺其他連線（例如前一個遷移）的結構變更；
+    先執行一次讀取 sqlite_master 的查詢讓快取更新"""
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("SELECT 1 FROM sqlite_master LIMIT 1")
+
+
+def acquire_lock(db_engine: Engine, timeout: float = 60, stale_after: float = 600) -> str:
+    """取得遷移鎖，回傳持有者識別；逾時拋出 TimeoutError"""
+    owner = f"{socket.gethostname()}:{os.getpid()}:{time.monotonic_ns()}"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with db_engine.begin() as conn:
+                conn.execute(insert(SchemaMigrationLock).values(id=1, owner=owner, locked_at=utcnow()))
+            return owner
+        except IntegrityError:
+            pass
+        with db_engine.begin() as conn:
+            stale = conn.execute(delete(SchemaMigrationLock).where(
+                SchemaMigrationLock.locked_at < utcnow() - timedelta(seconds=stale_after)
+            ))
+            if stale.rowcount:
+                print("⚠️  已移除逾時未釋放的遷移鎖")
+                continue
+        if time.monotonic() >= deadline:
+            raise TimeoutError("等待遷移鎖逾時，另一個行程正在執行遷移")
+        time.sleep(0.2)
+
+
+def release_lock(db_engine: Engine, owner: str):
+    with db_engine.begin() as conn:
+        conn.execute(delete(SchemaMigrationLock).where(SchemaMigrationLock.owner == owner))
+
+
+def applied_versions(db_engine: Engine) -> List[int]:
+    with db_engine.connect() as conn:
+        return list(conn.execute(select(SchemaMigration.version).order_by(SchemaMigration.version)).scalars())
+
+
+def run_migrations(db_engine: Engine, lock_timeout: float = 60) -> List[int]:
+    """依序套用尚未套用的遷移，回傳本次套用的版本"""
+    _create_bookkeeping_tables(db_engine)
+    owner = acquire_lock(db_engine, timeout=lock_timeout)
+    try:
+        # 取得鎖後才讀取已套用的版本，等待期間其他行程套用的遷移不會重複執行
+        applied = set(applied_versions(db_engine))
+        newly_applied = []
+        for version in sorted(MIGRATIONS):
+            if version in applied:
+                continue
+            step = MIGRATIONS[version]
+            print(f"🛠️  執行遷移 {version:03d} {step.name}...")
+            if step.transactional:
+                with db_engine.begin() as conn:
+                    _refresh_schema_cache(conn)
+                    step.apply(conn)
+                    conn.execute(insert(SchemaMigration).values(version=version, name=step.name))
+            else:
+                with db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    _refresh_schema_cache(conn)
+                    step.apply(conn)
+                with db_engine.begin() as conn:
+                    conn.execute(insert(SchemaMigration).values(version=version, name=step.name))
+            newly_applied.append(version)
+        return newly_applied
+    finally:
+        release_lock(db_engine, owner)
+
+
+async def schema_version(db: AsyncSession) -> int:
+    """目前的結構版本；尚未執行過遷移時為 0"""
+    try:
+        result = await db.execute(select(func.max(SchemaMigration.version)))
+    except DBAPIError:
+        await db.rollback()
+        return 0
+    return result.scalar() or 0
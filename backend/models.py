@@ -1,9 +1,17 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 import enum
 
+# 作為游標排序鍵的時間欄位：SQLite 以文字儲存時間，綁定參數須與 server_default
+# CURRENT_TIMESTAMP 的格式（不含微秒）一致，(created_at, id) 的比較才不會把同一列判斷為較小
+SortableDateTime = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
 class TargetType(enum.Enum):
     POST = "post"
     COMMENT = "comment"
@@ -27,12 +35,30 @@ class User(Base):
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # 貼文列表排序：置頂優先，其次依建立時間
+        Index("ix_posts_pinned_created", "is_pinned", "created_at"),
+        # 未推送到動態時報的貼文（高發文量作者），讀取時依相同排序合併
+        Index("ix_posts_fanout_pinned_created", "fanned_out", "is_pinned", "created_at"),
+        # 計算作者近期發文量
+        Index("ix_posts_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     is_pinned = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 反正規化計數（由 counters.py 維護）
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    top_level_comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # 建立時是否已推送到各使用者的動態時報（高發文量作者為 False，改在讀取時合併）
+    fanned_out = Column(Boolean, nullable=False, default=True, server_default="1")
+    # 刪除墓碑：非 NULL 時所有讀取視為不存在，留言與按讚由背景工作批次刪除後再刪除貼文
+    deleted_at = Column(SortableDateTime, nullable=True)
+    # 貼文或其留言、按讚變更時遞增（versions.py），用於 ETag / Last-Modified
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    modified_at = Column(SortableDateTime, server_default=func.now())
+    created_at = Column(SortableDateTime, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # 關聯
@@ -42,6 +68,10 @@ class Post(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # 依貼文取得留言 / 頂層留言
+        Index("ix_comments_post_parent", "post_id", "parent_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
@@ -49,7 +79,10 @@ class Comment(Base):
     parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)  # 巢狀留言
     content = Column(Text, nullable=False)
     is_top_comment = Column(Boolean, default=False)  # 置頂留言
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 反正規化計數（由 counters.py 維護）
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(SortableDateTime, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # 關聯
@@ -60,6 +93,14 @@ class Comment(Base):
 
 class Like(Base):
     __tablename__ = "likes"
+    __table_args__ = (
+        # 每位使用者對同一目標只能按讚一次，同時用於查詢按讚狀態
+        Index("uq_likes_user_target", "user_id", "target_type", "target_id", unique=True),
+        # 依目標查詢按讚
+        Index("ix_likes_target", "target_type", "target_id"),
+        # 依使用者查詢按讚，並以 id 游標分頁
+        Index("ix_likes_user", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -72,6 +113,12 @@ class Like(Base):
 
 class Blacklist(Base):
     __tablename__ = "blacklists"
+    __table_args__ = (
+        # 同一位使用者不能重複封鎖同一人，同時用於黑名單檢查
+        Index("uq_blacklists_user_blocked", "user_id", "blocked_user_id", unique=True),
+        # 反向查詢：被哪些使用者封鎖
+        Index("ix_blacklists_blocked_user", "blocked_user_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -81,3 +128,66 @@ class Blacklist(Base):
     # 關聯
     user = relationship("User", foreign_keys=[user_id], back_populates="blacklists")
     blocked_user = relationship("User", foreign_keys=[blocked_user_id], back_populates="blocked_by")
+
+class Timeline(Base):
+    """已建立動態時報的使用者（首次讀取時建立，之後由發文推送維護）"""
+    __tablename__ = "timelines"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class TimelineEntry(Base):
+    """使用者動態時報中的一篇貼文，排序鍵與 posts 相同，讀取時為單一索引範圍掃描"""
+    __tablename__ = "timeline_entries"
+    __table_args__ = (
+        # 動態時報讀取：依使用者、置頂、建立時間排序
+        Index("ix_timeline_entries_feed", "user_id", "is_pinned", "created_at", "post_id"),
+        # 貼文置頂變更、刪除時更新所有時報
+        Index("ix_timeline_entries_post", "post_id"),
+        # 封鎖時移除該作者的貼文
+        Index("ix_timeline_entries_user_author", "user_id", "author_id"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    is_pinned = Column(Boolean, nullable=False, default=False)
+    created_at = Column(SortableDateTime, nullable=False)
+
+class Job(Base):
+    """背景工作（寫入副作用），與觸發它的寫入在同一個交易中建立"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # 取出到期的待處理工作
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    # 可讀的標籤（工作種類與資料列 ID），供查詢與除錯；不唯一，不用於去重
+    label = Column(String(200), nullable=True)
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    run_after = Column(SortableDateTime, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(SortableDateTime, server_default=func.now(), onupdate=func.now())
+
+
+class SchemaMigration(Base):
+    """已套用的資料庫遷移（migrations.py），最大的 version 即目前的結構版本"""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SchemaMigrationLock(Base):
+    """遷移鎖：同一時間只有一個行程能執行遷移（id 固定為 1，插入成功即取得）"""
+    __tablename__ = "schema_migration_lock"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    owner = Column(String(200), nullable=False)
+    locked_at = Column(SortableDateTime, nullable=False)
@@ -0,0 +1,56 @@
+"""
+游標（keyset）分頁
+游標為排序鍵值的 base64 編碼，對用戶端不透明；下一頁以 WHERE (排序鍵) < (游標) 取代 OFFSET，
+深頁延遲不隨頁數增加，新資料插入時也不會造成重複或遺漏。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+# 下一頁游標以 Response Header 回傳，列表本身維持原本的陣列格式
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _decode_value(value, kind: type):
+    """依位置的型別檢查游標值：時間為 {"dt": ISO 字串}，其餘為整數（布林值編碼為 0/1）"""
+    if kind is datetime:
+        if not isinstance(value, dict) or set(value) != {"dt"} or not isinstance(value["dt"], str):
+            raise ValueError
+        return datetime.fromisoformat(value["dt"])
+    if not isinstance(value, int):
+        raise ValueError
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    """將排序鍵值編碼為游標"""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, kinds: Sequence[type]) -> Optional[List]:
+    """解碼游標；kinds 為各位置的型別（int 或 datetime）。空字串代表第一頁（回傳 None），格式或型別錯誤時回傳 400"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(kinds):
+            raise ValueError
+        return [_decode_value(value, kind) for value, kind in zip(values, kinds)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無效的分頁游標"
+        )
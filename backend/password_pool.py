@@ -0,0 +1,116 @@
+"""
+密碼雜湊工作池
+bcrypt 每次運算需要數十毫秒 CPU，改在執行緒/行程池中執行，避免登入尖峰凍結事件迴圈。
+等待中的工作數量有上限，超過時回傳 503 並帶 Retry-After，讓用戶端稍後重試。
+"""
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+
+from auth import get_password_hash, verify_password
+from config import settings
+
+
+def _timed(func: Callable, *args):
+    """在工作者中執行並回傳 (執行秒數, 結果)，等待時間由呼叫端扣除"""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+class PasswordHashPool:
+    """有界的密碼雜湊工作池"""
+
+    def __init__(self, executor_kind: str = "thread", workers: int = 4,
+                 max_pending: int = 64, retry_after: int = 1):
+        if executor_kind not in ("thread", "process"):
+            raise ValueError(f"未知的 executor 類型: {executor_kind}")
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+        # 計時統計
+        self.calls = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_wait = 0.0
+        self.max_run = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _submit(self, func: Callable, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="伺服器忙碌中，請稍後再試",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            run_time, result = await loop.run_in_executor(self._get_executor(), _timed, func, *args)
+        finally:
+            self._pending -= 1
+
+        wait_time = max(time.perf_counter() - submitted - run_time, 0.0)
+        self.calls += 1
+        self.total_wait += wait_time
+        self.total_run += run_time
+        self.max_wait = max(self.max_wait, wait_time)
+        self.max_run = max(self.max_run, run_time)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """在工作池中產生密碼雜湊"""
+        return await self._submit(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """在工作池中驗證密碼"""
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """目前的佇列深度與計時統計（毫秒）"""
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "bcrypt_rounds": settings.bcrypt_rounds,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.calls * 1000, 3) if self.calls else 0.0,
+            "avg_run_ms": round(self.total_run / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "max_run_ms": round(self.max_run * 1000, 3),
+        }
+
+    def shutdown(self):
+        """關閉工作池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# 全域工作池
+password_pool = PasswordHashPool(
+    executor_kind=settings.password_hash_executor,
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    retry_after=settings.password_hash_retry_after,
+)
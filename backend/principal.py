@@ -0,0 +1,121 @@
+"""
+輕量使用者身分（Principal）與使用者快取
+Principal 只包含公開欄位，可由 JWT claims 直接建立，不需查詢資料庫；
+UserCache 以短 TTL + LRU 上限快取 Principal，使用者資料變更時透過事件失效。
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+
+from config import settings
+from models import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """已驗證的使用者身分"""
+    id: int
+    username: str
+    email: str
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, username=user.username, email=user.email, created_at=user.created_at)
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["Principal"]:
+        """由 JWT claims 建立，缺少欄位時回傳 None"""
+        try:
+            return cls(
+                id=int(payload["uid"]),
+                username=payload["sub"],
+                email=payload["email"],
+                created_at=datetime.fromisoformat(payload["created_at"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def to_claims(self) -> dict:
+        return {
+            "sub": self.username,
+            "uid": self.id,
+            "email": self.email,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class UserCache:
+    """以使用者名稱為鍵的 TTL + LRU 快取"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 30):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # username -> (過期時間, Principal)
+        self._usernames = {}  # user_id -> username，供依 ID 失效
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[Principal]:
+        entry = self._entries.get(username)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(username)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, principal: Principal):
+        self.invalidate(user_id=principal.id, username=principal.username)
+        self._entries[principal.username] = (time.monotonic() + self.ttl_seconds, principal)
+        self._usernames[principal.id] = principal.username
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, user_id: Optional[int] = None, username: Optional[str] = None):
+        """移除指定使用者（依 ID 或使用者名稱）"""
+        if user_id is not None and user_id in self._usernames:
+            self._remove(self._usernames[user_id])
+        if username is not None and username in self._entries:
+            self._remove(username)
+
+    def _remove(self, username: str):
+        _, principal = self._entries.pop(username)
+        self._usernames.pop(principal.id, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._usernames.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def invalidate_user(user: User):
+    """使用者資料變更時的失效 hook"""
+    user_cache.invalidate(user_id=user.id, username=user.username)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    # 使用者名稱可能已變更，依 ID 一併清除舊鍵
+    invalidate_user(target)
+
+
+# 全域使用者快取
+user_cache = UserCache(max_size=settings.user_cache_max_size, ttl_seconds=settings.user_cache_ttl_seconds)
@@ -3,9 +3,12 @@
 社群平台後端 API 啟動腳本
 """
 import uvicorn
-from main import app
+from database import engine
+from migrations import run_migrations
 
 if __name__ == "__main__":
+    # 開發環境：啟動前執行一次遷移（部署時改由 python init_db.py migrate 執行，worker 啟動時不變更結構）
+    run_migrations(engine)
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -75,6 +75,8 @@ class CommentResponse(CommentBase):
     updated_at: Optional[datetime] = None
     likes_count: int = 0
     is_liked: bool = False  # 當前用戶是否已按讚
+    reply_count: int = 0  # 直接回覆總數（不受分頁或深度限制影響）
+    replies_cursor: Optional[str] = None  # 尚有未載入的回覆時，傳給 replies 端點的游標
     replies: List['CommentResponse'] = Field(default_factory=list)
     
     class Config:
@@ -105,10 +107,43 @@ class LikeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# 依目標彙總的按讚數（GET /likes/counts）
+class LikeCount(BaseModel):
+    target_type: TargetType
+    target_id: int
+    likes_count: int
+
+# 按讚切換（PUT / DELETE /likes/{target_type}/{target_id}）的結果
+class LikeState(BaseModel):
+    target_type: TargetType
+    target_id: int
+    is_liked: bool  # 當前用戶是否已按讚
+    likes_count: int
+
+# 批次寫入的每筆結果：status 為 created / exists / duplicate / not_found / forbidden / invalid
+class BulkItemResult(BaseModel):
+    index: int  # 在請求陣列中的位置
+    status: str
+    id: Optional[int] = None  # 新建立的記錄 ID（status 為 created 時）
+    detail: Optional[str] = None  # 未建立的原因
+
+class LikeBulkCreate(BaseModel):
+    items: List[LikeCreate]
+
+class LikeBulkResult(BulkItemResult):
+    target_type: TargetType
+    target_id: int
+
 # 黑名單相關 Schema
 class BlacklistCreate(BaseModel):
     blocked_user_id: int
 
+class BlacklistBulkCreate(BaseModel):
+    blocked_user_ids: List[int]
+
+class BlacklistBulkResult(BulkItemResult):
+    blocked_user_id: int
+
 class BlacklistResponse(BaseModel):
     id: int
     user_id: int
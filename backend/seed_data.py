@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import User, Post, Comment, Like, Blacklist, TargetType
 from auth import get_password_hash
+from counters import reconcile_counters
 from datetime import datetime, timedelta
 import random
 
@@ -163,6 +164,10 @@ def create_seed_data():
             db.commit()
             print("✅ 置頂留言設定完成")
         
+        # 7. 計算按讚數與留言數計數欄位
+        reconcile_counters(db)
+        print("✅ 計數欄位計算完成")
+        
         print("\n🎉 種子資料建立完成！")
         print("\n📝 測試帳號:")
         for i, user_data in enumerate(users_data):
@@ -0,0 +1,40 @@
+"""
+快速序列化路徑（FAST_SERIALIZATION=true）
+熱點列表路由組出的 dict 已符合 PostResponse / CommentResponse 的欄位，
+一般路徑仍會經由 response_model 逐節點驗證（作者 ORM 物件走 from_attributes、回覆樹遞迴驗證）再序列化；
+快速路徑視這些 dict 為可信任的內部資料，直接序列化為 JSON bytes 並以原始 Response 回傳。
+有安裝 orjson 時使用 orjson，否則使用 pydantic_core.to_json；兩者都不做驗證。
+"""
+from typing import Optional
+
+from fastapi import Response
+from pydantic_core import to_json
+
+from models import User
+
+try:
+    import orjson
+except ImportError:  # 選用套件
+    orjson = None
+
+
+def _default(value):
+    """序列化器不認得的物件：目前只有作者（User ORM 物件），欄位與 UserResponse 相同"""
+    if isinstance(value, User):
+        return {"username": value.username, "email": value.email, "id": value.id, "created_at": value.created_at}
+    raise TypeError(f"無法序列化 {type(value).__name__}")
+
+
+def dumps(data) -> bytes:
+    """將可信任的回應資料序列化為 JSON（日期時間格式與 pydantic 相同，UTC 以 Z 結尾）"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z)
+    return to_json(data, fallback=_default)
+
+
+def json_response(data, response: Optional[Response] = None) -> Response:
+    """以序列化後的 bytes 建立回應，保留路由在注入的 Response 上設定的 Header（例如 X-Next-Cursor）"""
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(content=dumps(data), media_type="application/json", headers=headers)
@@ -0,0 +1,51 @@
+"""
+串流 JSON 回應
+大型列表不先組成完整的 list 再交給 response_model 驗證與序列化：
+以 server-side cursor（yield_per）逐批取出資料列並逐筆序列化，累積到 STREAM_CHUNK_BYTES 才送出，
+記憶體用量只與批次大小有關，用戶端也不需等待整個結果就能收到第一個位元組。
+"""
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from config import settings
+from database import AsyncSessionLocal
+
+
+async def stream_scalars(statement: Select) -> AsyncIterator:
+    """以 server-side cursor 逐批取出查詢結果（ORM 物件）
+
+    使用獨立的會話：串流期間請求的會話可能已結束，查詢也不應佔用請求的交易。
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=settings.stream_yield_per))
+        async for partition in result.scalars().partitions():
+            for row in partition:
+                yield row
+
+
+async def _json_array(items: AsyncIterator[str]) -> AsyncIterator[str]:
+    """將逐筆序列化的 JSON 組成陣列，每累積 STREAM_CHUNK_BYTES 送出一次"""
+    buffer, size, separator = ["["], 1, ""
+    async for item in items:
+        buffer.append(separator)
+        buffer.append(item)
+        size += len(item) + 1
+        separator = ","
+        if size >= settings.stream_chunk_bytes:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    buffer.append("]")
+    yield "".join(buffer)
+
+
+def stream_json_array(
+    rows: AsyncIterator, serialize: Callable[[object], str], headers: Optional[dict] = None
+) -> StreamingResponse:
+    """以 JSON 陣列串流回傳，serialize 將一筆資料轉為 JSON 字串"""
+    async def items():
+        async for row in rows:
+            yield serialize(row)
+
+    return StreamingResponse(_json_array(items()), media_type="application/json", headers=headers)
@@ -0,0 +1,257 @@
+"""
+動態時報（fan-out-on-write）
+每位使用者的動態時報以 timeline_entries 實體化，讀取時為 (user_id, is_pinned, created_at, post_id)
+上的單一索引範圍掃描，不再對整個 posts 表排序與過濾黑名單。
+
+- 首次讀取時建立時報（回填最新的 TIMELINE_MAX_ENTRIES 篇可見貼文），未讀取過的使用者不佔空間
+- 發文時以一個 INSERT ... SELECT 推送到所有已建立的時報（排除封鎖作者的使用者），
+  之後只在收到貼文的時報中刪除排在 TIMELINE_MAX_ENTRIES 之後的一筆（索引範圍掃描），時報大小不隨貼文總數成長
+- 時報只保證涵蓋排序鍵不小於其最舊項目的貼文；讀完時報後，更舊的貼文從 posts 以相同排序鍵接續（索引範圍掃描）
+- 高發文量作者（近 24 小時發文數達上限）不推送，貼文標記 fanned_out = False，
+  讀取時從 posts 以相同排序鍵取出並與時報合併（fan-out-on-read）
+- 置頂、刪除、封鎖、解除封鎖時增量修復受影響的時報項目
+"""
+from datetime import datetime, timedelta, timezone
+from typing import FrozenSet, List, Optional
+
+from sqlalchemy import Boolean, Integer, delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from config import settings
+from models import Post, Blacklist, Timeline, TimelineEntry, SortableDateTime
+
+ENTRY_COLUMNS = ["user_id", "post_id", "author_id", "is_pinned", "created_at"]
+
+
+def feed_key(row) -> tuple:
+    """貼文列表排序鍵：置頂優先，其次依建立時間、ID 由新到舊"""
+    return (bool(row.is_pinned), row.created_at, row.id)
+
+
+def _entry_key(entry=TimelineEntry):
+    return tuple_(entry.is_pinned, entry.created_at, entry.post_id)
+
+
+def _post_key():
+    return tuple_(func.coalesce(Post.is_pinned, False), Post.created_at, Post.id)
+
+
+def _visible_posts(user_id):
+    """使用者可見且已推送的貼文，欄位順序對應 ENTRY_COLUMNS"""
+    blocked = select(Blacklist.blocked_user_id).where(Blacklist.user_id == user_id)
+    return select(
+        literal(user_id, Integer), Post.id, Post.user_id, func.coalesce(Post.is_pinned, False), Post.created_at
+    ).where(Post.fanned_out == True, Post.deleted_at.is_(None), Post.user_id.notin_(blocked))
+
+
+async def _backfill(db: AsyncSession, user_id: int):
+    """回填最新的 timeline_max_entries 篇可見貼文（不 commit）"""
+    await db.execute(insert(TimelineEntry).from_select(ENTRY_COLUMNS, _visible_posts(user_id).order_by(
+        func.coalesce(Post.is_pinned, False).desc(), Post.created_at.desc(), Post.id.desc()
+    ).limit(settings.timeline_max_entries)))
+
+
+async def ensure_timeline(db: AsyncSession, user_id: int):
+    """時報不存在時建立並回填（已 commit）；並發建立時以主鍵衝突判定由另一個請求完成"""
+    if await db.get(Timeline, user_id) is not None:
+        return
+    try:
+        db.add(Timeline(user_id=user_id))
+        await db.flush()
+        await _backfill(db, user_id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+
+
+def _feed_order(entry=TimelineEntry):
+    return (entry.is_pinned.desc(), entry.created_at.desc(), entry.post_id.desc())
+
+
+def overflow_after_fan_out(post_id: int):
+    """推送（或置頂重新推送）後的修剪語句：每個收到該貼文的時報最多多出一筆，
+    沿 (user_id, is_pinned, created_at, post_id) 索引找到排在第 timeline_max_entries + 1 位的項目並刪除
+
+    只處理含有該貼文的時報（由 post_id 索引找出），未滿的時報子查詢為 NULL 不刪除。
+    """
+    received = aliased(TimelineEntry)
+    entry = aliased(TimelineEntry)
+    overflow = select(entry.post_id).where(entry.user_id == received.user_id).order_by(
+        *_feed_order(entry)
+    ).offset(settings.timeline_max_entries).limit(1).scalar_subquery()
+    return delete(TimelineEntry).where(tuple_(TimelineEntry.user_id, TimelineEntry.post_id).in_(
+        select(received.user_id, overflow).where(received.post_id == post_id)
+    ))
+
+
+async def trim(db: AsyncSession, user_id: int):
+    """使用者的時報只保留排序最前的 timeline_max_entries 筆（不 commit）
+
+    沿索引找到第 timeline_max_entries 筆，刪除排在其後的項目；被修剪的貼文讀取時由 posts 接續。
+    """
+    result = await db.execute(
+        select(TimelineEntry.is_pinned, TimelineEntry.created_at, TimelineEntry.post_id)
+        .where(TimelineEntry.user_id == user_id)
+        .order_by(*_feed_order())
+        .offset(settings.timeline_max_entries - 1)
+        .limit(1)
+    )
+    last = result.one_or_none()
+    if last is not None:
+        await db.execute(delete(TimelineEntry).where(
+            TimelineEntry.user_id == user_id, _entry_key() < tuple(last)
+        ))
+
+
+async def is_high_volume(db: AsyncSession, author_id: int, before_post_id: Optional[int] = None) -> bool:
+    """作者近 24 小時發文數是否達到推送上限（before_post_id：只計算該貼文之前的貼文）"""
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    query = select(func.count(Post.id)).where(Post.user_id == author_id, Post.created_at >= since)
+    if before_post_id is not None:
+        query = query.where(Post.id < before_post_id)
+    result = await db.execute(query)
+    return result.scalar_one() >= settings.timeline_fanout_max_daily_posts
+
+
+async def fan_out(db: AsyncSession, post: Post):
+    """將貼文（已 flush）推送到所有已建立的時報並修剪（不 commit）
+
+    推送延遲執行時，期間新建立的時報可能已回填此貼文，以 NOT EXISTS 略過；
+    貼文比時報最舊的項目還舊時也略過（讀取時由 posts 接續），避免時報涵蓋的範圍出現缺口。
+    貼文欄位以常數帶入，不與 posts JOIN。
+    """
+    key = (bool(post.is_pinned), post.created_at, post.id)
+    blockers = select(Blacklist.user_id).where(Blacklist.blocked_user_id == post.user_id)
+    own = select(TimelineEntry.post_id).where(TimelineEntry.user_id == Timeline.user_id)
+    already = own.where(TimelineEntry.post_id == post.id).exists()
+    older = own.where(_entry_key() < tuple_(*key)).exists()
+    await db.execute(insert(TimelineEntry).from_select(ENTRY_COLUMNS, select(
+        Timeline.user_id, literal(post.id, Integer), literal(post.user_id, Integer),
+        literal(key[0], Boolean), literal(post.created_at, SortableDateTime)
+    ).where(Timeline.user_id.notin_(blockers), ~already, older | ~own.exists())))
+    await db.execute(overflow_after_fan_out(post.id))
+
+
+async def set_pinned(db: AsyncSession, post: Post):
+    """同步所有時報中該貼文的置頂狀態（post.is_pinned 已更新，不 commit）
+
+    置頂後排序鍵變大：已被修剪的時報重新推送；取消置頂後成為時報最舊項目的移除，由 posts 接續。
+    """
+    await db.execute(update(TimelineEntry).where(TimelineEntry.post_id == post.id).values(is_pinned=post.is_pinned))
+    if post.is_pinned:
+        if post.fanned_out:
+            await fan_out(db, post)
+        return
+    older = aliased(TimelineEntry)
+    await db.execute(delete(TimelineEntry).where(
+        TimelineEntry.post_id == post.id,
+        ~select(older.post_id).where(older.user_id == TimelineEntry.user_id, _entry_key(older) < _entry_key()).exists()
+    ))
+
+
+async def remove_post(db: AsyncSession, post_id: int):
+    """從所有時報移除貼文（不 commit）"""
+    await db.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id))
+
+
+async def on_block(db: AsyncSession, user_id: int, blocked_user_id: int):
+    """封鎖後移除時報中該作者的貼文（不 commit）"""
+    await db.execute(delete(TimelineEntry).where(
+        TimelineEntry.user_id == user_id,
+        TimelineEntry.author_id == blocked_user_id
+    ))
+
+
+async def on_block_many(db: AsyncSession, user_id: int, blocked_user_ids: List[int]):
+    """一次封鎖多位作者後移除時報中這些作者的貼文（不 commit）"""
+    await db.execute(delete(TimelineEntry).where(
+        TimelineEntry.user_id == user_id,
+        TimelineEntry.author_id.in_(blocked_user_ids)
+    ))
+
+
+async def on_unblock(db: AsyncSession, user_id: int, blocked_user_id: int):
+    """解除封鎖後將該作者已推送的貼文補回時報（時報尚未建立時略過，不 commit）
+
+    只補回排序鍵大於時報最舊項目的貼文，更舊的由 posts 接續；時報已清空時重新回填。
+    """
+    if await db.get(Timeline, user_id) is None:
+        return
+    result = await db.execute(
+        select(TimelineEntry.is_pinned, TimelineEntry.created_at, TimelineEntry.post_id)
+        .where(TimelineEntry.user_id == user_id)
+        .order_by(TimelineEntry.is_pinned, TimelineEntry.created_at, TimelineEntry.post_id)
+        .limit(1)
+    )
+    oldest = result.one_or_none()
+    if oldest is None:
+        # 回填依黑名單過濾，先寫入已刪除的黑名單記錄
+        await db.flush()
+        await _backfill(db, user_id)
+        return
+    await db.execute(insert(TimelineEntry).from_select(ENTRY_COLUMNS, select(
+        literal(user_id, Integer), Post.id, Post.user_id, func.coalesce(Post.is_pinned, False), Post.created_at
+    ).where(
+        Post.fanned_out == True, Post.deleted_at.is_(None), Post.user_id == blocked_user_id,
+        _post_key() > tuple(oldest)
+    )))
+    await trim(db, user_id)
+
+
+async def read_timeline(
+    db: AsyncSession,
+    user_id: int,
+    blocked: FrozenSet[int],
+    limit: int,
+    after: Optional[list] = None,
+    skip: int = 0,
+) -> List[tuple]:
+    """讀取一頁動態時報的排序鍵 (id, is_pinned, created_at)
+
+    時報與未推送貼文各為一次索引範圍掃描，兩者互斥，依排序鍵合併後取 skip 之後的 limit 筆。
+    時報讀完（回傳不足一頁）時，從 posts 接續時報最後一筆之後已推送的貼文（被修剪或未回填的較舊貼文）。
+    """
+    count = skip + limit
+    entry = TimelineEntry
+    timeline_query = select(
+        entry.post_id.label("id"), entry.is_pinned, entry.created_at
+    ).where(entry.user_id == user_id).order_by(
+        entry.is_pinned.desc(), entry.created_at.desc(), entry.post_id.desc()
+    )
+    pulled_query = select(Post.id, Post.is_pinned, Post.created_at).where(
+        Post.fanned_out == False, Post.deleted_at.is_(None)
+    ).order_by(
+        Post.is_pinned.desc(), Post.created_at.desc(), Post.id.desc()
+    )
+    if blocked:
+        pulled_query = pulled_query.where(Post.user_id.notin_(sorted(blocked)))
+    if after is not None:
+        timeline_query = timeline_query.where(tuple_(entry.is_pinned, entry.created_at, entry.post_id) < tuple(after))
+        pulled_query = pulled_query.where(tuple_(Post.is_pinned, Post.created_at, Post.id) < tuple(after))
+
+    rows = list((await db.execute(timeline_query.limit(count))).all())
+    if len(rows) < count:
+        boundary = feed_key(rows[-1]) if rows else after
+        older_query = select(Post.id, Post.is_pinned, Post.created_at).where(
+            Post.fanned_out == True, Post.deleted_at.is_(None)
+        ).order_by(
+            Post.is_pinned.desc(), Post.created_at.desc(), Post.id.desc()
+        )
+        if blocked:
+            older_query = older_query.where(Post.user_id.notin_(sorted(blocked)))
+        if boundary is not None:
+            older_query = older_query.where(tuple_(Post.is_pinned, Post.created_at, Post.id) < tuple(boundary))
+        rows += (await db.execute(older_query.limit(count - len(rows)))).all()
+    rows += (await db.execute(pulled_query.limit(count))).all()
+    rows.sort(key=feed_key, reverse=True)
+    return rows[skip:count]
+
+
+def reset_timelines(db: Session) -> int:
+    """清除所有時報（下次讀取時重建），用於在 API 之外匯入貼文後；回傳清除的時報數"""
+    db.execute(delete(TimelineEntry))
+    result = db.execute(delete(Timeline))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,83 @@
+"""
+貼文版本與條件式 GET
+posts.version 在貼文內容、置頂、留言、按讚（貼文或其留言）、置頂留言變更時遞增，posts.modified_at 記錄最後變更時間。
+GET /posts/{id} 與留言列表以此產生 ETag / Last-Modified；用戶端帶 If-None-Match（或 If-Modified-Since）
+且未變更時，只需一次主鍵查詢就回傳 304，不載入貼文內容、不組裝留言樹。
+回應中的 is_liked 因使用者而異，ETag 包含使用者 ID。
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Post, Comment
+
+
+def _bump():
+    # 版本變更不代表貼文內容被編輯，保留 updated_at
+    return {"version": Post.version + 1, "modified_at": func.now(), "updated_at": Post.updated_at}
+
+
+async def bump_post_version(db: AsyncSession, *post_ids: int):
+    """貼文或其留言有變更時遞增版本（不 commit）"""
+    await db.execute(
+        update(Post).where(Post.id.in_(post_ids)).values(**_bump()).execution_options(synchronize_session=False)
+    )
+
+
+async def bump_comment_post_versions(db: AsyncSession, comment_ids: List[int]):
+    """留言有變更時遞增其所屬貼文的版本（不 commit）"""
+    await db.execute(
+        update(Post).where(
+            Post.id.in_(select(Comment.post_id).where(Comment.id.in_(comment_ids)))
+        ).values(**_bump()).execution_options(synchronize_session=False)
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite 取回的時間不含時區，以 UTC 儲存
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def post_etag(kind: str, post_id: int, version: int, viewer_id: int) -> str:
+    """kind 區分同一貼文的不同資源（post / comments）"""
+    return f'W/"{kind}-{post_id}-{version}-{viewer_id}"'
+
+
+def conditional_headers(etag: str, modified_at: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if modified_at is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(modified_at).replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, modified_at: Optional[datetime]) -> bool:
+    """If-None-Match 優先；沒有時才比較 If-Modified-Since（精確到秒）"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag.removeprefix("W/") in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(modified_at).replace(microsecond=0) <= since
+    return False
+
+
+def conditional_response(
+    request: Request, response: Response, etag: str, modified_at: Optional[datetime]
+) -> Optional[Response]:
+    """設定 ETag / Last-Modified；未變更時回傳 304 回應，否則回傳 None 由路由繼續組裝內容"""
+    headers = conditional_headers(etag, modified_at)
+    if is_not_modified(request, etag, modified_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
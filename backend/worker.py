@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+背景工作 worker
+JOBS_MODE=worker 時 API 只將寫入副作用記錄到 jobs 表，由一或多個 worker 行程輪詢執行；
+多個行程以條件式 UPDATE 取得工作，同一個工作只會由一個行程執行。
+
+用法:
+    python worker.py [並發數]
+"""
+import asyncio
+import sys
+
+from config import settings
+from database import async_engine
+from jobs import JobQueue
+
+
+async def main(workers: int):
+    queue = JobQueue(workers=workers, poll_interval=settings.jobs_poll_interval_seconds)
+    await queue.start()
+    print(f"🚀 worker 已啟動（並發數 {workers}，每 {settings.jobs_poll_interval_seconds} 秒輪詢 jobs 表）")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await queue.stop()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else settings.jobs_workers))
+    except KeyboardInterrupt:
+        print("👋 worker 已停止")
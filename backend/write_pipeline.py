@@ -0,0 +1,156 @@
+"""
+單一寫入者的 group commit 管線
+SQLite 同一時間只有一個連線能寫入，每個請求各自 commit 時，寫入者互相等待寫入鎖，且每次 commit 各做一次 fsync。
+啟用 WRITE_PIPELINE_ENABLED 後，建立貼文、留言、按讚的寫入交給單一寫入者工作：每隔數毫秒收集等待中的寫入，
+在同一個交易中依序執行後一次 commit，各請求的 future 分別得到自己的結果（ORM 物件）或例外。
+
+批次中任一寫入失敗（例如唯一索引衝突）或 commit 失敗時整批回滾，改為逐筆各自交易重跑，
+失敗的寫入只影響自己的請求。管線在單一行程內運作，多個 uvicorn worker 各自有一個寫入者。
+"""
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from jobs import dispatch
+
+T = TypeVar("T")
+Write = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WritePipeline:
+    """收集多個請求的寫入，以單一交易批次 commit"""
+
+    def __init__(self, max_batch: int = 256, max_delay_ms: float = 2.0):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.writes = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.fallbacks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        """處理完已送出的寫入後停止"""
+        if self._task is None:
+            return
+        while self._queue.qsize():
+            await asyncio.sleep(self.max_delay)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def submit(self, write: Write) -> T:
+        """送出寫入並等待所在批次 commit；write 在寫入者的會話中執行，不自行 commit"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((write, future))
+        return await future
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # 已中斷的請求（用戶端斷線）不再寫入
+            batch = [(write, future) for write, future in batch if not future.cancelled()]
+            if batch:
+                try:
+                    await self._run_batch(batch)
+                except Exception as e:
+                    print(f"⚠️  寫入批次失敗: {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+
+    async def _run_batch(self, batch: List[Tuple[Write, asyncio.Future]]):
+        async with AsyncSessionLocal() as db:
+            try:
+                results = [await write(db) for write, _ in batch]
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                db.info.clear()
+                self.fallbacks += 1
+                await self._run_each(batch)
+                return
+            await dispatch(db)
+
+        self.writes += len(batch)
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_each(self, batch: List[Tuple[Write, asyncio.Future]]):
+        """批次失敗時逐筆各自交易執行"""
+        for write, future in batch:
+            async with AsyncSessionLocal() as db:
+                try:
+                    result = await write(db)
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                await dispatch(db)
+            self.writes += 1
+            self.batches += 1
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "writes": self.writes,
+            "batches": self.batches,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch_seen,
+            "fallbacks": self.fallbacks,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+# 全域寫入管線（WRITE_PIPELINE_ENABLED 時由應用程式啟動）
+write_pipeline = WritePipeline(
+    max_batch=settings.write_pipeline_max_batch,
+    max_delay_ms=settings.write_pipeline_max_delay_ms
+)
+
+
+async def run_write(db: AsyncSession, write: Write) -> T:
+    """執行一個寫入並 commit，回傳 write 的結果（ORM 物件）
+
+    未啟用管線時在請求的會話中執行並 commit；啟用時交給寫入者批次 commit，
+    再依主鍵在請求的會話中重新載入（寫入者的會話已關閉，INSERT 未帶的欄位不會載入），呼叫端可照常 refresh 關聯。
+    """
+    if not write_pipeline.running:
+        result = await write(db)
+        await db.commit()
+        await dispatch(db)
+        return result
+    # 結束請求會話的讀取交易，等待寫入者期間不佔用連線池（否則並發請求可能用盡連線，寫入者無法取得連線）
+    await db.commit()
+    result = await write_pipeline.submit(write)
+    return await db.get(type(result), inspect(result).identity)
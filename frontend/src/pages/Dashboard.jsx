@@ -10,6 +10,8 @@ const Dashboard = () => {
   const [newPost, setNewPost] = useState('')
   const [showCreateForm, setShowCreateForm] = useState(false)
   const [creating, setCreating] = useState(false)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   
   const { user } = useAuth()
 
@@ -19,6 +21,7 @@ const Dashboard = () => {
       setLoading(true)
       const response = await postsAPI.getPosts()
       setPosts(response.data)
+      setNextCursor(response.headers['x-next-cursor'] || null)
     } catch (err) {
       setError('載入貼文失敗')
     } finally {
@@ -26,6 +29,22 @@ const Dashboard = () => {
     }
   }
 
+  // 載入下一頁貼文
+  const loadMorePosts = async () => {
+    if (!nextCursor) return
+
+    try {
+      setLoadingMore(true)
+      const response = await postsAPI.getPosts(nextCursor)
+      setPosts(prev => [...prev, ...response.data])
+      setNextCursor(response.headers['x-next-cursor'] || null)
+    } catch (err) {
+      setError('載入貼文失敗')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   useEffect(() => {
     loadPosts()
   }, [])
@@ -55,25 +74,10 @@ const Dashboard = () => {
       const post = posts.find(p => p.id === postId)
       if (!post) return
 
-      // 檢查是否已按讚
-      if (post.is_liked) {
-        // 已按讚，需要取消按讚
-        const likesResponse = await likesAPI.getLikes('post', postId)
-        const likes = likesResponse.data
-        const userLike = likes.find(like => like.user_id === user?.id)
-        
-        if (userLike) {
-          await likesAPI.deleteLike(userLike.id)
-        }
-      } else {
-        // 未按讚，新增按讚
-        await likesAPI.createLike({
-          target_type: 'post',
-          target_id: postId
-        })
-      }
-      
-      loadPosts() // 重新載入以更新按讚數
+      // 依目前狀態切換，回應直接帶回最新的按讚狀態與按讚數
+      const response = await likesAPI.setLiked('post', postId, !post.is_liked)
+      const { is_liked, likes_count } = response.data
+      setPosts(prev => prev.map(p => p.id === postId ? { ...p, is_liked, likes_count } : p))
     } catch (err) {
       console.error('按讚操作失敗:', err)
       setError('按讚操作失敗')
@@ -256,6 +260,15 @@ const Dashboard = () => {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button
+              className="btn btn-secondary"
+              onClick={loadMorePosts}
+              disabled={loadingMore}
+            >
+              {loadingMore ? '載入中...' : '載入更多'}
+            </button>
+          )}
         </div>
       )}
     </div>
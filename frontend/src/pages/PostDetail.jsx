@@ -15,6 +15,7 @@ const PostDetail = () => {
   const [newComment, setNewComment] = useState('')
   const [replyingTo, setReplyingTo] = useState(null)
   const [creating, setCreating] = useState(false)
+  const [commentsCursor, setCommentsCursor] = useState(null)
 
   // 載入貼文詳情
   const loadPost = async () => {
@@ -29,16 +30,50 @@ const PostDetail = () => {
     }
   }
 
+  // 每頁頂層留言數、展開層數與每則留言預覽的回覆數
+  const COMMENT_PAGE = { limit: 20, max_depth: 3, reply_preview: 3 }
+
   // 載入留言列表
   const loadComments = async () => {
     try {
-      const response = await commentsAPI.getComments(id)
+      const response = await commentsAPI.getComments(id, { ...COMMENT_PAGE, cursor: '' })
       setComments(response.data)
+      setCommentsCursor(response.headers['x-next-cursor'] || null)
+    } catch (err) {
+      console.error('載入留言失敗:', err)
+    }
+  }
+
+  // 載入下一頁頂層留言
+  const loadMoreComments = async () => {
+    try {
+      const response = await commentsAPI.getComments(id, { ...COMMENT_PAGE, cursor: commentsCursor })
+      setComments(prev => [...prev, ...response.data])
+      setCommentsCursor(response.headers['x-next-cursor'] || null)
     } catch (err) {
       console.error('載入留言失敗:', err)
     }
   }
 
+  // 將載入的回覆接到留言樹中對應的節點
+  const appendReplies = (nodes, commentId, replies, cursor) => nodes.map(node => {
+    if (node.id === commentId) {
+      return { ...node, replies: [...node.replies, ...replies], replies_cursor: cursor }
+    }
+    return { ...node, replies: appendReplies(node.replies, commentId, replies, cursor) }
+  })
+
+  // 載入某則留言的更多回覆
+  const loadMoreReplies = async (comment) => {
+    try {
+      const response = await commentsAPI.getReplies(id, comment.id, comment.replies_cursor)
+      const cursor = response.headers['x-next-cursor'] || null
+      setComments(prev => appendReplies(prev, comment.id, response.data, cursor))
+    } catch (err) {
+      console.error('載入回覆失敗:', err)
+    }
+  }
+
   useEffect(() => {
     loadPost()
     loadComments()
@@ -65,36 +100,23 @@ const PostDetail = () => {
     }
   }
 
-  // 按讚/取消按讚功能（針對貼文與留言分支）
-  const handleLike = async (targetType, targetId) => {
+  // 更新留言樹中對應節點的欄位
+  const updateComment = (nodes, commentId, changes) => nodes.map(node => (
+    node.id === commentId
+      ? { ...node, ...changes }
+      : { ...node, replies: updateComment(node.replies, commentId, changes) }
+  ))
+
+  // 按讚/取消按讚功能（針對貼文與留言分支），回應直接帶回最新的按讚狀態與按讚數
+  const handleLike = async (targetType, targetId, isLiked) => {
     try {
+      const response = await likesAPI.setLiked(targetType, targetId, !isLiked)
+      const { is_liked, likes_count } = response.data
       if (targetType === 'post') {
-        // 使用當前貼文狀態決定按讚/取消
-        const likesResponse = await likesAPI.getLikes('post', targetId)
-        const likes = likesResponse.data
-        const userLike = likes.find(like => like.user_id === user?.id)
-
-        if (post?.is_liked && userLike) {
-          await likesAPI.deleteLike(userLike.id)
-        } else {
-          await likesAPI.createLike({ target_type: 'post', target_id: targetId })
-        }
-
-        await loadPost()
+        setPost(prev => ({ ...prev, is_liked, likes_count }))
       } else {
         // comment 分支（包含巢狀回覆）
-        const likesResponse = await likesAPI.getLikes('comment', targetId)
-        const likes = likesResponse.data
-        const userLike = likes.find(like => like.user_id === user?.id)
-
-        // 如果已有按讚記錄，則取消按讚；否則新增按讚
-        if (userLike) {
-          await likesAPI.deleteLike(userLike.id)
-        } else {
-          await likesAPI.createLike({ target_type: 'comment', target_id: targetId })
-        }
-
-        await loadComments()
+        setComments(prev => updateComment(prev, targetId, { is_liked, likes_count }))
       }
     } catch (err) {
       console.error('按讚操作失敗:', err)
@@ -171,7 +193,7 @@ const PostDetail = () => {
         <div className="d-flex gap-1">
           <button 
             className={`btn ${comment.is_liked ? 'btn-warning' : 'btn-success'}`}
-            onClick={() => handleLike('comment', comment.id)}
+            onClick={() => handleLike('comment', comment.id, comment.is_liked)}
           >
             👍 {comment.likes_count || 0}
           </button>
@@ -233,6 +255,15 @@ const PostDetail = () => {
             {comment.replies.map(reply => renderComment(reply, level + 1))}
           </div>
         )}
+        {comment.replies_cursor !== null && comment.replies_cursor !== undefined && (
+          <button
+            className="btn btn-secondary"
+            style={{ marginTop: '8px' }}
+            onClick={() => loadMoreReplies(comment)}
+          >
+            載入更多回覆 ({comment.reply_count - comment.replies.length})
+          </button>
+        )}
       </div>
     )
   }
@@ -307,7 +338,7 @@ const PostDetail = () => {
         <div className="d-flex gap-1">
           <button 
             className={`btn ${post?.is_liked ? 'btn-warning' : 'btn-success'}`}
-            onClick={() => handleLike('post', post.id)}
+            onClick={() => handleLike('post', post.id, post?.is_liked)}
           >
             👍 {post?.likes_count || 0}
           </button>
@@ -356,12 +387,17 @@ const PostDetail = () => {
 
       {/* 留言列表 */}
       <div className="card">
-        <h3>留言 ({comments.length})</h3>
+        <h3>留言 ({post?.comments_count ?? comments.length})</h3>
         {comments.length === 0 ? (
           <p style={{ color: '#666' }}>還沒有留言，快來發表第一篇吧！</p>
         ) : (
           <div>
             {comments.map(comment => renderComment(comment))}
+            {commentsCursor && (
+              <button className="btn btn-secondary" onClick={loadMoreComments}>
+                載入更多留言
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -44,7 +44,8 @@ export const authAPI = {
 
 // 貼文 API
 export const postsAPI = {
-  getPosts: (skip = 0, limit = 10) => api.get(`/posts?skip=${skip}&limit=${limit}`),
+  // 游標分頁：第一頁傳空字串，下一頁游標由回應標頭 X-Next-Cursor 取得（最後一頁無此標頭）
+  getPosts: (cursor = '', limit = 10) => api.get('/posts', { params: { cursor, limit } }),
   getPost: (id) => api.get(`/posts/${id}`),
   createPost: (postData) => api.post('/posts', postData),
   updatePost: (id, postData) => api.put(`/posts/${id}`, postData),
@@ -55,16 +56,27 @@ export const postsAPI = {
 
 // 留言 API
 export const commentsAPI = {
-  getComments: (postId) => api.get(`/posts/${postId}/comments`),
+  // params: { limit, cursor, max_depth, reply_preview }，不帶參數時回傳整棵留言樹
+  getComments: (postId, params = {}) => api.get(`/posts/${postId}/comments`, { params }),
+  // 以留言節點上的 replies_cursor 接續載入回覆，下一頁游標由回應標頭 X-Next-Cursor 取得
+  getReplies: (postId, commentId, cursor = '', limit = 20) =>
+    api.get(`/posts/${postId}/comments/${commentId}/replies`, { params: { cursor, limit } }),
   createComment: (postId, commentData) => api.post(`/posts/${postId}/comments`, commentData),
   setTopComment: (postId, commentId) => api.put(`/posts/${postId}/comments/${commentId}/top`),
 }
 
 // 按讚 API
 export const likesAPI = {
+  // 冪等的按讚 / 取消按讚，回應包含 is_liked 與最新 likes_count
+  setLiked: (targetType, targetId, liked) => liked
+    ? api.put(`/likes/${targetType}/${targetId}`)
+    : api.delete(`/likes/${targetType}/${targetId}`),
   createLike: (likeData) => api.post('/likes', likeData),
   deleteLike: (likeId) => api.delete(`/likes/${likeId}`),
-  getLikes: (targetType, targetId) => api.get(`/likes?target_type=${targetType}&target_id=${targetId}`),
+  // 游標分頁（下一頁游標在回應標頭 X-Next-Cursor），可依 user_id / target_type / target_id 篩選
+  getLikes: (params = {}) => api.get('/likes', { params }),
+  getLikeCounts: (targetType, targetIds) =>
+    api.get('/likes/counts', { params: { target_type: targetType, target_ids: targetIds }, paramsSerializer: { indexes: null } }),
 }
 
 // 黑名單 API
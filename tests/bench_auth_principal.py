@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+認證依賴基準測試
+比較 get_current_user 在三種設定下的每次請求延遲：
+  1. database 模式（每次查詢 users 表）
+  2. database 模式 + 使用者快取
+  3. stateless 模式（由 JWT claims 建立 Principal）
+
+用法:
+    python tests/bench_auth_principal.py [請求次數]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+TEMP_DIR = tempfile.mkdtemp(prefix="social_platform_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+from auth import create_user_token, get_current_user  # noqa: E402
+from config import settings  # noqa: E402
+from database import engine, SessionLocal, AsyncSessionLocal, async_engine, Base  # noqa: E402
+from models import User  # noqa: E402
+from principal import user_cache  # noqa: E402
+
+
+def seed(user_count: int = 1000) -> str:
+    """建立使用者並回傳其中一位的 Token"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(User(username=f"user{i}", email=f"user{i}@example.com", password_hash="x") for i in range(user_count))
+    db.commit()
+    token = create_user_token(db.query(User).filter(User.username == "user500").first())
+    db.close()
+    return token
+
+
+async def measure(label: str, token: str, requests: int, baseline: float = None) -> float:
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    # 與 FastAPI 相同：每個請求一個會話
+    async with AsyncSessionLocal() as db:
+        await get_current_user(credentials, db)
+    start = time.perf_counter()
+    for _ in range(requests):
+        async with AsyncSessionLocal() as db:
+            await get_current_user(credentials, db)
+    per_request = (time.perf_counter() - start) / requests * 1_000_000
+    saving = f" | 節省 {baseline - per_request:7.1f} µs ({(1 - per_request / baseline) * 100:4.1f}%)" if baseline else ""
+    print(f"{label:<22} {per_request:8.1f} µs/請求{saving}")
+    return per_request
+
+
+async def main(requests: int):
+    token = seed()
+    print(f"🚀 每種模式執行 {requests} 次 get_current_user\n")
+
+    settings.auth_mode, settings.user_cache_enabled = "database", False
+    baseline = await measure("database", token, requests)
+
+    settings.auth_mode, settings.user_cache_enabled = "database", True
+    user_cache.clear()
+    await measure("database + 使用者快取", token, requests, baseline)
+
+    settings.auth_mode, settings.user_cache_enabled = "stateless", False
+    await measure("stateless", token, requests, baseline)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
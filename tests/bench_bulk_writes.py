@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+批次寫入基準測試
+比較逐筆呼叫 POST /api/likes、POST /api/blacklist 與一次呼叫批次端點的吞吐量（筆/秒）：
+逐筆呼叫每筆都要執行存在性與權限檢查並各自 commit；批次端點每種檢查只查詢一次，
+以單一多列 INSERT 寫入並只 commit 一次。
+
+用法:
+    python tests/bench_bulk_writes.py [筆數]
+"""
+import os
+import sys
+import tempfile
+import time
+
+TEMP_DIR = tempfile.mkdtemp(prefix="social_platform_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from auth import create_user_token  # noqa: E402
+from database import engine, SessionLocal, Base  # noqa: E402
+from main import app  # noqa: E402
+from models import Post, User  # noqa: E402
+
+
+def seed(count: int):
+    """建立 count 篇貼文（按讚目標）、count 位使用者（封鎖目標）與兩位執行者，回傳執行者的 Header"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(insert(User), [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"} for i in range(count + 2)
+    ])
+    db.execute(insert(Post), [{"user_id": 1, "content": f"post {i}"} for i in range(count)])
+    db.commit()
+    headers = [
+        {"Authorization": f"Bearer {create_user_token(db.get(User, user_id))}"} for user_id in (count + 1, count + 2)
+    ]
+    db.close()
+    return headers
+
+
+def report(label: str, count: int, single: float, bulk: float):
+    print(f"{label:<8} 逐筆 {count / single:9.0f} 筆/秒 | 批次 {count / bulk:9.0f} 筆/秒 | {single / bulk:6.1f}x")
+
+
+def main(count: int):
+    single_headers, bulk_headers = seed(count)
+    print(f"🚀 每種寫入 {count} 筆\n")
+    with TestClient(app) as client:
+        start = time.perf_counter()
+        for post_id in range(1, count + 1):
+            client.post("/api/likes", json={"target_type": "post", "target_id": post_id}, headers=single_headers)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        client.post("/api/likes/bulk", json={
+            "items": [{"target_type": "post", "target_id": post_id} for post_id in range(1, count + 1)]
+        }, headers=bulk_headers)
+        report("按讚", count, single, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for user_id in range(1, count + 1):
+            client.post("/api/blacklist", json={"blocked_user_id": user_id}, headers=single_headers)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        client.post("/api/blacklist/bulk", json={"blocked_user_ids": list(range(1, count + 1))}, headers=bulk_headers)
+        report("封鎖", count, single, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
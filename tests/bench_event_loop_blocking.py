@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+事件迴圈阻塞基準測試
+比較「在 async 路由中直接呼叫同步 Session」與「AsyncSession」兩種方式，
+在多個並發請求下事件迴圈被阻塞的時間。
+
+用法:
+    python tests/bench_event_loop_blocking.py [並發數] [每個請求的查詢次數]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+TEMP_DIR = tempfile.mkdtemp(prefix="social_platform_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from database import engine, SessionLocal, AsyncSessionLocal, async_engine, Base  # noqa: E402
+from models import User, Post, Like, TargetType  # noqa: E402
+
+TICK = 0.001
+
+
+def seed(post_count: int = 2000):
+    """建立測試資料"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", password_hash="x") for i in range(20)]
+    db.add_all(users)
+    db.commit()
+    posts = [Post(user_id=users[i % 20].id, content=f"post {i}") for i in range(post_count)]
+    db.add_all(posts)
+    db.commit()
+    db.add_all(
+        Like(user_id=users[j].id, target_type=TargetType.POST, target_id=post.id)
+        for post in posts for j in range(3)
+    )
+    db.commit()
+    db.close()
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    """每 1ms 喚醒一次，記錄實際延遲（即事件迴圈被阻塞的時間）"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def sync_request(queries: int):
+    """舊做法：在 coroutine 中直接執行同步查詢（期間不會讓出事件迴圈）"""
+    db = SessionLocal()
+    try:
+        for _ in range(queries):
+            posts = db.query(Post).options(joinedload(Post.author)).order_by(
+                Post.created_at.desc()
+            ).limit(50).all()
+            post_ids = [post.id for post in posts]
+            db.query(Like.target_id, func.count(Like.id)).filter(
+                Like.target_type == TargetType.POST, Like.target_id.in_(post_ids)
+            ).group_by(Like.target_id).all()
+    finally:
+        db.close()
+
+
+async def async_request(queries: int):
+    """新做法：AsyncSession，等待 I/O 時讓出事件迴圈"""
+    async with AsyncSessionLocal() as db:
+        for _ in range(queries):
+            result = await db.execute(
+                select(Post).options(joinedload(Post.author)).order_by(Post.created_at.desc()).limit(50)
+            )
+            post_ids = [post.id for post in result.scalars().all()]
+            await db.execute(
+                select(Like.target_id, func.count(Like.id)).where(
+                    Like.target_type == TargetType.POST, Like.target_id.in_(post_ids)
+                ).group_by(Like.target_id)
+            )
+
+
+async def run(label: str, request, concurrency: int, queries: int):
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(request(queries) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0
+    print(f"{label:<14} 總時間 {elapsed * 1000:8.1f} ms | "
+          f"最長阻塞 {lags[-1] * 1000 if lags else 0:7.1f} ms | "
+          f"p99 心跳延遲 {p99 * 1000:6.1f} ms | 心跳次數 {len(lags)}")
+
+
+async def main(concurrency: int, queries: int):
+    print(f"🚀 並發 {concurrency} 個請求，每個請求 {queries} 次列表查詢\n")
+    await run("同步 Session", sync_request, concurrency, queries)
+    await run("AsyncSession", async_request, concurrency, queries)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    seed()
+    asyncio.run(main(concurrency, queries))
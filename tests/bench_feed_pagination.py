@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+貼文列表分頁基準測試
+比較 OFFSET 分頁與游標分頁在不同深度的每頁查詢延遲：
+OFFSET 需掃描並略過前面所有列，延遲隨頁數線性增加；游標直接在索引上定位，延遲維持固定。
+
+用法:
+    python tests/bench_feed_pagination.py [貼文數] [每頁筆數]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+TEMP_DIR = tempfile.mkdtemp(prefix="social_platform_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from sqlalchemy import insert, select, tuple_  # noqa: E402
+
+from database import engine, SessionLocal, Base  # noqa: E402
+from models import Post, User  # noqa: E402
+
+ORDER = (Post.is_pinned.desc(), Post.created_at.desc(), Post.id.desc())
+
+
+def seed(post_count: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(username="author", email="author@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    start = datetime(2024, 1, 1)
+    db.execute(insert(Post), [
+        {"user_id": user.id, "content": f"post {i}", "is_pinned": False, "created_at": start + timedelta(seconds=i)}
+        for i in range(post_count)
+    ])
+    db.commit()
+    db.close()
+
+
+def timed(db, statement, repeat: int = 20) -> float:
+    """回傳單次查詢的平均毫秒數"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        db.execute(statement).all()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(post_count: int, page_size: int):
+    seed(post_count)
+    db = SessionLocal()
+    print(f"🚀 {post_count} 篇貼文，每頁 {page_size} 筆\n")
+    print(f"{'頁數':>8} {'OFFSET (ms)':>12} {'游標 (ms)':>10}")
+
+    for page in (1, 10, 100, 1000, post_count // page_size - 1):
+        skip = page * page_size
+        if skip >= post_count:
+            continue
+        offset_query = select(Post).order_by(*ORDER).offset(skip).limit(page_size)
+        # 上一頁最後一筆的排序鍵，即游標解碼後的值
+        last = db.execute(select(Post).order_by(*ORDER).offset(skip - 1).limit(1)).scalar_one()
+        cursor_query = select(Post).where(
+            tuple_(Post.is_pinned, Post.created_at, Post.id) < (last.is_pinned, last.created_at, last.id)
+        ).order_by(*ORDER).limit(page_size)
+        print(f"{page:>8} {timed(db, offset_query):>12.3f} {timed(db, cursor_query):>10.3f}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+序列化微基準測試
+比較同一份回應資料（1,000 篇貼文、10,000 個節點的留言樹）以下列方式序列化的耗時：
+  1. response_model：FastAPI 的 serialize_response（逐節點驗證後轉為 JSON 相容物件）+ JSONResponse
+  2. TypeAdapter：預先建立的 TypeAdapter 驗證後直接 dump_json
+  3. pydantic_core：快速路徑，pydantic_core.to_json 直接序列化（未安裝 orjson 時使用）
+  4. orjson：快速路徑，orjson.dumps 直接序列化
+
+用法:
+    python tests/bench_serialization.py [重複次數]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from pydantic_core import to_json  # noqa: E402
+
+import serialization  # noqa: E402
+from models import User  # noqa: E402
+from schemas import PostResponse, CommentResponse  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_users(count: int = 50) -> List[User]:
+    return [User(id=i, username=f"user{i}", email=f"user{i}@example.com", created_at=START) for i in range(count)]
+
+
+def make_posts(count: int) -> List[dict]:
+    """與 feed.serialize_post 相同結構的貼文（作者為 ORM 物件）"""
+    users = make_users()
+    return [{
+        "id": i, "user_id": i % 50, "content": f"post {i} " * 10, "is_pinned": i < 3,
+        "created_at": START + timedelta(seconds=i), "updated_at": None, "author": users[i % 50],
+        "likes_count": i % 17, "comments_count": i % 5, "is_liked": i % 2 == 0,
+    } for i in range(count)]
+
+
+def make_comment_tree(count: int, fan_out: int = 10) -> List[dict]:
+    """與 feed.assemble_comment_tree 相同結構、共 count 個節點的留言樹（每則留言最多 fan_out 則回覆）"""
+    users = make_users()
+    nodes = []
+    for i in range(count):
+        parent = nodes[(i - 1) // fan_out] if i else None
+        node = {
+            "id": i, "post_id": 1, "user_id": i % 50, "parent_id": parent["id"] if parent else None,
+            "content": f"comment {i} " * 5, "is_top_comment": False,
+            "created_at": START + timedelta(seconds=i), "updated_at": None, "author": users[i % 50],
+            "likes_count": i % 7, "is_liked": False, "reply_count": 0, "replies_cursor": None, "replies": [],
+        }
+        if parent:
+            parent["replies"].append(node)
+            parent["reply_count"] += 1
+        nodes.append(node)
+    return [nodes[0]]
+
+
+async def response_model_path(field, data) -> bytes:
+    content = await serialize_response(field=field, response_content=data, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def compare(label: str, model, data, repeat: int):
+    field = create_response_field(name="bench", type_=List[model])
+    adapter = TypeAdapter(List[model])
+    loop = asyncio.new_event_loop()
+    results = [
+        ("response_model", lambda: loop.run_until_complete(response_model_path(field, data))),
+        ("TypeAdapter", lambda: adapter.dump_json(adapter.validate_python(data, from_attributes=True))),
+        ("pydantic_core", lambda: to_json(data, fallback=serialization._default)),
+    ]
+    if serialization.orjson is not None:
+        results.append(("orjson", lambda: serialization.dumps(data)))
+
+    print(f"\n{label}")
+    baseline = None
+    for name, fn in results:
+        ms = timed(fn, repeat)
+        baseline = baseline or ms
+        print(f"  {name:<15} {ms:9.2f} ms | {baseline / ms:5.1f}x")
+    loop.close()
+
+
+def main(repeat: int):
+    print(f"🚀 每種方式重複 {repeat} 次，取平均")
+    compare("1,000 篇貼文", PostResponse, make_posts(1000), repeat)
+    compare("10,000 個節點的留言樹", CommentResponse, make_comment_tree(10000), max(1, repeat // 5))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+SQLite 寫入競爭基準測試
+以 N 個行程（模擬多個 uvicorn worker）同時按讚：每筆交易先讀取貼文，再新增一筆 likes 並更新貼文的按讚數後 commit，
+比較 SQLITE_PROFILE=default 與 production 的每秒 commit 數、database is locked 錯誤數與 p99 延遲。
+
+用法:
+    python tests/bench_sqlite_contention.py [寫入者數] [秒數]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+TEMP_DIR = tempfile.mkdtemp(prefix="social_platform_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from sqlalchemy import insert, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from database import Base, create_db_engine  # noqa: E402
+from models import Like, Post, TargetType, User  # noqa: E402
+
+
+def seed(url: str, profile: str, writers: int):
+    engine = create_db_engine(url, profile)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"} for i in range(writers)
+        ])
+        connection.execute(insert(Post), [{"user_id": 1, "content": "post"}])
+    engine.dispose()
+
+
+def writer(url: str, profile: str, user_id: int, seconds: float, results):
+    engine = create_db_engine(url, profile)
+    commits, locked, latencies = 0, 0, []
+    target_id = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        target_id += 1
+        start = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                # 與 API 相同，先檢查按讚目標存在再寫入（讀取後升級為寫入交易）
+                connection.execute(select(Post.id).where(Post.id == 1)).scalar_one()
+                # 每位寫入者對不同的目標按讚，計數更新在同一篇貼文上競爭
+                connection.execute(insert(Like).values(
+                    user_id=user_id, target_type=TargetType.COMMENT, target_id=target_id
+                ))
+                connection.execute(update(Post).where(Post.id == 1).values(like_count=Post.like_count + 1))
+            commits += 1
+            latencies.append(time.perf_counter() - start)
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    engine.dispose()
+    results.put((commits, locked, latencies))
+
+
+def run(profile: str, writers: int, seconds: float):
+    url = f"sqlite:///{os.path.join(TEMP_DIR, f'{profile}.db')}"
+    seed(url, profile, writers)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=writer, args=(url, profile, user_id, seconds, results))
+        for user_id in range(1, writers + 1)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    commits = sum(result[0] for result in collected)
+    locked = sum(result[1] for result in collected)
+    latencies = sorted(latency for result in collected for latency in result[2])
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    print(f"{profile:<10} {commits / seconds:9.0f} commit/秒 | locked 錯誤 {locked:6d} | p99 {p99:8.1f} ms")
+
+
+def main(writers: int, seconds: float):
+    print(f"🚀 {writers} 個寫入行程，各執行 {seconds:g} 秒\n")
+    for profile in ("default", "production"):
+        run(profile, writers, seconds)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+啟動時間基準測試
+在新的 Python 行程中匯入 main（uvicorn 啟動 worker 或 --reload 重新載入時做的事），
+以 -X importtime 統計各模組的匯入耗時，並量測從行程啟動到第一個請求完成的時間：
+  匯入 main → lifespan 啟動（檢查結構版本、啟動工作佇列等）→ GET /health → 第一個需要認證的 GET /api/posts
+
+用法:
+    python tests/bench_startup.py [重複次數]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+# 子行程：分段計時並以 JSON 輸出
+FIRST_REQUEST_SCRIPT = """
+import json, os, time
+start = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+headers = {"Authorization": f"Bearer {os.environ['BENCH_TOKEN']}"}
+prepared = time.perf_counter()
+with TestClient(app) as client:
+    started = time.perf_counter()
+    assert client.get("/health").status_code == 200
+    health = time.perf_counter()
+    assert client.get("/api/posts", headers=headers).status_code == 200
+    first_request = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "lifespan": started - prepared,
+    "health": health - started,
+    "first_request": first_request - health,
+}))
+"""
+
+
+def backend_modules() -> set:
+    return {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith(".py")}
+
+
+def parse_importtime(stderr: str, root: str = "main") -> dict:
+    """解析 -X importtime 輸出，回傳 root 及其匯入的模組 {模組: (自身微秒, 累計微秒, 深度)}
+
+    輸出依匯入完成的順序排列，模組在其子模組之後；root 之前、上一個頂層模組之後的都是 root 匯入的模組
+    （直譯器啟動時 site 載入的模組不計入）。
+    """
+    lines = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        lines.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    end = next(i for i, (name, _, _, depth) in enumerate(lines) if name == root and depth == 0)
+    start = end
+    while start > 0 and lines[start - 1][3] > 0:
+        start -= 1
+    return {name: (self_us, cumulative_us, depth) for name, self_us, cumulative_us, depth in lines[start:end + 1]}
+
+
+def measure_import(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_first_request(env: dict) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def prepare_database(env: dict) -> str:
+    """建立暫存資料庫（遷移到最新版本並建立一位使用者），回傳該使用者的 Token
+
+    Token 在此產生，第一個請求的計時才包含延遲載入的 JWT 函式庫
+    """
+    script = (
+        "from database import engine, SessionLocal\n"
+        "from migrations import run_migrations\n"
+        "from models import User\n"
+        "from auth import create_user_token\n"
+        "run_migrations(engine)\n"
+        "db = SessionLocal()\n"
+        "user = User(username='bench', email='bench@example.com', password_hash='x')\n"
+        "db.add(user)\n"
+        "db.commit()\n"
+        "print(create_user_token(user))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main(runs: int):
+    temp_dir = tempfile.mkdtemp(prefix="social_platform_bench_")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(temp_dir, 'bench.db')}")
+    env["BENCH_TOKEN"] = prepare_database(env)
+    own = backend_modules()
+
+    imports = [measure_import(env) for _ in range(runs)]
+    print(f"🚀 匯入 main 的耗時（{runs} 次的中位數，毫秒）\n")
+    print(f"{'模組':<32} {'累計':>8} {'自身':>8}")
+    top_level = [name for name, (_, _, depth) in imports[0].items() if depth == 1 and name in imports[-1]]
+    rows = sorted(
+        ((name, statistics.median(run[name][1] for run in imports if name in run) / 1000,
+          statistics.median(run[name][0] for run in imports if name in run) / 1000) for name in top_level),
+        key=lambda row: -row[1]
+    )
+    for name, cumulative, self_ms in rows[:20]:
+        print(f"{name + (' *' if name in own else ''):<32} {cumulative:8.1f} {self_ms:8.1f}")
+    total = statistics.median(run["main"][1] for run in imports) / 1000
+    main_self = statistics.median(run["main"][0] for run in imports) / 1000
+    own_self = statistics.median(
+        sum(self_us for name, (self_us, _, _) in run.items() if name in own) for run in imports
+    ) / 1000
+    print(f"\nmain 總計 {total:.1f} ms，main 本身（定義路由）{main_self:.1f} ms，專案模組（含 main）本身合計 {own_self:.1f} ms")
+    lazy = sorted(name for name in ("passlib.context", "jose.jwt", "uvicorn") if name in imports[0])
+    print(f"匯入時載入的延遲元件: {lazy or '無'}")
+
+    timings = [measure_first_request(env) for _ in range(runs)]
+    print(f"\n⏱️  到第一個請求完成的時間（{runs} 次的中位數，毫秒）\n")
+    for key, label in (("import", "匯入 main"), ("lifespan", "lifespan 啟動"), ("health", "GET /health"),
+                       ("first_request", "第一個 GET /api/posts"), ("total", "行程啟動到完成（含直譯器）")):
+        print(f"{label:<28} {statistics.median(t[key] for t in timings) * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
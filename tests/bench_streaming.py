@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+串流回應基準測試
+在一篇有大量留言的貼文上，比較一般模式（組裝整棵留言樹後一次序列化）與 stream=true
+（server-side cursor 逐批取出、分塊送出）的首位元組時間（TTFB）、總時間與伺服器峰值 RSS 增量。
+每種模式各啟動一個 uvicorn 行程，峰值 RSS 取自 /proc/<pid>/status 的 VmHWM（Linux）。
+
+用法:
+    python tests/bench_streaming.py [留言數]
+"""
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+TEMP_DIR = tempfile.mkdtemp(prefix="social_platform_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'bench.db')}"
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import insert  # noqa: E402
+
+from auth import create_user_token  # noqa: E402
+from database import engine, SessionLocal, Base  # noqa: E402
+from models import Comment, Post, User  # noqa: E402
+
+
+def seed(comment_count: int) -> str:
+    """建立一篇貼文與 comment_count 則留言（三分之一為回覆），回傳作者的 Token"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(username="author", email="author@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    post = Post(user_id=user.id, content="big thread")
+    db.add(post)
+    db.commit()
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, comment_count + 1):
+        parent_id = i - 1 if i % 3 == 0 else None
+        rows.append({"post_id": post.id, "user_id": user.id, "parent_id": parent_id, "content": f"comment {i} " * 5,
+                     "is_top_comment": False, "created_at": start + timedelta(seconds=i)})
+    db.execute(insert(Comment), rows)
+    db.commit()
+    token = create_user_token(user)
+    db.close()
+    return token
+
+
+def memory_kb(pid: int, field: str) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure(label: str, path: str, token: str):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        headers = {"Authorization": f"Bearer {token}"}
+        for _ in range(100):
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port)
+                connection.request("GET", "/api/auth/me", headers=headers)
+                connection.getresponse().read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        baseline = memory_kb(server.pid, "VmRSS")
+
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        start = time.perf_counter()
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        response.read(1)
+        first_byte = time.perf_counter() - start
+        size = 1 + len(response.read())
+        total = time.perf_counter() - start
+
+        peak = memory_kb(server.pid, "VmHWM") - baseline
+        print(f"{label:<10} TTFB {first_byte * 1000:8.1f} ms | 總時間 {total * 1000:8.1f} ms | "
+              f"峰值 RSS +{peak / 1024:7.1f} MB | 回應 {size / 1024 / 1024:6.1f} MB")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(comment_count: int):
+    token = seed(comment_count)
+    print(f"🚀 一篇貼文 {comment_count} 則留言\n")
+    measure("留言樹", "/api/posts/1/comments", token)
+    measure("串流", "/api/posts/1/comments?stream=true", token)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+寫入管線基準測試
+以 N 個並發用戶端（同一個事件迴圈，經由 ASGI 直接呼叫應用程式）各自連續按讚，
+比較每個請求各自 commit 與啟用寫入管線（group commit）時的每秒成功寫入數、失敗數（database is locked）與 p99 延遲。
+另外直接並發呼叫 run_write（不經過 HTTP、驗證與認證），只比較寫入與 commit 本身的吞吐量。
+
+用法:
+    python tests/bench_write_pipeline.py [並發數] [每個用戶端的按讚數]
+    SQLITE_PROFILE=production python tests/bench_write_pipeline.py   # 搭配 WAL 設定檔
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+TEMP_DIR = tempfile.mkdtemp(prefix="social_platform_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEMP_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import httpx  # noqa: E402
+from sqlalchemy import delete, insert, update  # noqa: E402
+
+from auth import create_user_token  # noqa: E402
+from config import settings  # noqa: E402
+from database import engine, SessionLocal, AsyncSessionLocal, Base  # noqa: E402
+from main import app  # noqa: E402
+from jobs import enqueue  # noqa: E402
+from models import Like, Post, TargetType, User  # noqa: E402
+from write_pipeline import write_pipeline, run_write  # noqa: E402
+
+
+def seed(clients: int, likes: int):
+    """建立 clients 位使用者與 likes 篇貼文，回傳每位使用者的 Header"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.execute(insert(User), [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"} for i in range(clients)
+    ])
+    db.execute(insert(Post), [{"user_id": 1, "content": f"post {i}"} for i in range(likes)])
+    db.commit()
+    headers = [
+        {"Authorization": f"Bearer {create_user_token(db.get(User, user_id))}"} for user_id in range(1, clients + 1)
+    ]
+    db.close()
+    return headers
+
+
+def reset():
+    db = SessionLocal()
+    db.execute(delete(Like))
+    db.execute(update(Post).values(like_count=0))
+    db.commit()
+    db.close()
+
+
+async def run(label: str, headers: list, likes: int):
+    latencies = []
+    failed = 0
+
+    async def user(client, user_headers):
+        nonlocal failed
+        for post_id in range(1, likes + 1):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/likes", json={"target_type": "post", "target_id": post_id},
+                                             headers=user_headers)
+            except Exception:
+                failed += 1
+                continue
+            if response.status_code != 201:
+                failed += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    # raise_app_exceptions=False：寫入失敗視為 500 回應，與實際部署相同
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[user(client, user_headers) for user_headers in headers])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{label:<10} {len(latencies) / elapsed:8.0f} 寫入/秒 | 失敗 {failed:5d} | p99 {p99:7.1f} ms")
+
+
+async def run_writes(label: str, clients: int, likes: int):
+    """與 create_like 相同的寫入（新增按讚並更新計數），不經過 HTTP"""
+    latencies = []
+    failed = 0
+
+    async def user(user_id):
+        nonlocal failed
+        for post_id in range(1, likes + 1):
+            async def write(db):
+                like = Like(user_id=user_id, target_type=TargetType.POST, target_id=post_id)
+                db.add(like)
+                await db.flush()
+                await enqueue(db, "adjust_like_count", {"target_type": "post", "target_id": post_id, "delta": 1},
+                              key=f"like_count:{like.id}:add")
+                return like
+
+            start = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await run_write(db, write)
+            except Exception:
+                failed += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[user(user_id) for user_id in range(1, clients + 1)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{label:<10} {len(latencies) / elapsed:8.0f} 寫入/秒 | 失敗 {failed:5d} | p99 {p99:7.1f} ms")
+
+
+async def main(clients: int, likes: int):
+    headers = seed(clients, likes)
+    print(f"🚀 SQLITE_PROFILE={settings.sqlite_profile}，{clients} 個並發用戶端，各按讚 {likes} 次\n")
+    await run("各自commit", headers, likes)
+    reset()
+    await write_pipeline.start()
+    try:
+        await run("寫入管線", headers, likes)
+    finally:
+        await write_pipeline.stop()
+    stats = write_pipeline.stats()
+    print(f"平均每批 {stats['avg_batch']} 筆，最大 {stats['max_batch']} 筆，共 {stats['batches']} 次 commit")
+
+    print("\n只測寫入（run_write）")
+    reset()
+    await run_writes("各自commit", len(headers), likes)
+    reset()
+    await write_pipeline.start()
+    try:
+        await run_writes("寫入管線", len(headers), likes)
+    finally:
+        await write_pipeline.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    ))
@@ -0,0 +1,88 @@
+"""
+pytest 共用設定
+以暫存的 SQLite 資料庫直接載入後端應用程式，不需要啟動服務
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+TEST_DB_DIR = tempfile.mkdtemp(prefix="social_platform_test_")
+
+# 必須在匯入後端模組之前設定，settings 在匯入時即讀取環境變數
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'test.db')}"
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def app_db():
+    """重建資料表並回傳一個資料庫會話"""
+    from database import engine, SessionLocal, Base
+    from blacklist import blacklist_index
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # 資料表重建後使用者 ID 會重複使用，清除行程內的黑名單快取
+    blacklist_index.clear()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def override_settings(monkeypatch):
+    """暫時覆寫設定，測試結束後由 monkeypatch 還原：override_settings(jobs_mode="worker")"""
+    from config import settings
+
+    def override(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(settings, name, value)
+
+    return override
+
+
+@pytest.fixture
+def client(app_db):
+    """對應用程式發送請求的測試用戶端"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def make_user(db, username: str):
+    """直接寫入使用者並回傳 (使用者, 認證 Header)"""
+    from models import User
+    from auth import create_user_token
+
+    user = User(username=username, email=f"{username}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    token = create_user_token(user)
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def count_queries():
+    """統計區塊內 API 發出的 SQL 語句"""
+    from database import async_engine
+
+    engine = async_engine.sync_engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
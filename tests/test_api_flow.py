@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+API 完整流程測試（直接載入應用程式，不需啟動服務）
+涵蓋註冊登入、貼文、留言、按讚與黑名單
+"""
+from conftest import make_user
+
+
+def test_register_login_and_me(client):
+    response = client.post("/api/auth/register", json={
+        "username": "alice", "email": "alice@example.com", "password": "password123"
+    })
+    assert response.status_code == 201
+    assert response.json()["username"] == "alice"
+
+    response = client.post("/api/auth/register", json={
+        "username": "alice", "email": "other@example.com", "password": "password123"
+    })
+    assert response.status_code == 400
+
+    response = client.post("/api/auth/login", json={"username": "alice", "password": "wrong"})
+    assert response.status_code == 401
+
+    response = client.post("/api/auth/login", json={"username": "alice", "password": "password123"})
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "alice@example.com"
+
+
+def test_post_lifecycle(client, app_db):
+    _, headers = make_user(app_db, "author")
+    _, other_headers = make_user(app_db, "other")
+
+    response = client.post("/api/posts", json={"content": "hello"}, headers=headers)
+    assert response.status_code == 201
+    post = response.json()
+    assert post["author"]["username"] == "author"
+
+    response = client.put(f"/api/posts/{post['id']}", json={"content": "edited"}, headers=other_headers)
+    assert response.status_code == 403
+    response = client.put(f"/api/posts/{post['id']}", json={"content": "edited"}, headers=headers)
+    assert response.json()["content"] == "edited"
+
+    second = client.post("/api/posts", json={"content": "second"}, headers=headers).json()
+    assert client.put(f"/api/posts/{post['id']}/pin", headers=headers).status_code == 200
+    feed = client.get("/api/posts", headers=other_headers).json()
+    assert [item["id"] for item in feed] == [post["id"], second["id"]]
+    assert client.put(f"/api/posts/{post['id']}/unpin", headers=headers).status_code == 200
+
+    assert client.delete(f"/api/posts/{second['id']}", headers=other_headers).status_code == 403
+    assert client.delete(f"/api/posts/{second['id']}", headers=headers).status_code == 200
+    assert client.get(f"/api/posts/{second['id']}", headers=headers).status_code == 404
+
+
+def test_comments_likes_and_top_comment(client, app_db):
+    _, headers = make_user(app_db, "author")
+    _, other_headers = make_user(app_db, "other")
+    post = client.post("/api/posts", json={"content": "hello"}, headers=headers).json()
+
+    first = client.post(f"/api/posts/{post['id']}/comments", json={"content": "first"}, headers=other_headers).json()
+    second = client.post(f"/api/posts/{post['id']}/comments", json={"content": "second"}, headers=other_headers).json()
+    reply = client.post(f"/api/posts/{post['id']}/comments",
+                        json={"content": "reply", "parent_id": first["id"]}, headers=headers)
+    assert reply.status_code == 201
+    assert reply.json()["parent_id"] == first["id"]
+
+    response = client.put(f"/api/posts/{post['id']}/comments/{reply.json()['id']}/top", headers=headers)
+    assert response.status_code == 400
+    response = client.put(f"/api/posts/{post['id']}/comments/{second['id']}/top", headers=headers)
+    assert response.status_code == 200
+
+    like = client.post("/api/likes", json={"target_type": "comment", "target_id": first["id"]}, headers=headers)
+    assert like.status_code == 201
+    assert client.post("/api/likes", json={"target_type": "comment", "target_id": first["id"]},
+                       headers=headers).status_code == 400
+    assert client.post("/api/likes", json={"target_type": "post", "target_id": post["id"]},
+                       headers=headers).status_code == 201
+
+    tree = client.get(f"/api/posts/{post['id']}/comments", headers=headers).json()
+    assert [node["id"] for node in tree] == [second["id"], first["id"]]
+    assert tree[1]["likes_count"] == 1
+    assert tree[1]["is_liked"] is True
+    assert tree[1]["replies"][0]["id"] == reply.json()["id"]
+
+    detail = client.get(f"/api/posts/{post['id']}", headers=headers).json()
+    assert detail["likes_count"] == 1
+    assert detail["comments_count"] == 2
+
+    likes = client.get(f"/api/likes?target_type=comment&target_id={first['id']}", headers=headers).json()
+    assert len(likes) == 1
+    assert client.delete(f"/api/likes/{like.json()['id']}", headers=other_headers).status_code == 403
+    assert client.delete(f"/api/likes/{like.json()['id']}", headers=headers).status_code == 200
+
+
+def test_blacklist(client, app_db):
+    author, headers = make_user(app_db, "author")
+    _, viewer_headers = make_user(app_db, "viewer")
+    post = client.post("/api/posts", json={"content": "hello"}, headers=headers).json()
+
+    response = client.post("/api/blacklist", json={"blocked_user_id": author.id}, headers=viewer_headers)
+    assert response.status_code == 201
+    entry = response.json()
+    assert entry["blocked_user"]["username"] == "author"
+    assert client.post("/api/blacklist", json={"blocked_user_id": author.id},
+                       headers=viewer_headers).status_code == 400
+
+    assert client.get("/api/posts", headers=viewer_headers).json() == []
+    assert client.get(f"/api/posts/{post['id']}", headers=viewer_headers).status_code == 403
+    assert client.get(f"/api/posts/{post['id']}/comments", headers=viewer_headers).status_code == 403
+    assert client.post(f"/api/posts/{post['id']}/comments", json={"content": "hi"},
+                       headers=viewer_headers).status_code == 403
+    assert client.post("/api/likes", json={"target_type": "post", "target_id": post["id"]},
+                       headers=viewer_headers).status_code == 403
+
+    assert len(client.get("/api/blacklist", headers=viewer_headers).json()) == 1
+    assert client.delete(f"/api/blacklist/{entry['id']}", headers=viewer_headers).status_code == 200
+    assert len(client.get("/api/posts", headers=viewer_headers).json()) == 1
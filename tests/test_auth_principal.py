@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+測試認證模式：stateless 模式不查詢資料庫、使用者快取命中與失效
+"""
+import pytest
+
+from conftest import make_user, count_queries
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """測試前後清除使用者快取"""
+    from principal import user_cache
+
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+def test_stateless_mode_skips_user_lookup(client, app_db, override_settings):
+    _, headers = make_user(app_db, "alice")
+    override_settings(auth_mode="stateless")
+
+    with count_queries() as statements:
+        response = client.get("/api/auth/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["username"] == "alice"
+    assert response.json()["email"] == "alice@example.com"
+    assert statements == []
+
+
+def test_stateless_mode_accepts_legacy_token(client, app_db, override_settings):
+    from auth import create_access_token
+
+    make_user(app_db, "alice")
+    override_settings(auth_mode="stateless")
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'alice'})}"}
+
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == "alice"
+
+
+def test_user_cache_hit_and_invalidation(client, app_db, override_settings):
+    from principal import user_cache
+
+    user, headers = make_user(app_db, "alice")
+    override_settings(user_cache_enabled=True)
+
+    client.get("/api/auth/me", headers=headers)
+    with count_queries() as statements:
+        response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert statements == []
+    assert user_cache.stats()["hits"] == 1
+
+    # 使用者資料變更時透過 ORM 事件失效
+    user.email = "alice@new.example.com"
+    app_db.commit()
+    assert user_cache.get("alice") is None
+
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.json()["email"] == "alice@new.example.com"
+
+
+def test_user_cache_lru_and_ttl():
+    from datetime import datetime
+    from principal import Principal, UserCache
+
+    cache = UserCache(max_size=2, ttl_seconds=60)
+    for i in range(3):
+        cache.set(Principal(id=i, username=f"user{i}", email=f"user{i}@example.com", created_at=datetime.now()))
+    assert cache.get("user0") is None
+    assert cache.get("user2").id == 2
+
+    cache.invalidate(user_id=2)
+    assert cache.get("user2") is None
+
+    expired = UserCache(max_size=2, ttl_seconds=-1)
+    expired.set(Principal(id=1, username="user1", email="user1@example.com", created_at=datetime.now()))
+    assert expired.get("user1") is None
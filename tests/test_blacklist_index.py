@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+測試黑名單索引：快取命中後不再查詢 blacklists 表、封鎖/解除封鎖時雙向集合立即更新、LRU 上限
+"""
+import asyncio
+
+from conftest import make_user, count_queries
+
+
+def lookup(method, user_id):
+    from database import AsyncSessionLocal
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await method(db, user_id)
+    return asyncio.run(run())
+
+
+def blacklist_queries(statements):
+    return [statement for statement in statements if "FROM blacklists" in statement]
+
+
+def test_permission_checks_hit_cache(client, app_db):
+    from blacklist import blacklist_index
+
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+
+    client.get("/api/posts", headers=headers)
+    with count_queries() as statements:
+        assert client.get("/api/posts", headers=headers).status_code == 200
+        assert client.get(f"/api/posts/{post_id}", headers=headers).status_code == 200
+        assert client.get(f"/api/posts/{post_id}/comments", headers=headers).status_code == 200
+
+    assert blacklist_queries(statements) == []
+    assert blacklist_index.stats()["hits"] >= 3
+
+
+def test_block_and_unblock_apply_immediately(client, app_db):
+    from blacklist import blacklist_index
+
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+
+    # 先載入快取，確認封鎖時是更新快取而不是等 TTL 到期
+    assert len(client.get("/api/posts", headers=headers).json()) == 1
+    assert lookup(blacklist_index.blocked_by, author.id) == frozenset()
+
+    entry = client.post("/api/blacklist", json={"blocked_user_id": author.id}, headers=headers).json()
+    assert client.get("/api/posts", headers=headers).json() == []
+    assert client.get(f"/api/posts/{post_id}", headers=headers).status_code == 403
+    assert client.post("/api/likes", json={"target_type": "post", "target_id": post_id},
+                       headers=headers).status_code == 403
+    assert lookup(blacklist_index.blocked_by, author.id) == {viewer.id}
+
+    assert client.delete(f"/api/blacklist/{entry['id']}", headers=headers).status_code == 200
+    assert len(client.get("/api/posts", headers=headers).json()) == 1
+    assert lookup(blacklist_index.blocked, viewer.id) == frozenset()
+    assert lookup(blacklist_index.blocked_by, author.id) == frozenset()
+
+
+def test_lru_cap(app_db):
+    from blacklist import BlacklistIndex
+    from models import Blacklist
+
+    users = [make_user(app_db, f"user{i}")[0] for i in range(3)]
+    app_db.add(Blacklist(user_id=users[0].id, blocked_user_id=users[1].id))
+    app_db.commit()
+
+    index = BlacklistIndex(max_size=2, ttl_seconds=60)
+    assert lookup(index.blocked, users[0].id) == {users[1].id}
+    lookup(index.blocked, users[1].id)
+    lookup(index.blocked, users[2].id)
+
+    stats = index.stats()
+    assert stats["size"] == 2
+    assert stats["misses"] == 3
+    # 最久未使用的 users[0] 已被淘汰，再次查詢為未命中
+    lookup(index.blocked, users[0].id)
+    assert index.stats()["misses"] == 4
+    lookup(index.blocked, users[0].id)
+    assert index.stats()["hits"] == 1
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+測試批次按讚與批次封鎖：每筆結果的狀態、計數與黑名單索引同步，
+以及 SQL 次數固定、不隨項目數增加
+"""
+from conftest import make_user, count_queries
+
+
+def like(target_type, target_id):
+    return {"target_type": target_type, "target_id": target_id}
+
+
+def test_bulk_likes_report_each_item(client, app_db):
+    author, author_headers = make_user(app_db, "author")
+    blocked, blocked_headers = make_user(app_db, "blocked")
+    viewer, headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+    liked_id = client.post("/api/posts", json={"content": "liked"}, headers=author_headers).json()["id"]
+    deleted_id = client.post("/api/posts", json={"content": "gone"}, headers=author_headers).json()["id"]
+    blocked_post_id = client.post("/api/posts", json={"content": "x"}, headers=blocked_headers).json()["id"]
+    comment_id = client.post(f"/api/posts/{post_id}/comments", json={"content": "c"}, headers=author_headers).json()["id"]
+    client.post("/api/likes", json=like("post", liked_id), headers=headers)
+    client.delete(f"/api/posts/{deleted_id}", headers=author_headers)
+    client.post("/api/blacklist", json={"blocked_user_id": blocked.id}, headers=headers)
+
+    response = client.post("/api/likes/bulk", json={"items": [
+        like("post", post_id),
+        like("comment", comment_id),
+        like("post", post_id),
+        like("post", 9999),
+        like("post", deleted_id),
+        like("post", blocked_post_id),
+        like("post", liked_id),
+    ]}, headers=headers)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [item["status"] for item in results] == [
+        "created", "created", "duplicate", "not_found", "not_found", "forbidden", "exists"
+    ]
+    assert [item["index"] for item in results] == list(range(7))
+    assert results[0]["id"] and results[3]["detail"] == "目標不存在"
+
+    post = client.get(f"/api/posts/{post_id}", headers=headers).json()
+    assert (post["likes_count"], post["is_liked"]) == (1, True)
+    comments = client.get(f"/api/posts/{post_id}/comments", headers=headers).json()
+    assert (comments[0]["likes_count"], comments[0]["is_liked"]) == (1, True)
+
+
+def test_bulk_likes_query_count_is_constant(client, app_db):
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post_ids = [client.post("/api/posts", json={"content": f"p{i}"}, headers=author_headers).json()["id"]
+                for i in range(40)]
+    client.get("/api/posts", headers=headers)
+
+    counts = []
+    for chunk in (post_ids[:4], post_ids[4:40]):
+        with count_queries() as statements:
+            results = client.post("/api/likes/bulk", json={"items": [like("post", i) for i in chunk]},
+                                  headers=headers).json()
+        assert {item["status"] for item in results} == {"created"}
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+
+def test_bulk_blacklist_report_each_item(client, app_db):
+    me, headers = make_user(app_db, "me")
+    first, first_headers = make_user(app_db, "first")
+    second, second_headers = make_user(app_db, "second")
+    already, _ = make_user(app_db, "already")
+    client.post("/api/blacklist", json={"blocked_user_id": already.id}, headers=headers)
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=first_headers).json()["id"]
+    assert [post["id"] for post in client.get("/api/posts", headers=headers).json()] == [post_id]
+
+    results = client.post("/api/blacklist/bulk", json={
+        "blocked_user_ids": [first.id, second.id, first.id, me.id, 9999, already.id]
+    }, headers=headers).json()
+
+    assert [item["status"] for item in results] == ["created", "created", "duplicate", "invalid", "not_found", "exists"]
+    assert results[3]["detail"] == "不能將自己加入黑名單"
+    # 黑名單索引與動態時報立即更新
+    assert client.get("/api/posts", headers=headers).json() == []
+    assert client.get(f"/api/posts/{post_id}", headers=headers).status_code == 403
+    assert {entry["blocked_user_id"] for entry in client.get("/api/blacklist", headers=headers).json()} == {
+        first.id, second.id, already.id
+    }
+
+
+def test_bulk_like_after_unlike_with_reused_like_id(client, app_db, override_settings):
+    from jobs import run_job, due_job_ids
+
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    override_settings(jobs_mode="worker")
+
+    def bulk_like():
+        return client.post("/api/likes/bulk", json={"items": [like("post", post_id)]}, headers=headers).json()[0]["id"]
+
+    def run_jobs():
+        for job_id in client.portal.call(due_job_ids):
+            client.portal.call(run_job, job_id)
+
+    like_id = bulk_like()
+    run_jobs()
+    client.delete(f"/api/likes/post/{post_id}", headers=headers)
+    run_jobs()
+    # 刪除後重新使用相同的按讚 ID，計數工作仍須執行
+    assert bulk_like() == like_id
+    run_jobs()
+    assert client.get(f"/api/posts/{post_id}", headers=headers).json()["likes_count"] == 1
+
+
+def test_bulk_size_limit(client, app_db):
+    from config import settings
+
+    me, headers = make_user(app_db, "me")
+    items = [like("post", i) for i in range(settings.bulk_max_items + 1)]
+    response = client.post("/api/likes/bulk", json={"items": items}, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+測試共用快取層：memory 與 Redis 協定後端（以 LocalRedis 模擬）的標籤失效、
+貼文快取命中時不查詢貼文內容，以及寫入操作後快取正確失效
+"""
+import asyncio
+
+import pytest
+
+from conftest import make_user, count_queries
+
+
+def backends():
+    from cache import MemoryCache, RedisCache, LocalRedis
+
+    return {"memory": lambda: MemoryCache(max_size=100), "local": lambda: RedisCache(LocalRedis())}
+
+
+@pytest.fixture(params=["memory", "local"])
+def cache_backend(request):
+    from cache import set_cache
+
+    backend = backends()[request.param]()
+    set_cache(backend)
+    yield backend
+    set_cache(None)
+
+
+def test_tag_invalidation(cache_backend):
+    async def run():
+        await cache_backend.set("post:1", '{"id": 1}', ttl=60, tags=("post:1", "user:7"))
+        await cache_backend.set("post:2", '{"id": 2}', ttl=60, tags=("post:2", "user:7"))
+        await cache_backend.set("post:3", '{"id": 3}', ttl=60, tags=("post:3",))
+        assert await cache_backend.get_many(["post:1", "post:2", "post:4"]) == ['{"id": 1}', '{"id": 2}', None]
+
+        await cache_backend.invalidate_tags("user:7")
+        return await cache_backend.get_many(["post:1", "post:2", "post:3"])
+
+    assert asyncio.run(run()) == [None, None, '{"id": 3}']
+    stats = cache_backend.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (3, 3, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_fill_skipped_after_invalidation(cache_backend):
+    async def run():
+        versions = await cache_backend.tag_versions(["post:1"])
+        # 讀取資料庫期間另一個請求 commit 並失效
+        await cache_backend.invalidate_tags("post:1")
+        stale = await cache_backend.set_if_unchanged("post:1", "old", ttl=60, tags=("post:1",), versions=versions)
+
+        versions = await cache_backend.tag_versions(["post:1"])
+        fresh = await cache_backend.set_if_unchanged("post:1", "new", ttl=60, tags=("post:1",), versions=versions)
+        return stale, fresh, await cache_backend.get("post:1")
+
+    assert asyncio.run(run()) == (False, True, "new")
+
+
+def test_memory_cache_lru():
+    from cache import MemoryCache
+
+    cache = MemoryCache(max_size=2)
+
+    async def run():
+        await cache.set("a", "1", ttl=60, tags=("t",))
+        await cache.set("b", "2", ttl=60)
+        await cache.get("a")
+        await cache.set("c", "3", ttl=60)
+        return await cache.get_many(["a", "b", "c"])
+
+    assert asyncio.run(run()) == ["1", None, "3"]
+    assert cache.size() == 2
+
+
+def post_content_queries(statements):
+    """載入貼文內容的查詢（JOIN 作者）；只取排序鍵的分頁查詢不算"""
+    return [statement for statement in statements if "FROM posts JOIN users" in statement]
+
+
+def test_posts_served_from_cache(client, app_db, cache_backend):
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    ids = [client.post("/api/posts", json={"content": f"post {i}"}, headers=author_headers).json()["id"]
+           for i in range(3)]
+
+    first = client.get("/api/posts", headers=headers).json()
+    with count_queries() as statements:
+        second = client.get("/api/posts", headers=headers).json()
+        single = client.get(f"/api/posts/{ids[0]}", headers=headers).json()
+
+    assert second == first
+    assert single == next(post for post in first if post["id"] == ids[0])
+    assert post_content_queries(statements) == []
+    assert cache_backend.stats()["hits"] >= 4
+
+
+def test_writes_invalidate_cached_posts(client, app_db, cache_backend):
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hello"}, headers=author_headers).json()["id"]
+    url = f"/api/posts/{post_id}"
+    client.get(url, headers=headers)
+
+    client.post("/api/likes", json={"target_type": "post", "target_id": post_id}, headers=headers)
+    liked = client.get(url, headers=headers).json()
+    assert (liked["likes_count"], liked["is_liked"]) == (1, True)
+    # is_liked 不在快取內容中，其他使用者看到的是自己的狀態
+    assert client.get(url, headers=author_headers).json()["is_liked"] is False
+
+    like_id = client.get(f"/api/likes?target_type=post&target_id={post_id}", headers=headers).json()[0]["id"]
+    client.delete(f"/api/likes/{like_id}", headers=headers)
+    assert client.get(url, headers=headers).json()["likes_count"] == 0
+
+    client.post(f"{url}/comments", json={"content": "hi"}, headers=headers)
+    assert client.get(url, headers=headers).json()["comments_count"] == 1
+
+    client.put(url, json={"content": "edited"}, headers=author_headers)
+    assert client.get(url, headers=headers).json()["content"] == "edited"
+
+    client.put(f"{url}/pin", headers=author_headers)
+    assert client.get(url, headers=headers).json()["is_pinned"] is True
+    client.put(f"{url}/unpin", headers=author_headers)
+    assert client.get("/api/posts", headers=headers).json()[0]["is_pinned"] is False
+
+    other_id = client.post("/api/posts", json={"content": "bye"}, headers=author_headers).json()["id"]
+    client.get(f"/api/posts/{other_id}", headers=headers)
+    client.delete(f"/api/posts/{other_id}", headers=author_headers)
+    assert client.get(f"/api/posts/{other_id}", headers=headers).status_code == 404
+
+
+def test_stale_read_is_not_written_back(client, app_db, cache_backend):
+    """快取未命中時讀取資料庫後、寫回快取前有寫入 commit 並失效，舊值不寫回"""
+    from database import AsyncSessionLocal
+    from feed import invalidate_post, load_posts, post_cache_key
+
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hello"}, headers=headers).json()["id"]
+
+    async def racing_load():
+        async with AsyncSessionLocal() as db:
+            execute = db.execute
+
+            async def execute_then_write(*args, **kwargs):
+                result = await execute(*args, **kwargs)
+                await invalidate_post(post_id)
+                return result
+
+            db.execute = execute_then_write
+            await load_posts(db, [post_id])
+        return await cache_backend.get(post_cache_key(post_id))
+
+    assert client.portal.call(racing_load) is None
+    # 之後的讀取正常寫回
+    client.get(f"/api/posts/{post_id}", headers=headers)
+    assert client.portal.call(cache_backend.get, post_cache_key(post_id)) is not None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+測試刪除貼文：墓碑立即隱藏貼文、留言與按讚分批串聯刪除，
+以及 worker 模式下每批為一個工作、不影響其他貼文
+"""
+import pytest
+
+from conftest import make_user, count_queries
+
+
+def create_thread(client, headers, post_id, depth):
+    """建立一串巢狀回覆（每層一則）並對每則留言按讚，回傳留言 ID"""
+    comment_ids, parent_id = [], None
+    for i in range(depth):
+        parent_id = client.post(
+            f"/api/posts/{post_id}/comments", json={"content": f"c{i}", "parent_id": parent_id}, headers=headers
+        ).json()["id"]
+        client.post("/api/likes", json={"target_type": "comment", "target_id": parent_id}, headers=headers)
+        comment_ids.append(parent_id)
+    return comment_ids
+
+
+def row_counts(db, post_id):
+    from models import Post, Comment, Like, TargetType
+
+    db.expire_all()
+    comment_ids = [comment.id for comment in db.query(Comment).filter(Comment.post_id == post_id)]
+    return {
+        "post": db.query(Post).filter(Post.id == post_id).count(),
+        "comments": len(comment_ids),
+        "comment_likes": db.query(Like).filter(
+            Like.target_type == TargetType.COMMENT, Like.target_id.in_(comment_ids)
+        ).count(),
+        "post_likes": db.query(Like).filter(Like.target_type == TargetType.POST, Like.target_id == post_id).count(),
+    }
+
+
+def test_inline_delete_runs_in_batches(client, app_db, override_settings):
+    override_settings(post_delete_batch_size=2)
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "big"}, headers=headers).json()["id"]
+    other_id = client.post("/api/posts", json={"content": "other"}, headers=headers).json()["id"]
+    create_thread(client, headers, post_id, depth=5)
+    create_thread(client, headers, other_id, depth=2)
+    client.post("/api/likes", json={"target_type": "post", "target_id": post_id}, headers=headers)
+
+    with count_queries() as statements:
+        assert client.delete(f"/api/posts/{post_id}", headers=headers).status_code == 200
+
+    comment_deletes = [s for s in statements if s.startswith("DELETE FROM comments")]
+    assert len(comment_deletes) == 3
+    assert row_counts(app_db, post_id) == {"post": 0, "comments": 0, "comment_likes": 0, "post_likes": 0}
+    assert row_counts(app_db, other_id) == {"post": 1, "comments": 2, "comment_likes": 2, "post_likes": 0}
+
+
+@pytest.mark.parametrize("feed_mode", ["timeline", "global"])
+def test_tombstone_hides_post_until_chunked_jobs_run(client, app_db, override_settings, feed_mode):
+    from jobs import run_job, due_job_ids
+    from models import Job
+
+    override_settings(feed_mode=feed_mode, post_delete_batch_size=2)
+    author, headers = make_user(app_db, "author")
+    viewer, viewer_headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "big"}, headers=headers).json()["id"]
+    comment_ids = create_thread(client, headers, post_id, depth=5)
+    assert [post["id"] for post in client.get("/api/posts", headers=viewer_headers).json()] == [post_id]
+
+    override_settings(jobs_mode="worker")
+    assert client.delete(f"/api/posts/{post_id}", headers=headers).status_code == 200
+
+    # 串聯刪除尚未執行，但貼文已不可見
+    assert row_counts(app_db, post_id)["comments"] == 5
+    assert client.get("/api/posts", headers=viewer_headers).json() == []
+    assert client.get(f"/api/posts/{post_id}", headers=viewer_headers).status_code == 404
+    assert client.get(f"/api/posts/{post_id}/comments", headers=viewer_headers).status_code == 404
+    assert client.post(
+        "/api/likes", json={"target_type": "comment", "target_id": comment_ids[0]}, headers=viewer_headers
+    ).status_code == 404
+    assert client.delete(f"/api/posts/{post_id}", headers=headers).status_code == 404
+
+    # 每個工作刪除一批留言並排入下一批
+    while True:
+        job_ids = client.portal.call(due_job_ids)
+        if not job_ids:
+            break
+        for job_id in job_ids:
+            client.portal.call(run_job, job_id)
+
+    app_db.expire_all()
+    assert [job.label for job in app_db.query(Job).order_by(Job.id)] == [
+        f"delete_post:{post_id}", f"delete_post:{post_id}:1", f"delete_post:{post_id}:2"
+    ]
+    assert row_counts(app_db, post_id) == {"post": 0, "comments": 0, "comment_likes": 0, "post_likes": 0}
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+測試留言分頁：頂層游標分頁、深度限制、回覆預覽、replies 端點接續載入，
+以及查詢次數只與展開層數有關、與留言總數無關
+"""
+from conftest import make_user, count_queries
+from test_feed_queries import seed_comment_tree
+
+
+def get_comments(client, post_id, headers, **params):
+    response = client.get(f"/api/posts/{post_id}/comments", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_top_level_cursor_pages(client, app_db):
+    from models import Comment
+
+    author, _ = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post = seed_comment_tree(app_db, author, viewer, depth=2, width=5)
+    pinned = app_db.query(Comment).filter(Comment.parent_id.is_(None)).order_by(Comment.id.desc()).first()
+    pinned.is_top_comment = True
+    app_db.commit()
+
+    ids, cursor = [], ""
+    while cursor is not None:
+        response = get_comments(client, post.id, headers, limit=2, cursor=cursor, max_depth=1)
+        ids.extend(node["id"] for node in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+
+    full_tree = get_comments(client, post.id, headers).json()
+    assert ids == [node["id"] for node in full_tree]
+    assert ids[0] == pinned.id
+    assert len(ids) == 5
+
+
+def test_depth_limit_and_reply_preview(client, app_db):
+    author, _ = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post = seed_comment_tree(app_db, author, viewer, depth=3, width=4)
+
+    shallow = get_comments(client, post.id, headers, max_depth=1).json()
+    assert all(node["replies"] == [] for node in shallow)
+    assert all(node["reply_count"] == 4 and node["replies_cursor"] == "" for node in shallow)
+
+    preview = get_comments(client, post.id, headers, limit=1, max_depth=2, reply_preview=2).json()
+    top = preview[0]
+    assert [reply["parent_id"] for reply in top["replies"]] == [top["id"]] * 2
+    assert top["replies_cursor"]
+    # 第 2 層為深度上限，不再展開
+    assert all(reply["replies"] == [] and reply["replies_cursor"] == "" for reply in top["replies"])
+
+
+def test_load_more_replies(client, app_db):
+    author, _ = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post = seed_comment_tree(app_db, author, viewer, depth=2, width=5)
+
+    full_tree = get_comments(client, post.id, headers).json()
+    top = get_comments(client, post.id, headers, limit=1, max_depth=2, reply_preview=2).json()[0]
+
+    url = f"/api/posts/{post.id}/comments/{top['id']}/replies"
+    response = client.get(url, params={"cursor": top["replies_cursor"], "limit": 2}, headers=headers)
+    assert response.status_code == 200
+    rest = response.json()
+    response = client.get(url, params={"cursor": response.headers["X-Next-Cursor"], "limit": 2}, headers=headers)
+    rest += response.json()
+    assert "X-Next-Cursor" not in response.headers
+
+    loaded = [reply["id"] for reply in top["replies"] + rest]
+    assert loaded == [reply["id"] for reply in full_tree[0]["replies"]]
+    assert all(reply["is_liked"] for reply in rest)
+
+
+def test_replies_of_unknown_comment(client, app_db):
+    author, _ = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post = seed_comment_tree(app_db, author, viewer, depth=1, width=1)
+
+    response = client.get(f"/api/posts/{post.id}/comments/9999/replies", headers=headers)
+    assert response.status_code == 404
+
+
+def test_paged_query_count_depends_on_depth_only(client, app_db):
+    author, _ = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    small_post = seed_comment_tree(app_db, author, viewer, depth=3, width=2)
+    large_post = seed_comment_tree(app_db, author, viewer, depth=3, width=6)
+
+    params = {"limit": 10, "max_depth": 3, "reply_preview": 3}
+    # 先暖機黑名單索引，只比較穩定狀態下的查詢次數
+    get_comments(client, small_post.id, headers, **params)
+    with count_queries() as small:
+        get_comments(client, small_post.id, headers, **params)
+    with count_queries() as large:
+        large_tree = get_comments(client, large_post.id, headers, **params).json()
+
+    assert len(large) == len(small), large
+    assert len(large_tree) == 6
+    assert all(len(node["replies"]) == 3 for node in large_tree)
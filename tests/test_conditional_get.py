@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+測試條件式 GET：貼文與留言列表回傳 ETag / Last-Modified，
+未變更時回傳 304 且不載入內容；編輯、留言、按讚、置頂留言都會更新版本
+"""
+from conftest import make_user, count_queries
+
+
+def etag_of(client, url, headers):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def test_post_not_modified(client, app_db):
+    user, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+
+    response = client.get(f"/api/posts/{post_id}", headers=headers)
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"].endswith("GMT")
+
+    cached = client.get(f"/api/posts/{post_id}", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    since = client.get(f"/api/posts/{post_id}", headers={**headers, "If-Modified-Since": response.headers["Last-Modified"]})
+    assert since.status_code == 304
+    assert client.get(f"/api/posts/{post_id}", headers={**headers, "If-None-Match": 'W/"other"'}).status_code == 200
+
+
+def test_etag_is_per_viewer(client, app_db):
+    author, author_headers = make_user(app_db, "author")
+    viewer, viewer_headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+
+    etag = etag_of(client, f"/api/posts/{post_id}", author_headers)
+    # is_liked 因人而異，其他使用者不能沿用同一個 ETag
+    assert client.get(f"/api/posts/{post_id}", headers={**viewer_headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_writes_change_etag(client, app_db):
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    urls = [f"/api/posts/{post_id}", f"/api/posts/{post_id}/comments"]
+    comment_id = None
+
+    def edit():
+        client.put(f"/api/posts/{post_id}", json={"content": "edited"}, headers=headers)
+
+    def comment():
+        nonlocal comment_id
+        comment_id = client.post(f"/api/posts/{post_id}/comments", json={"content": "c"}, headers=headers).json()["id"]
+
+    def like_post():
+        client.put(f"/api/likes/post/{post_id}", headers=headers)
+
+    def like_comment():
+        client.put(f"/api/likes/comment/{comment_id}", headers=headers)
+
+    def top_comment():
+        client.put(f"/api/posts/{post_id}/comments/{comment_id}/top", headers=headers)
+
+    def pin():
+        client.put(f"/api/posts/{post_id}/pin", headers=headers)
+
+    for write in (edit, comment, like_post, like_comment, top_comment, pin):
+        before = [etag_of(client, url, headers) for url in urls]
+        write()
+        for url, etag in zip(urls, before):
+            response = client.get(url, headers={**headers, "If-None-Match": etag})
+            assert response.status_code == 200, (write.__name__, url)
+            assert response.headers["ETag"] != etag
+
+
+def test_not_modified_skips_tree_and_aggregates(client, app_db):
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    for i in range(3):
+        client.post(f"/api/posts/{post_id}/comments", json={"content": f"c{i}"}, headers=headers)
+
+    for url in (f"/api/posts/{post_id}", f"/api/posts/{post_id}/comments"):
+        etag = etag_of(client, url, headers)
+        with count_queries() as statements:
+            assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+        # 只查詢貼文版本（黑名單由行程內索引判斷），不查留言與按讚
+        assert len(statements) <= 2, statements
+        assert not any("comments" in s or "likes" in s for s in statements), statements
+
+
+def test_blocked_viewer_gets_403_not_304(client, app_db):
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+    etag = etag_of(client, f"/api/posts/{post_id}", headers)
+
+    client.post("/api/blacklist", json={"blocked_user_id": author.id}, headers=headers)
+    assert client.get(f"/api/posts/{post_id}", headers={**headers, "If-None-Match": etag}).status_code == 403
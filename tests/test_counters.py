@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+測試反正規化計數欄位：API 寫入時同步維護，reconcile_counters 修正偏移
+"""
+from conftest import make_user
+
+
+def test_counters_follow_writes(client, app_db):
+    from models import Post, Comment
+
+    _, headers = make_user(app_db, "author")
+    post = client.post("/api/posts", json={"content": "hello"}, headers=headers).json()
+    top = client.post(f"/api/posts/{post['id']}/comments", json={"content": "top"}, headers=headers).json()
+    client.post(f"/api/posts/{post['id']}/comments", json={"content": "reply", "parent_id": top["id"]},
+                headers=headers)
+    like = client.post("/api/likes", json={"target_type": "post", "target_id": post["id"]}, headers=headers).json()
+    client.post("/api/likes", json={"target_type": "comment", "target_id": top["id"]}, headers=headers)
+
+    app_db.expire_all()
+    db_post = app_db.get(Post, post["id"])
+    db_top = app_db.get(Comment, top["id"])
+    assert (db_post.like_count, db_post.top_level_comment_count) == (1, 1)
+    assert (db_top.like_count, db_top.reply_count) == (1, 1)
+
+    client.delete(f"/api/likes/{like['id']}", headers=headers)
+    app_db.expire_all()
+    assert app_db.get(Post, post["id"]).like_count == 0
+
+
+def test_reconcile_fixes_drift(client, app_db):
+    from counters import reconcile_counters
+    from models import Post, Comment, Like, TargetType
+
+    author, _ = make_user(app_db, "author")
+    post = Post(user_id=author.id, content="hello", like_count=7)
+    app_db.add(post)
+    app_db.commit()
+    top = Comment(post_id=post.id, user_id=author.id, content="top")
+    app_db.add(top)
+    app_db.commit()
+    app_db.add(Comment(post_id=post.id, user_id=author.id, parent_id=top.id, content="reply"))
+    app_db.add(Like(user_id=author.id, target_type=TargetType.COMMENT, target_id=top.id))
+    app_db.commit()
+
+    fixed = reconcile_counters(app_db)
+    assert fixed == {
+        "posts.like_count": 1,
+        "posts.top_level_comment_count": 1,
+        "comments.like_count": 1,
+        "comments.reply_count": 1,
+    }
+
+    app_db.expire_all()
+    assert (post.like_count, post.top_level_comment_count) == (0, 1)
+    assert (top.like_count, top.reply_count) == (1, 1)
+    assert set(reconcile_counters(app_db).values()) == {0}
+
+
+def test_counter_updates_keep_updated_at(client, app_db):
+    """updated_at 表示內容被編輯，按讚、留言、回覆與重新計算不應變更"""
+    from counters import reconcile_counters
+    from models import Post, Comment
+
+    _, headers = make_user(app_db, "author")
+    post = client.post("/api/posts", json={"content": "hello"}, headers=headers).json()
+    top = client.post(f"/api/posts/{post['id']}/comments", json={"content": "top"}, headers=headers).json()
+    client.post(f"/api/posts/{post['id']}/comments", json={"content": "reply", "parent_id": top["id"]},
+                headers=headers)
+    client.put(f"/api/likes/post/{post['id']}", headers=headers)
+    client.put(f"/api/likes/comment/{top['id']}", headers=headers)
+
+    assert client.get(f"/api/posts/{post['id']}", headers=headers).json()["updated_at"] is None
+    comments = client.get(f"/api/posts/{post['id']}/comments", headers=headers).json()
+    assert [comment["updated_at"] for comment in comments] == [None]
+
+    app_db.query(Post).update({Post.like_count: 5, Post.updated_at: None})
+    app_db.query(Comment).update({Comment.reply_count: 5, Comment.updated_at: None})
+    app_db.commit()
+    reconcile_counters(app_db)
+    app_db.expire_all()
+    assert app_db.get(Post, post["id"]).updated_at is None
+    assert {comment.updated_at for comment in app_db.query(Comment)} == {None}
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+測試快速序列化路徑：FAST_SERIALIZATION=true 時各列表路由的回應內容與 response_model 路徑相同
+（orjson 與 pydantic_core 兩種序列化器），且保留 X-Next-Cursor Header
+"""
+import pytest
+
+from conftest import make_user
+
+
+@pytest.fixture(params=["orjson", "pydantic_core"])
+def serializer(request, monkeypatch):
+    import serialization
+
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def fetch_all(client, headers, post_id, comment_id):
+    urls = [
+        "/api/posts?limit=2",
+        "/api/posts?limit=2&cursor=",
+        f"/api/posts/{post_id}",
+        f"/api/posts/{post_id}/comments",
+        f"/api/posts/{post_id}/comments?limit=1&max_depth=2&reply_preview=1",
+        f"/api/posts/{post_id}/comments/{comment_id}/replies?limit=1",
+        f"/api/posts/{post_id}/comments?stream=true",
+    ]
+    responses = {}
+    for url in urls:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, url
+        responses[url] = (response.json(), response.headers.get("X-Next-Cursor"))
+    return responses
+
+
+@pytest.mark.parametrize("feed_mode", ["timeline", "global"])
+def test_fast_path_matches_response_model(client, app_db, serializer, override_settings, feed_mode):
+    override_settings(feed_mode=feed_mode)
+    author, headers = make_user(app_db, "author")
+    viewer, viewer_headers = make_user(app_db, "viewer")
+    post_ids = [client.post("/api/posts", json={"content": f"p{i}"}, headers=headers).json()["id"] for i in range(3)]
+    post_id = post_ids[-1]
+    comment_id = client.post(f"/api/posts/{post_id}/comments", json={"content": "c"}, headers=headers).json()["id"]
+    for i in range(3):
+        client.post(f"/api/posts/{post_id}/comments", json={"content": f"r{i}", "parent_id": comment_id},
+                    headers=viewer_headers)
+    client.put(f"/api/posts/{post_id}/pin", headers=headers)
+    client.put(f"/api/posts/{post_id}/comments/{comment_id}/top", headers=headers)
+    client.put(f"/api/likes/post/{post_id}", headers=viewer_headers)
+    client.put(f"/api/likes/comment/{comment_id}", headers=viewer_headers)
+
+    override_settings(fast_serialization=False)
+    expected = fetch_all(client, viewer_headers, post_id, comment_id)
+    override_settings(fast_serialization=True)
+    actual = fetch_all(client, viewer_headers, post_id, comment_id)
+
+    assert actual == expected
+    assert expected["/api/posts?limit=2&cursor="][1]
+
+
+def test_fast_path_with_cached_posts(client, app_db, serializer, override_settings):
+    from cache import set_cache
+
+    override_settings(cache_backend="memory")
+    set_cache(None)
+    try:
+        author, headers = make_user(app_db, "author")
+        post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+        override_settings(fast_serialization=False)
+        expected = client.get(f"/api/posts/{post_id}", headers=headers).json()
+        override_settings(fast_serialization=True)
+        # 第二次讀取由快取提供（作者與時間已是序列化後的值）
+        assert client.get(f"/api/posts/{post_id}", headers=headers).json() == expected
+        assert client.get("/api/posts", headers=headers).json() == [expected]
+    finally:
+        set_cache(None)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+測試貼文列表的游標分頁：完整走訪無重複/遺漏、翻頁期間新增貼文不影響、游標格式錯誤回傳 400
+"""
+from conftest import make_user
+
+
+def seed_posts(db, author, count: int, pinned=()):
+    from models import Post
+
+    posts = [Post(user_id=author.id, content=f"post {i}", is_pinned=i in pinned) for i in range(count)]
+    db.add_all(posts)
+    db.commit()
+    return posts
+
+
+def fetch_all(client, headers, limit: int):
+    """依游標走訪所有頁面，回傳 (貼文 ID 列表, 頁數)"""
+    ids, pages, cursor = [], 0, ""
+    while cursor is not None:
+        response = client.get("/api/posts", params={"cursor": cursor, "limit": limit}, headers=headers)
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+    return ids, pages
+
+
+def test_cursor_walks_feed_in_offset_order(client, app_db):
+    author, headers = make_user(app_db, "author")
+    seed_posts(app_db, author, 25, pinned={3, 17})
+
+    ids, pages = fetch_all(client, headers, limit=10)
+    offset_order = [item["id"] for item in client.get("/api/posts?limit=100", headers=headers).json()]
+
+    assert ids == offset_order
+    assert len(ids) == 25
+    assert pages == 3
+    assert ids[:2] == [18, 4]  # 置頂貼文在最前面
+
+
+def test_new_posts_between_pages_do_not_shift_cursor(client, app_db):
+    author, headers = make_user(app_db, "author")
+    seed_posts(app_db, author, 6)
+
+    first = client.get("/api/posts", params={"cursor": "", "limit": 3}, headers=headers)
+    seed_posts(app_db, author, 2)
+    second = client.get("/api/posts", params={"cursor": first.headers["X-Next-Cursor"], "limit": 3},
+                        headers=headers)
+
+    first_ids = [item["id"] for item in first.json()]
+    second_ids = [item["id"] for item in second.json()]
+    assert first_ids == [6, 5, 4]
+    assert second_ids == [3, 2, 1]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_invalid_cursor(client, app_db):
+    _, headers = make_user(app_db, "author")
+
+    response = client.get("/api/posts", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_crafted_cursor_types_are_rejected(client, app_db):
+    import base64
+    import json
+
+    _, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+
+    def crafted(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+    dt = {"dt": "2024-01-01T00:00:00"}
+    cases = [
+        ("/api/posts", [{"x": 1}, 1, 2]),
+        ("/api/posts", [[1], 1, 2]),
+        ("/api/posts", [0, 5, 1]),
+        ("/api/posts", [0, {"dt": "not-a-date"}, 1]),
+        ("/api/posts", [0, dt, "1"]),
+        ("/api/likes", [{"x": 1}]),
+        ("/api/likes", [None]),
+        (f"/api/posts/{post_id}/comments", [0, {"dt": 1}, 1]),
+        (f"/api/posts/{post_id}/comments", [0, dt, [1]]),
+    ]
+    for url, values in cases:
+        response = client.get(url, params={"cursor": crafted(values)}, headers=headers)
+        assert response.status_code == 400, (url, values, response.status_code)
+        assert response.json()["detail"] == "無效的分頁游標"
+
+    assert client.get("/api/posts", params={"cursor": crafted([0, dt, 1])}, headers=headers).status_code == 200
+
+
+def test_page_size_is_validated(client, app_db):
+    author, headers = make_user(app_db, "author")
+    client.post("/api/posts", json={"content": "hi"}, headers=headers)
+
+    for params in ({"cursor": "", "limit": 0}, {"limit": 0}, {"limit": -1}, {"cursor": "", "limit": -1},
+                   {"limit": 101}, {"skip": -1}):
+        assert client.get("/api/posts", params=params, headers=headers).status_code == 422, params
+    assert len(client.get("/api/posts", params={"cursor": "", "limit": 1}, headers=headers).json()) == 1
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+測試貼文列表的 SQL 查詢次數
+每頁的查詢次數必須固定，不可隨 limit 增加（避免 N+1 查詢回歸）
+"""
+from conftest import make_user, count_queries
+from counters import reconcile_counters
+
+
+def seed_posts(db, count: int):
+    from models import Post, Comment, Like, TargetType
+
+    author, _ = make_user(db, "author")
+    viewer, headers = make_user(db, "viewer")
+    posts = [Post(user_id=author.id, content=f"post {i}") for i in range(count)]
+    db.add_all(posts)
+    db.commit()
+    for post in posts:
+        db.add(Comment(post_id=post.id, user_id=author.id, content="hello"))
+        db.add(Like(user_id=author.id, target_type=TargetType.POST, target_id=post.id))
+    db.add(Like(user_id=viewer.id, target_type=TargetType.POST, target_id=posts[0].id))
+    db.commit()
+    reconcile_counters(db)
+    return posts, headers
+
+
+def test_get_posts_query_count_is_constant(client, app_db):
+    posts, headers = seed_posts(app_db, 50)
+    # 先暖機黑名單索引，只比較穩定狀態下的查詢次數
+    client.get("/api/posts?limit=1", headers=headers)
+
+    with count_queries() as small_page:
+        response = client.get("/api/posts?limit=5", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+    with count_queries() as full_page:
+        response = client.get("/api/posts?limit=50", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 50
+
+    assert len(full_page) == len(small_page), full_page
+
+
+def test_get_posts_aggregates(client, app_db):
+    posts, headers = seed_posts(app_db, 3)
+
+    response = client.get("/api/posts?limit=10", headers=headers)
+    by_id = {item["id"]: item for item in response.json()}
+
+    assert by_id[posts[0].id]["likes_count"] == 2
+    assert by_id[posts[0].id]["is_liked"] is True
+    assert by_id[posts[1].id]["likes_count"] == 1
+    assert by_id[posts[1].id]["is_liked"] is False
+    assert all(item["comments_count"] == 1 for item in by_id.values())
+
+
+
+def seed_comment_tree(db, author, viewer, depth: int, width: int):
+    """建立每層 width 則回覆、共 depth 層的留言樹"""
+    from models import Post, Comment, Like, TargetType
+
+    post = Post(user_id=author.id, content="viral")
+    db.add(post)
+    db.commit()
+
+    level = [None]
+    for _ in range(depth):
+        next_level = []
+        for parent_id in level:
+            for i in range(width):
+                comment = Comment(post_id=post.id, user_id=author.id, parent_id=parent_id, content=f"c{i}")
+                db.add(comment)
+                db.flush()
+                db.add(Like(user_id=viewer.id, target_type=TargetType.COMMENT, target_id=comment.id))
+                next_level.append(comment.id)
+        level = next_level
+    db.commit()
+    reconcile_counters(db)
+    return post
+
+
+def test_get_comments_query_count_is_constant(client, app_db):
+    author, _ = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    small_post = seed_comment_tree(app_db, author, viewer, depth=1, width=2)
+    large_post = seed_comment_tree(app_db, author, viewer, depth=4, width=3)
+    client.get(f"/api/posts/{small_post.id}/comments", headers=headers)
+
+    with count_queries() as small_tree:
+        response = client.get(f"/api/posts/{small_post.id}/comments", headers=headers)
+    assert response.status_code == 200
+
+    with count_queries() as large_tree:
+        response = client.get(f"/api/posts/{large_post.id}/comments", headers=headers)
+    assert response.status_code == 200
+
+    assert len(large_tree) == len(small_tree), large_tree
+
+
+def test_get_comments_tree_shape(client, app_db):
+    author, _ = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post = seed_comment_tree(app_db, author, viewer, depth=3, width=2)
+
+    tree = client.get(f"/api/posts/{post.id}/comments", headers=headers).json()
+
+    assert len(tree) == 2
+    for top in tree:
+        assert top["parent_id"] is None
+        assert top["likes_count"] == 1
+        assert top["is_liked"] is True
+        assert len(top["replies"]) == 2
+        for reply in top["replies"]:
+            assert reply["parent_id"] == top["id"]
+            assert len(reply["replies"]) == 2
+            assert all(leaf["replies"] == [] for leaf in reply["replies"])
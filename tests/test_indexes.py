@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+以 EXPLAIN QUERY PLAN 驗證熱點查詢使用複合索引，以及唯一索引擋下重複資料
+"""
+import pytest
+from sqlalchemy import select
+
+from conftest import make_user
+
+
+def query_plan(db, statement) -> str:
+    """回傳 SQLite 查詢計畫的文字描述"""
+    from database import engine
+
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def assert_uses_index(plan: str, index_name: str):
+    assert f"INDEX {index_name}" in plan, plan
+
+
+def test_likes_by_target_uses_index(app_db):
+    from models import Like, TargetType
+
+    plan = query_plan(app_db, select(Like.id).where(
+        Like.target_type == TargetType.POST,
+        Like.target_id == 1
+    ))
+    assert_uses_index(plan, "ix_likes_target")
+
+
+def test_like_status_uses_unique_index(app_db):
+    from models import Like, TargetType
+
+    plan = query_plan(app_db, select(Like.target_id).where(
+        Like.user_id == 1,
+        Like.target_type == TargetType.COMMENT,
+        Like.target_id.in_([1, 2, 3])
+    ))
+    assert_uses_index(plan, "uq_likes_user_target")
+
+
+def test_comments_by_post_and_parent_uses_index(app_db):
+    from models import Comment
+
+    plan = query_plan(app_db, select(Comment.id).where(
+        Comment.post_id == 1,
+        Comment.parent_id.is_(None)
+    ))
+    assert_uses_index(plan, "ix_comments_post_parent")
+
+
+def test_post_feed_order_uses_index(app_db):
+    from models import Post
+
+    plan = query_plan(app_db, select(Post.id).order_by(
+        Post.is_pinned.desc(), Post.created_at.desc()
+    ).limit(10))
+    assert_uses_index(plan, "ix_posts_pinned_created")
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_post_feed_cursor_seeks_index(app_db):
+    from datetime import datetime
+
+    from sqlalchemy import tuple_
+
+    from models import Post
+
+    plan = query_plan(app_db, select(Post.id).where(
+        tuple_(Post.is_pinned, Post.created_at, Post.id) < (False, datetime(2024, 1, 1), 100)
+    ).order_by(Post.is_pinned.desc(), Post.created_at.desc(), Post.id.desc()).limit(10))
+    # 游標條件直接在索引上定位（SEARCH），而非掃描後略過前面的列
+    assert "SEARCH" in plan and "ix_posts_pinned_created" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_blacklist_check_uses_unique_index(app_db):
+    from models import Blacklist
+
+    plan = query_plan(app_db, select(Blacklist.id).where(
+        Blacklist.user_id == 1,
+        Blacklist.blocked_user_id == 2
+    ))
+    assert_uses_index(plan, "uq_blacklists_user_blocked")
+
+
+def test_unique_indexes_reject_duplicates(app_db):
+    from sqlalchemy.exc import IntegrityError
+    from models import Like, Blacklist, TargetType
+
+    user, _ = make_user(app_db, "alice")
+    other, _ = make_user(app_db, "bob")
+    app_db.add(Like(user_id=user.id, target_type=TargetType.POST, target_id=1))
+    app_db.commit()
+    app_db.add(Like(user_id=user.id, target_type=TargetType.POST, target_id=1))
+    with pytest.raises(IntegrityError):
+        app_db.commit()
+    app_db.rollback()
+
+    app_db.add(Blacklist(user_id=user.id, blocked_user_id=other.id))
+    app_db.commit()
+    app_db.add(Blacklist(user_id=user.id, blocked_user_id=other.id))
+    with pytest.raises(IntegrityError):
+        app_db.commit()
+
+
+def test_timeline_read_is_index_range_scan(app_db):
+    from models import Post, TimelineEntry
+
+    entry = TimelineEntry
+    plan = query_plan(app_db, select(entry.post_id).where(entry.user_id == 1).order_by(
+        entry.is_pinned.desc(), entry.created_at.desc(), entry.post_id.desc()
+    ).limit(10))
+    assert_uses_index(plan, "ix_timeline_entries_feed")
+    assert "TEMP B-TREE" not in plan, plan
+
+    plan = query_plan(app_db, select(Post.id).where(Post.fanned_out == False).order_by(  # noqa: E712
+        Post.is_pinned.desc(), Post.created_at.desc(), Post.id.desc()
+    ).limit(10))
+    assert "ix_posts_fanout_pinned_created" in plan and "TEMP B-TREE" not in plan, plan
+
+
+def test_likes_by_user_page_uses_index(app_db):
+    from models import Like
+
+    plan = query_plan(app_db, select(Like).where(Like.user_id == 1, Like.id < 100).order_by(Like.id.desc()).limit(50))
+    assert_uses_index(plan, "ix_likes_user")
+    assert "TEMP B-TREE" not in plan
+
+
+def test_timeline_trim_is_scoped_to_receiving_timelines(app_db):
+    from timeline import overflow_after_fan_out
+
+    plan = query_plan(app_db, overflow_after_fan_out(1))
+    # 以 post_id 索引找出收到貼文的時報，每個時報沿 feed 索引找第 N + 1 筆，不掃描整個資料表、不排序
+    assert_uses_index(plan, "ix_timeline_entries_post")
+    assert_uses_index(plan, "ix_timeline_entries_feed")
+    assert "SCAN timeline_entries" not in plan and "TEMP B-TREE" not in plan, plan
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+測試寫入副作用的工作佇列：background / worker 模式延後執行副作用、
+工作被重新取得時不重複套用、失敗重試與放棄，以及刪除貼文時串聯刪除留言與按讚
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import make_user
+
+
+@pytest.fixture
+def background_client(app_db, override_settings):
+    """以 background 模式啟動應用程式（啟動時建立工作佇列）"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    override_settings(jobs_mode="background")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def drain(client):
+    from jobs import job_queue
+
+    client.portal.call(job_queue.drain)
+
+
+def jobs_by_status(db):
+    from models import Job
+
+    db.expire_all()
+    return {job.label: job.status for job in db.query(Job)}
+
+
+def test_background_side_effects(background_client, app_db):
+    client = background_client
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    client.get("/api/posts", headers=headers)
+
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+    client.post("/api/likes", json={"target_type": "post", "target_id": post_id}, headers=headers)
+    client.post(f"/api/posts/{post_id}/comments", json={"content": "c"}, headers=headers)
+    drain(client)
+
+    post = client.get(f"/api/posts/{post_id}", headers=headers).json()
+    assert (post["likes_count"], post["comments_count"]) == (1, 1)
+    assert [item["id"] for item in client.get("/api/posts", headers=headers).json()] == [post_id]
+    assert set(jobs_by_status(app_db).values()) == {"done"}
+
+    metrics = client.get("/metrics").json()["jobs"]
+    assert metrics["mode"] == "background"
+    assert metrics["processed"] >= 3
+    assert metrics["depth"] == {"done": 3}
+
+
+def test_reused_row_ids_do_not_skip_side_effects(background_client, app_db, override_settings):
+    from models import Post, TimelineEntry
+
+    client = background_client
+    override_settings(feed_mode="timeline")
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    client.get("/api/posts", headers=headers)
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+
+    # 按讚 → 取消 → 再按讚：SQLite 重新使用刪除後的最大 rowid，第二次按讚的 ID 與第一次相同
+    like = {"target_type": "post", "target_id": post_id}
+    like_id = client.post("/api/likes", json=like, headers=headers).json()["id"]
+    drain(client)
+    client.delete(f"/api/likes/{like_id}", headers=headers)
+    drain(client)
+    assert client.post("/api/likes", json=like, headers=headers).json()["id"] == like_id
+    drain(client)
+    assert client.get(f"/api/posts/{post_id}", headers=headers).json()["likes_count"] == 1
+
+    # 刪除貼文後新貼文重新使用相同 ID：仍推送到時報，再次刪除仍串聯刪除
+    client.delete(f"/api/posts/{post_id}", headers=author_headers)
+    drain(client)
+    assert client.post("/api/posts", json={"content": "again"}, headers=author_headers).json()["id"] == post_id
+    drain(client)
+    app_db.expire_all()
+    assert app_db.query(TimelineEntry).filter(TimelineEntry.user_id == viewer.id).count() == 1
+    client.delete(f"/api/posts/{post_id}", headers=author_headers)
+    drain(client)
+    app_db.expire_all()
+    assert app_db.query(Post).count() == 0
+
+
+def test_worker_mode_only_records_jobs(client, app_db, override_settings):
+    from jobs import run_job, due_job_ids
+
+    override_settings(jobs_mode="worker")
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    client.post("/api/likes", json={"target_type": "post", "target_id": post_id}, headers=headers)
+
+    jobs = jobs_by_status(app_db)
+    assert sorted(jobs) == [f"fan_out_post:{post_id}", "like_count:1:add"]
+    assert set(jobs.values()) == {"pending"}
+    assert client.get(f"/api/posts/{post_id}", headers=headers).json()["likes_count"] == 0
+
+    # 由 worker 行程執行（此處直接在應用程式的事件迴圈中執行）
+    for job_id in client.portal.call(due_job_ids):
+        assert client.portal.call(run_job, job_id) is True
+    assert client.get(f"/api/posts/{post_id}", headers=headers).json()["likes_count"] == 1
+
+
+def test_job_reclaimed_after_lease_is_applied_once(client, app_db, override_settings, monkeypatch):
+    from sqlalchemy import update
+    from database import AsyncSessionLocal
+    from jobs import HANDLERS, enqueue, run_job
+    from models import Job, Post
+
+    override_settings(jobs_mode="worker")
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    runs = []
+
+    async def bump(db, post_id):
+        runs.append(post_id)
+        if len(runs) == 1:
+            # 第一次執行超過租約：工作被重新排入並由另一個 worker 取得、完成
+            async with AsyncSessionLocal() as other:
+                await other.execute(update(Job).where(Job.id == job_id).values(status="pending"))
+                await other.commit()
+            assert await run_job(job_id) is True
+        await db.execute(update(Post).where(Post.id == post_id).values(like_count=Post.like_count + 1))
+
+    monkeypatch.setitem(HANDLERS, "test_bump", bump)
+
+    async def create():
+        async with AsyncSessionLocal() as db:
+            await enqueue(db, "test_bump", {"post_id": post_id}, label="bump")
+            await db.commit()
+            return db.info["enqueued_jobs"][0]
+
+    job_id = client.portal.call(create)
+    # 原本的執行失去取得權，副作用回滾
+    assert client.portal.call(run_job, job_id) is None
+    assert len(runs) == 2
+
+    app_db.expire_all()
+    assert app_db.get(Post, post_id).like_count == 1
+    job = app_db.query(Job).filter(Job.label == "bump").one()
+    assert (job.status, job.attempts) == ("done", 2)
+
+
+def test_failed_job_retries_then_gives_up(client, app_db, override_settings, monkeypatch):
+    from database import AsyncSessionLocal
+    from jobs import HANDLERS, enqueue, run_job
+    from models import Job
+
+    override_settings(jobs_mode="worker", jobs_retry_base_seconds=0, jobs_max_attempts=2)
+    calls = []
+
+    async def flaky(db, fail_times):
+        calls.append(1)
+        if len(calls) <= fail_times:
+            raise RuntimeError("暫時失敗")
+
+    monkeypatch.setitem(HANDLERS, "test_flaky", flaky)
+
+    async def create(key, fail_times):
+        async with AsyncSessionLocal() as db:
+            await enqueue(db, "test_flaky", {"fail_times": fail_times}, label=key)
+            await db.commit()
+            return db.info["enqueued_jobs"][0]
+
+    recovers = client.portal.call(create, "recovers", 1)
+    assert client.portal.call(run_job, recovers) is False
+    assert client.portal.call(run_job, recovers) is True
+
+    calls.clear()
+    gives_up = client.portal.call(create, "gives_up", 5)
+    assert client.portal.call(run_job, gives_up) is False
+    assert client.portal.call(run_job, gives_up) is False
+    assert client.portal.call(run_job, gives_up) is None
+
+    app_db.expire_all()
+    jobs = {job.label: job for job in app_db.query(Job)}
+    assert (jobs["recovers"].status, jobs["recovers"].attempts) == ("done", 2)
+    assert (jobs["gives_up"].status, jobs["gives_up"].attempts) == ("failed", 2)
+    assert "暫時失敗" in jobs["gives_up"].last_error
+
+
+def test_stop_finishes_in_flight_jobs_and_releases_cancelled_ones(client, app_db, override_settings, monkeypatch):
+    import asyncio
+    from database import AsyncSessionLocal
+    from jobs import HANDLERS, JobQueue, enqueue
+    from models import Job
+
+    override_settings(jobs_mode="worker")
+
+    async def slow(db, seconds):
+        await asyncio.sleep(seconds)
+
+    monkeypatch.setitem(HANDLERS, "test_slow", slow)
+
+    async def stop_while_running(key, seconds, timeout):
+        queue = JobQueue(workers=1, poll_interval=60)
+        await queue.start()
+        async with AsyncSessionLocal() as db:
+            await enqueue(db, "test_slow", {"seconds": seconds}, label=key)
+            await db.commit()
+            queue.notify(db.info["enqueued_jobs"])
+        while not queue.in_flight:
+            await asyncio.sleep(0.01)
+        await queue.stop(timeout=timeout)
+
+    # 停止時等待執行中的工作完成
+    client.portal.call(stop_while_running, "finishes", 0.2, 5)
+    # 逾時被取消的工作放回待處理，不停留在 running
+    client.portal.call(stop_while_running, "cancelled", 60, 0.1)
+
+    app_db.expire_all()
+    jobs = {job.label: job for job in app_db.query(Job)}
+    assert jobs["finishes"].status == "done"
+    assert (jobs["cancelled"].status, jobs["cancelled"].attempts) == ("pending", 0)
+
+
+def test_poller_requeues_stale_running_jobs(client, app_db, override_settings, monkeypatch):
+    import asyncio
+    from sqlalchemy import update
+    from database import AsyncSessionLocal
+    from jobs import HANDLERS, JobQueue, enqueue
+    from models import Job
+
+    override_settings(jobs_mode="worker", jobs_lease_seconds=60)
+
+    async def noop(db):
+        pass
+
+    monkeypatch.setitem(HANDLERS, "test_noop", noop)
+
+    async def run():
+        queue = JobQueue(workers=1, poll_interval=0.05)
+        queue.requeue_interval = 0.05
+        await queue.start()
+        try:
+            # 啟動後才中斷的工作（例如另一個 worker 行程執行到一半被終止）
+            async with AsyncSessionLocal() as db:
+                await enqueue(db, "test_noop", {}, label="stale")
+                await db.execute(update(Job).where(Job.label == "stale").values(
+                    status="running", attempts=1, updated_at=datetime(2000, 1, 1, tzinfo=timezone.utc)
+                ))
+                await db.commit()
+            for _ in range(100):
+                if queue.processed:
+                    return
+                await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+
+    client.portal.call(run)
+    assert jobs_by_status(app_db) == {"stale": "done"}
+
+
+def test_delete_post_cascades(client, app_db):
+    from models import Post, Comment, Like
+
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    comment_id = client.post(f"/api/posts/{post_id}/comments", json={"content": "c"}, headers=headers).json()["id"]
+    client.post(f"/api/posts/{post_id}/comments", json={"content": "r", "parent_id": comment_id}, headers=headers)
+    client.post("/api/likes", json={"target_type": "post", "target_id": post_id}, headers=headers)
+    client.post("/api/likes", json={"target_type": "comment", "target_id": comment_id}, headers=headers)
+
+    assert client.delete(f"/api/posts/{post_id}", headers=headers).status_code == 200
+    app_db.expire_all()
+    assert app_db.query(Post).count() == 0
+    assert app_db.query(Comment).count() == 0
+    assert app_db.query(Like).count() == 0
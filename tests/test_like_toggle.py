@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+測試按讚切換端點：PUT / DELETE /api/likes/{target_type}/{target_id} 冪等、
+一次回傳按讚狀態與最新按讚數，以及權限檢查
+"""
+from conftest import make_user
+
+
+def test_like_and_unlike_are_idempotent(client, app_db):
+    from models import Like
+
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+    client.put(f"/api/likes/post/{post_id}", headers=author_headers)
+
+    for _ in range(2):
+        response = client.put(f"/api/likes/post/{post_id}", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"target_type": "post", "target_id": post_id, "is_liked": True, "likes_count": 2}
+    app_db.expire_all()
+    assert app_db.query(Like).count() == 2
+
+    for _ in range(2):
+        response = client.delete(f"/api/likes/post/{post_id}", headers=headers)
+        assert response.json() == {"target_type": "post", "target_id": post_id, "is_liked": False, "likes_count": 1}
+
+    post = client.get(f"/api/posts/{post_id}", headers=headers).json()
+    assert (post["likes_count"], post["is_liked"]) == (1, False)
+
+
+def test_toggle_comment_like(client, app_db):
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    comment_id = client.post(f"/api/posts/{post_id}/comments", json={"content": "c"}, headers=headers).json()["id"]
+
+    assert client.put(f"/api/likes/comment/{comment_id}", headers=headers).json()["likes_count"] == 1
+    comment = client.get(f"/api/posts/{post_id}/comments", headers=headers).json()[0]
+    assert (comment["likes_count"], comment["is_liked"]) == (1, True)
+    assert client.delete(f"/api/likes/comment/{comment_id}", headers=headers).json()["likes_count"] == 0
+
+
+def test_toggle_permissions(client, app_db):
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=author_headers).json()["id"]
+    client.put(f"/api/likes/post/{post_id}", headers=headers)
+    client.post("/api/blacklist", json={"blocked_user_id": author.id}, headers=headers)
+
+    assert client.put("/api/likes/post/9999", headers=headers).status_code == 404
+    assert client.put(f"/api/likes/share/{post_id}", headers=headers).status_code == 422
+    assert client.put(f"/api/likes/post/{post_id}", headers=headers).status_code == 403
+    # 封鎖後仍可取消先前的按讚
+    assert client.delete(f"/api/likes/post/{post_id}", headers=headers).json()["likes_count"] == 0
+
+
+def test_toggle_count_includes_deferred_change(client, app_db, override_settings):
+    from jobs import run_job, due_job_ids
+
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    override_settings(jobs_mode="worker")
+    # 計數工作尚未執行，回傳值已包含本次按讚
+    assert client.put(f"/api/likes/post/{post_id}", headers=headers).json()["likes_count"] == 1
+    job_ids = client.portal.call(due_job_ids)
+    assert len(job_ids) == 1
+    client.portal.call(run_job, job_ids[0])
+    # 重複按讚不再建立計數工作
+    assert client.put(f"/api/likes/post/{post_id}", headers=headers).json()["likes_count"] == 1
+    assert client.portal.call(due_job_ids) == []
+
+
+def test_toggle_repeatedly_with_deferred_counts(client, app_db, override_settings):
+    from jobs import run_job, due_job_ids
+
+    author, headers = make_user(app_db, "author")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    override_settings(jobs_mode="worker")
+
+    # 每次按讚都重新使用刪除後的按讚 ID，每次變更的計數工作都必須執行
+    for method, expected in [("put", 1), ("delete", 0), ("put", 1), ("delete", 0), ("put", 1)]:
+        getattr(client, method)(f"/api/likes/post/{post_id}", headers=headers)
+        for job_id in client.portal.call(due_job_ids):
+            assert client.portal.call(run_job, job_id) is True
+        assert client.get(f"/api/posts/{post_id}", headers=headers).json()["likes_count"] == expected
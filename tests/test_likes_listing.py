@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+測試按讚列表：游標分頁與篩選、依目標彙總的按讚數，以及 NDJSON 串流匯出
+"""
+import json
+
+import pytest
+
+from conftest import make_user
+
+
+@pytest.fixture
+def likes(client, app_db):
+    """兩位使用者對三篇貼文按讚，另一位對留言按讚；回傳 (headers, 使用者, 貼文 ID, 留言 ID)"""
+    author, headers = make_user(app_db, "author")
+    fan, fan_headers = make_user(app_db, "fan")
+    post_ids = [client.post("/api/posts", json={"content": f"p{i}"}, headers=headers).json()["id"] for i in range(3)]
+    comment_id = client.post(f"/api/posts/{post_ids[0]}/comments", json={"content": "c"}, headers=headers).json()["id"]
+    for post_id in post_ids:
+        client.put(f"/api/likes/post/{post_id}", headers=headers)
+        client.put(f"/api/likes/post/{post_id}", headers=fan_headers)
+    client.put(f"/api/likes/comment/{comment_id}", headers=fan_headers)
+    return headers, (author, fan), post_ids, comment_id
+
+
+def walk(client, headers, url, limit):
+    ids, cursor = [], ""
+    while cursor is not None:
+        separator = "&" if "?" in url else "?"
+        response = client.get(f"{url}{separator}limit={limit}&cursor={cursor}", headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()) <= limit
+        ids += [like["id"] for like in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    return ids
+
+
+def test_likes_are_paginated_and_filtered(client, likes):
+    headers, (author, fan), post_ids, comment_id = likes
+
+    assert walk(client, headers, "/api/likes", limit=3) == list(range(7, 0, -1))
+    assert len(walk(client, headers, f"/api/likes?user_id={fan.id}", limit=2)) == 4
+    by_target = client.get(f"/api/likes?target_type=post&target_id={post_ids[1]}", headers=headers).json()
+    assert {like["user_id"] for like in by_target} == {author.id, fan.id}
+    comment_likes = client.get(f"/api/likes?user_id={fan.id}&target_type=comment", headers=headers).json()
+    assert [like["target_id"] for like in comment_likes] == [comment_id]
+
+    assert client.get(f"/api/likes?target_id={post_ids[0]}", headers=headers).status_code == 400
+    assert client.get("/api/likes?cursor=broken", headers=headers).status_code == 400
+
+
+def test_page_size_is_capped(client, likes, override_settings):
+    headers = likes[0]
+    override_settings(likes_page_max_size=2)
+
+    response = client.get("/api/likes?limit=100", headers=headers)
+    assert len(response.json()) == 2
+    assert response.headers["X-Next-Cursor"]
+
+
+def test_like_counts_by_target(client, likes):
+    headers, users, post_ids, comment_id = likes
+    client.delete(f"/api/likes/post/{post_ids[2]}", headers=headers)
+
+    query = "&".join(f"target_ids={i}" for i in [post_ids[2], 9999, post_ids[0], post_ids[2]])
+    counts = client.get(f"/api/likes/counts?target_type=post&{query}", headers=headers).json()
+    assert counts == [
+        {"target_type": "post", "target_id": post_ids[2], "likes_count": 1},
+        {"target_type": "post", "target_id": post_ids[0], "likes_count": 2},
+    ]
+    counts = client.get(f"/api/likes/counts?target_type=comment&target_ids={comment_id}", headers=headers).json()
+    assert counts[0]["likes_count"] == 1
+
+
+def test_export_streams_ndjson_in_batches(client, likes, override_settings):
+    from conftest import count_queries
+
+    headers, (author, fan), post_ids, comment_id = likes
+    override_settings(likes_export_batch_size=2)
+
+    with count_queries() as statements:
+        response = client.get("/api/likes/export", headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == list(range(1, 8))
+    assert set(rows[0]) == {"id", "user_id", "target_type", "target_id", "created_at"}
+    # 7 筆、每批 2 筆：4 批有資料，最後一次查詢確認結束
+    assert sum("FROM likes" in statement for statement in statements) == 5
+
+    response = client.get(f"/api/likes/export?user_id={author.id}&target_type=post", headers=headers)
+    assert [json.loads(line)["target_id"] for line in response.text.splitlines()] == post_ids
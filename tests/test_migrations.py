@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+測試資料庫結構遷移：舊版資料庫升級（補欄位、移除重複資料、重新計算計數、建立索引）、
+版本記錄、重複執行不變更、遷移鎖，以及應用程式啟動時不執行 DDL
+"""
+import os
+import threading
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+from conftest import TEST_DB_DIR
+
+# 加入計數欄位、軟刪除與唯一索引之前的資料表結構
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL, email VARCHAR(100) NOT NULL, "
+    "password_hash VARCHAR(255) NOT NULL, created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE posts (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, content TEXT NOT NULL, "
+    "created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE comments (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+    "parent_id INTEGER, content TEXT NOT NULL, is_top_comment BOOLEAN, created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE likes (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, target_type VARCHAR(7) NOT NULL, "
+    "target_id INTEGER NOT NULL, created_at DATETIME)",
+    "CREATE TABLE blacklists (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, blocked_user_id INTEGER NOT NULL, "
+    "created_at DATETIME)",
+    # 最初版本 create_all 建立的索引
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    *(f"CREATE INDEX ix_{table}_id ON {table} (id)" for table in ("users", "posts", "comments", "likes", "blacklists")),
+    "INSERT INTO users (id, username, email, password_hash) VALUES (1, 'alice', 'a@example.com', 'x'), "
+    "(2, 'bob', 'b@example.com', 'x')",
+    "INSERT INTO posts (id, user_id, content, updated_at) VALUES (1, 1, 'hi', '2024-01-01 00:00:00')",
+    "INSERT INTO comments (id, post_id, user_id, content) VALUES (1, 1, 2, 'c')",
+    "INSERT INTO comments (id, post_id, user_id, parent_id, content) VALUES (2, 1, 1, 1, 'r')",
+    # bob 對貼文按讚兩次（加入唯一索引前可能發生）
+    "INSERT INTO likes (user_id, target_type, target_id) VALUES (2, 'POST', 1), (2, 'POST', 1), (1, 'COMMENT', 1)",
+    "INSERT INTO blacklists (user_id, blocked_user_id) VALUES (1, 2), (1, 2)",
+]
+
+
+@pytest.fixture
+def db_engine(request):
+    """獨立的 SQLite 資料庫檔案（不影響其他測試使用的資料庫）"""
+    from database import create_db_engine
+
+    path = os.path.join(TEST_DB_DIR, f"{request.node.name}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    db_engine = create_db_engine(f"sqlite:///{path}")
+    yield db_engine
+    db_engine.dispose()
+
+
+def test_fresh_database_migrates_to_head(db_engine):
+    from database import Base
+    from migrations import run_migrations, applied_versions, head_version, MIGRATIONS
+
+    assert run_migrations(db_engine) == sorted(MIGRATIONS)
+    assert applied_versions(db_engine)[-1] == head_version()
+    assert set(Base.metadata.tables) <= set(inspect(db_engine).get_table_names())
+    # 已是最新版本，重新執行不套用任何遷移
+    assert run_migrations(db_engine) == []
+
+
+def test_migrated_schema_matches_models(db_engine):
+    """遷移不引用模型；模型新增資料表、欄位或索引而未加入遷移時失敗"""
+    from database import Base
+    from migrations import run_migrations
+
+    run_migrations(db_engine)
+
+    db_inspector = inspect(db_engine)
+    for table in Base.metadata.sorted_tables:
+        assert {column["name"] for column in db_inspector.get_columns(table.name)} == set(table.c.keys()), table.name
+        assert {index["name"] for index in db_inspector.get_indexes(table.name)} == {
+            index.name for index in table.indexes
+        }, table.name
+
+
+def test_legacy_database_is_upgraded(db_engine):
+    from database import Base
+    from migrations import run_migrations
+
+    with db_engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    run_migrations(db_engine)
+
+    db_inspector = inspect(db_engine)
+    assert {"like_count", "top_level_comment_count", "deleted_at", "version"} <= {
+        column["name"] for column in db_inspector.get_columns("posts")
+    }
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in db_inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= existing
+    with db_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM likes")).scalar() == 2
+        assert conn.execute(text("SELECT COUNT(*) FROM blacklists")).scalar() == 1
+        # 新增的計數欄位依現有資料（移除重複後）重新計算
+        assert conn.execute(text(
+            "SELECT like_count, top_level_comment_count, version, fanned_out FROM posts"
+        )).one() == (1, 1, 1, 1)
+        assert conn.execute(text("SELECT like_count, reply_count FROM comments WHERE id = 1")).one() == (1, 1)
+        # 重新計算計數不是內容編輯，updated_at 維持原值
+        assert conn.execute(text("SELECT updated_at FROM posts")).scalar() == "2024-01-01 00:00:00"
+
+
+def test_job_idempotency_key_becomes_label(db_engine):
+    from migrations import MIGRATIONS, run_migrations
+
+    for version in range(1, 7):
+        with db_engine.begin() as conn:
+            MIGRATIONS[version].apply(conn)
+    with db_engine.begin() as conn:
+        conn.execute(text("INSERT INTO jobs (kind, payload, idempotency_key) VALUES ('fan_out_post', '{}', 'fan_out_post:1')"))
+
+    run_migrations(db_engine)
+
+    db_inspector = inspect(db_engine)
+    assert "idempotency_key" not in {column["name"] for column in db_inspector.get_columns("jobs")}
+    assert db_inspector.get_unique_constraints("jobs") == []
+    with db_engine.begin() as conn:
+        # 相同標籤可以重複
+        conn.execute(text("INSERT INTO jobs (kind, payload, label) VALUES ('fan_out_post', '{}', 'fan_out_post:1')"))
+        assert conn.execute(text("SELECT status, label FROM jobs")).all() == [("pending", "fan_out_post:1")] * 2
+
+
+def test_concurrent_runs_apply_each_migration_once(db_engine):
+    from migrations import run_migrations, MIGRATIONS
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(run_migrations(db_engine))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(version for applied in results for version in applied) == sorted(MIGRATIONS)
+    with db_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_migration_lock")).scalar() == 0
+
+
+def test_lock_waits_then_times_out_or_replaces_stale_lock(db_engine):
+    from migrations import run_migrations, acquire_lock, release_lock
+
+    run_migrations(db_engine)
+    owner = acquire_lock(db_engine)
+    with pytest.raises(TimeoutError):
+        acquire_lock(db_engine, timeout=0.3)
+    # 持有者中斷後遺留的鎖超過 stale_after 即可被取代
+    with db_engine.begin() as conn:
+        conn.execute(text("UPDATE schema_migration_lock SET locked_at = '2000-01-01 00:00:00'"))
+    new_owner = acquire_lock(db_engine, timeout=0.3)
+    assert new_owner != owner
+    release_lock(db_engine, new_owner)
+
+
+def test_app_startup_runs_no_ddl(app_db):
+    from fastapi.testclient import TestClient
+    from database import engine, async_engine
+    from main import app
+    from migrations import run_migrations
+
+    run_migrations(engine)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for db_engine in (engine, async_engine.sync_engine):
+        event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        with TestClient(app):
+            pass
+    finally:
+        for db_engine in (engine, async_engine.sync_engine):
+            event.remove(db_engine, "before_cursor_execute", before_cursor_execute)
+
+    # 啟動時只查詢一次結構版本
+    assert len(statements) == 1 and "schema_migrations" in statements[0], statements
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+測試密碼雜湊工作池：結果正確、佇列滿時回傳 503 與 Retry-After
+"""
+import asyncio
+
+import pytest
+
+
+def test_hash_and_verify_in_pool():
+    from password_pool import PasswordHashPool
+
+    pool = PasswordHashPool(workers=2, max_pending=4)
+
+    async def scenario():
+        hashed = await pool.hash("password123")
+        return hashed, await pool.verify("password123", hashed), await pool.verify("wrong", hashed)
+
+    try:
+        hashed, ok, bad = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    assert hashed.startswith("$2b$")
+    assert ok is True
+    assert bad is False
+    stats = pool.stats()
+    assert stats["calls"] == 3
+    assert stats["pending"] == 0
+    assert stats["avg_run_ms"] > 0
+
+
+def test_full_queue_returns_503():
+    from fastapi import HTTPException
+    from password_pool import PasswordHashPool
+
+    pool = PasswordHashPool(workers=1, max_pending=1, retry_after=3)
+
+    async def scenario():
+        return await asyncio.gather(pool.hash("first"), pool.hash("second"), return_exceptions=True)
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    assert isinstance(first, str)
+    assert isinstance(second, HTTPException)
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == "3"
+    assert pool.stats()["rejected"] == 1
+
+
+def test_unknown_executor_kind():
+    from password_pool import PasswordHashPool
+
+    with pytest.raises(ValueError):
+        PasswordHashPool(executor_kind="fiber")
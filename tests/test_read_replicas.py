@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+測試讀寫分流：以資料庫檔案的複本模擬唯讀副本，GET 請求讀取副本，
+寫入請求與寫入後的黏著期間（cookie）讀取主資料庫
+"""
+import os
+import time
+
+import pytest
+
+from conftest import make_user, TEST_DB_DIR
+
+REPLICA_PATH = os.path.join(TEST_DB_DIR, "replica.db")
+
+
+@pytest.fixture
+def replica(client):
+    """回傳將主資料庫複製到副本的函式（模擬複寫追上進度）"""
+    from database import copy_sqlite_database, read_router
+
+    copy_sqlite_database(REPLICA_PATH)
+    client.portal.call(read_router.configure, [f"sqlite:///{REPLICA_PATH}"])
+    yield lambda: copy_sqlite_database(REPLICA_PATH)
+    client.portal.call(read_router.configure, [])
+
+
+def test_reads_use_replica_and_writes_use_primary(client, app_db, replica):
+    from database import read_router
+
+    author, headers = make_user(app_db, "author")
+    viewer, viewer_headers = make_user(app_db, "viewer")
+    replica()
+    # 寫入一定送到主資料庫
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+
+    client.cookies.clear()
+    reads = read_router.replica_reads
+    # 副本尚未複製到新貼文
+    assert client.get(f"/api/posts/{post_id}", headers=viewer_headers).status_code == 404
+    assert read_router.replica_reads == reads + 1
+
+    replica()
+    assert client.get(f"/api/posts/{post_id}", headers=viewer_headers).json()["content"] == "hi"
+
+
+def test_read_your_writes_window(client, app_db, replica):
+    from database import READ_PRIMARY_COOKIE
+
+    author, headers = make_user(app_db, "author")
+    replica()
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    assert float(client.cookies[READ_PRIMARY_COOKIE]) > time.time()
+
+    # 黏著期間內讀得到自己剛寫入的資料
+    assert client.get(f"/api/posts/{post_id}", headers=headers).status_code == 200
+    response = client.post(f"/api/posts/{post_id}/comments", json={"content": "c"}, headers=headers)
+    assert response.status_code == 201
+    assert [c["content"] for c in client.get(f"/api/posts/{post_id}/comments", headers=headers).json()] == ["c"]
+
+    # 黏著期間結束後回到副本
+    client.cookies.set(READ_PRIMARY_COOKIE, str(time.time() - 1))
+    assert client.get(f"/api/posts/{post_id}", headers=headers).status_code == 404
+
+
+def test_timeline_is_built_on_primary(client, app_db, replica, override_settings):
+    from models import Timeline
+
+    override_settings(feed_mode="timeline")
+    author, headers = make_user(app_db, "author")
+    client.post("/api/posts", json={"content": "hi"}, headers=headers)
+    replica()
+    client.cookies.clear()
+
+    # 副本上沒有時報：在主資料庫建立並由主資料庫回應
+    assert [post["content"] for post in client.get("/api/posts", headers=headers).json()] == ["hi"]
+    app_db.expire_all()
+    assert app_db.get(Timeline, author.id) is not None
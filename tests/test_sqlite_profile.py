@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+測試 SQLite 連線設定檔：production 在每個連線套用 WAL 等 PRAGMA，
+並以固定大小的連線池重複使用連線；default 維持 SQLite 預設值
+"""
+import os
+
+import pytest
+from sqlalchemy import text
+
+from conftest import TEST_DB_DIR
+
+
+def pragma_values(connection):
+    return {
+        name: connection.execute(text(f"PRAGMA {name}")).scalar()
+        for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "temp_store")
+    }
+
+
+def test_production_profile_pragmas():
+    from config import settings
+    from database import create_db_engine
+
+    engine = create_db_engine(f"sqlite:///{os.path.join(TEST_DB_DIR, 'profile.db')}", profile="production")
+    try:
+        with engine.connect() as connection:
+            assert pragma_values(connection) == {
+                "journal_mode": "wal",
+                "synchronous": 1,  # NORMAL
+                "busy_timeout": settings.sqlite_busy_timeout_ms,
+                "cache_size": -settings.sqlite_cache_size_kib,
+                "temp_store": 2,  # MEMORY
+            }
+        assert engine.pool.size() == settings.db_pool_size
+    finally:
+        engine.dispose()
+
+
+def test_default_profile_keeps_sqlite_defaults():
+    from database import create_db_engine
+
+    engine = create_db_engine(f"sqlite:///{os.path.join(TEST_DB_DIR, 'default.db')}", profile="default")
+    try:
+        with engine.connect() as connection:
+            values = pragma_values(connection)
+        assert (values["journal_mode"], values["synchronous"]) == ("delete", 2)  # FULL
+    finally:
+        engine.dispose()
+
+
+def test_async_production_profile_reuses_connections(client):
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    from database import create_async_db_engine
+
+    engine = create_async_db_engine(
+        f"sqlite+aiosqlite:///{os.path.join(TEST_DB_DIR, 'async_profile.db')}", profile="production"
+    )
+
+    async def check():
+        try:
+            connections = []
+            for _ in range(3):
+                async with engine.connect() as connection:
+                    assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+                    connections.append(id(connection.sync_connection.connection.dbapi_connection))
+            return connections
+        finally:
+            await engine.dispose()
+
+    assert isinstance(engine.pool, AsyncAdaptedQueuePool)
+    assert len(set(client.portal.call(check))) == 1
+
+
+def test_unknown_profile():
+    from database import create_db_engine
+
+    with pytest.raises(ValueError):
+        create_db_engine("sqlite://", profile="fast")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+啟動時間預算：在新的行程中匯入 main 與處理第一個請求（同 tests/bench_startup.py），
+防止匯入時再次執行 DDL、連線資料庫或載入可延遲的元件而拖慢 worker 啟動與 --reload
+
+預算刻意寬鬆（約為實測值的數倍），只擋下明顯的退化；可用環境變數調整：
+  STARTUP_IMPORT_BUDGET_MS         專案模組（含 main）本身的匯入時間合計，不含 FastAPI / SQLAlchemy 等第三方套件
+  STARTUP_FIRST_REQUEST_BUDGET_MS  lifespan 啟動加上第一個需要認證的請求
+"""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import make_user, TEST_DB_DIR
+from bench_startup import BACKEND_DIR, backend_modules, measure_first_request, parse_importtime
+
+IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 1500))
+FIRST_REQUEST_BUDGET_MS = float(os.environ.get("STARTUP_FIRST_REQUEST_BUDGET_MS", 1500))
+
+# 第一次使用時才載入的元件
+LAZY_MODULES = ("passlib.context", "jose.jwt", "uvicorn")
+
+
+def test_import_main_is_lazy():
+    path = os.path.join(TEST_DB_DIR, "never_created.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    script = f"import json, sys, main; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+    # 匯入時不連線資料庫（SQLite 連線時才建立檔案）
+    assert not os.path.exists(path)
+
+
+def test_import_time_within_budget():
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+    modules = parse_importtime(result.stderr)
+    own = backend_modules()
+    own_ms = {name: self_us / 1000 for name, (self_us, _, _) in modules.items() if name in own}
+
+    assert sum(own_ms.values()) < IMPORT_BUDGET_MS, sorted(own_ms.items(), key=lambda item: -item[1])
+
+
+def test_first_request_within_budget(app_db):
+    from auth import create_user_token
+
+    user, _ = make_user(app_db, "alice")
+    timings = measure_first_request(dict(os.environ, BENCH_TOKEN=create_user_token(user)))
+
+    assert (timings["lifespan"] + timings["health"] + timings["first_request"]) * 1000 < FIRST_REQUEST_BUDGET_MS, timings
+
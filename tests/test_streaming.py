@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+測試串流回應：留言與黑名單的 stream=true 模式與一般模式內容一致，
+並以 server-side cursor 分批取出、分塊送出
+"""
+import json
+
+from conftest import make_user
+
+
+def flatten(nodes):
+    for node in nodes:
+        yield {**node, "replies": []}
+        yield from flatten(node["replies"])
+
+
+def test_streamed_comments_match_tree(client, app_db, override_settings):
+    override_settings(stream_yield_per=2, stream_chunk_bytes=100)
+    author, headers = make_user(app_db, "author")
+    viewer, viewer_headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    first = client.post(f"/api/posts/{post_id}/comments", json={"content": "a"}, headers=headers).json()["id"]
+    second = client.post(f"/api/posts/{post_id}/comments", json={"content": "b"}, headers=headers).json()["id"]
+    reply = client.post(f"/api/posts/{post_id}/comments", json={"content": "r", "parent_id": first},
+                        headers=viewer_headers).json()["id"]
+    client.post(f"/api/posts/{post_id}/comments", json={"content": "rr", "parent_id": reply}, headers=headers)
+    client.put(f"/api/posts/{post_id}/comments/{second}/top", headers=headers)
+    client.put(f"/api/likes/comment/{reply}", headers=viewer_headers)
+
+    tree = client.get(f"/api/posts/{post_id}/comments", headers=viewer_headers).json()
+    response = client.get(f"/api/posts/{post_id}/comments?stream=true", headers=viewer_headers)
+
+    assert response.headers["content-type"] == "application/json"
+    streamed = response.json()
+    assert sorted(streamed, key=lambda c: c["id"]) == sorted(flatten(tree), key=lambda c: c["id"])
+    assert streamed[0]["id"] == second  # 置頂留言優先
+    # 父留言一定先於其回覆
+    positions = {comment["id"]: i for i, comment in enumerate(streamed)}
+    assert all(positions[c["parent_id"]] < positions[c["id"]] for c in streamed if c["parent_id"])
+    assert next(c for c in streamed if c["id"] == reply)["is_liked"] is True
+
+
+def test_stream_rejects_pagination_and_checks_access(client, app_db):
+    author, headers = make_user(app_db, "author")
+    viewer, viewer_headers = make_user(app_db, "viewer")
+    post_id = client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+
+    assert client.get(f"/api/posts/{post_id}/comments?stream=true&limit=5", headers=headers).status_code == 400
+    assert client.get("/api/posts/9999/comments?stream=true", headers=headers).status_code == 404
+    client.post("/api/blacklist", json={"blocked_user_id": author.id}, headers=viewer_headers)
+    assert client.get(f"/api/posts/{post_id}/comments?stream=true", headers=viewer_headers).status_code == 403
+    assert client.get(f"/api/posts/{post_id}/comments?stream=true", headers=headers).json() == []
+
+
+def test_streamed_blacklist(client, app_db, override_settings):
+    override_settings(stream_yield_per=2)
+    me, headers = make_user(app_db, "me")
+    for name in ("a", "b", "c"):
+        other, _ = make_user(app_db, name)
+        client.post("/api/blacklist", json={"blocked_user_id": other.id}, headers=headers)
+
+    streamed = client.get("/api/blacklist?stream=true", headers=headers).json()
+    assert streamed == client.get("/api/blacklist", headers=headers).json()
+    assert [entry["blocked_user"]["username"] for entry in streamed] == ["a", "b", "c"]
+
+
+def test_json_array_chunks(override_settings):
+    import asyncio
+    from streaming import _json_array
+
+    async def items():
+        for i in range(5):
+            yield json.dumps({"i": i})
+
+    async def collect():
+        return [chunk async for chunk in _json_array(items())]
+
+    override_settings(stream_chunk_bytes=20)
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert json.loads("".join(chunks)) == [{"i": i} for i in range(5)]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+測試動態時報：發文推送、高發文量作者改為讀取時合併、置頂與刪除同步、
+封鎖/解除封鎖的增量修復、時報項目上限與修剪後從 posts 接續，以及與直接查詢 posts 的結果一致
+"""
+import warnings
+
+import pytest
+from sqlalchemy.exc import SAWarning
+
+from conftest import make_user
+
+
+@pytest.fixture(autouse=True)
+def timeline_mode(override_settings):
+    override_settings(feed_mode="timeline")
+
+
+def feed_ids(client, headers, limit=100):
+    return [post["id"] for post in client.get(f"/api/posts?limit={limit}", headers=headers).json()]
+
+
+def timeline_post_ids(db, user_id):
+    from models import TimelineEntry
+
+    db.expire_all()
+    return {entry.post_id for entry in db.query(TimelineEntry).filter(TimelineEntry.user_id == user_id)}
+
+
+def create_post(client, headers, content="hi"):
+    return client.post("/api/posts", json={"content": content}, headers=headers).json()["id"]
+
+
+def test_new_posts_fan_out_to_built_timelines(client, app_db):
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    old_id = create_post(client, author_headers)
+
+    # 首次讀取時建立時報並回填
+    assert feed_ids(client, headers) == [old_id]
+    with warnings.catch_warnings():
+        # 推送不應產生笛卡兒積查詢
+        warnings.simplefilter("error", SAWarning)
+        new_id = create_post(client, author_headers)
+
+    assert timeline_post_ids(app_db, viewer.id) == {old_id, new_id}
+    assert feed_ids(client, headers) == [new_id, old_id]
+
+
+def test_high_volume_author_is_merged_on_read(client, app_db, override_settings):
+    from models import Post
+
+    override_settings(timeline_fanout_max_daily_posts=2)
+    author, author_headers = make_user(app_db, "busy")
+    other, other_headers = make_user(app_db, "other")
+    viewer, headers = make_user(app_db, "viewer")
+    feed_ids(client, headers)
+
+    ids, busy_ids = [], []
+    for i in range(4):
+        busy_ids.append(create_post(client, author_headers, f"busy {i}"))
+        ids.append(busy_ids[-1])
+        if i < 2:
+            ids.append(create_post(client, other_headers, f"other {i}"))
+
+    # 第 3 篇起超過每日上限，不再推送
+    pulled = {post.id for post in app_db.query(Post).filter(Post.fanned_out == False)}  # noqa: E712
+    assert pulled == set(busy_ids[2:])
+    assert timeline_post_ids(app_db, viewer.id) == set(ids) - pulled
+    assert feed_ids(client, headers) == ids[::-1]
+
+    # 游標分頁走訪合併後的列表，不重複不遺漏
+    walked, cursor = [], ""
+    while cursor is not None:
+        response = client.get("/api/posts", params={"cursor": cursor, "limit": 3}, headers=headers)
+        walked += [post["id"] for post in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    assert walked == ids[::-1]
+
+
+def test_pin_and_delete_update_timelines(client, app_db):
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    feed_ids(client, headers)
+    first, second = create_post(client, author_headers), create_post(client, author_headers)
+
+    client.put(f"/api/posts/{first}/pin", headers=author_headers)
+    assert feed_ids(client, headers) == [first, second]
+
+    client.delete(f"/api/posts/{first}", headers=author_headers)
+    assert feed_ids(client, headers) == [second]
+    assert timeline_post_ids(app_db, viewer.id) == {second}
+
+
+def test_block_and_unblock_repair_timeline(client, app_db, override_settings):
+    override_settings(timeline_fanout_max_daily_posts=1)
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    feed_ids(client, headers)
+    fanned, pulled = create_post(client, author_headers), create_post(client, author_headers)
+
+    entry = client.post("/api/blacklist", json={"blocked_user_id": author.id}, headers=headers).json()
+    assert timeline_post_ids(app_db, viewer.id) == set()
+    assert feed_ids(client, headers) == []
+
+    client.delete(f"/api/blacklist/{entry['id']}", headers=headers)
+    assert timeline_post_ids(app_db, viewer.id) == {fanned}
+    assert feed_ids(client, headers) == [pulled, fanned]
+
+
+def test_timeline_matches_global_feed(client, app_db, override_settings):
+    override_settings(timeline_fanout_max_daily_posts=3)
+    users = [make_user(app_db, f"user{i}") for i in range(3)]
+    viewer, headers = make_user(app_db, "viewer")
+    client.post("/api/blacklist", json={"blocked_user_id": users[2][0].id}, headers=headers)
+    feed_ids(client, headers)
+    for i in range(5):
+        for _, author_headers in users:
+            create_post(client, author_headers, f"post {i}")
+    client.put("/api/posts/4/pin", headers=users[0][1])
+
+    timeline = client.get("/api/posts?limit=100", headers=headers).json()
+    override_settings(feed_mode="global")
+    assert client.get("/api/posts?limit=100", headers=headers).json() == timeline
+    assert len(timeline) == 10
+
+
+def walk_feed(client, headers, limit):
+    walked, cursor = [], ""
+    while cursor is not None:
+        response = client.get("/api/posts", params={"cursor": cursor, "limit": limit}, headers=headers)
+        walked += [post["id"] for post in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    return walked
+
+
+def test_timeline_is_bounded_and_continues_from_posts(client, app_db, override_settings):
+    override_settings(timeline_max_entries=3)
+    author, author_headers = make_user(app_db, "author")
+    viewer, headers = make_user(app_db, "viewer")
+    ids = [create_post(client, author_headers, f"post {i}") for i in range(5)]
+
+    # 只回填最新的 3 篇，更舊的從 posts 接續
+    assert feed_ids(client, headers) == ids[::-1]
+    assert timeline_post_ids(app_db, viewer.id) == set(ids[2:])
+
+    # 推送後修剪最舊的項目
+    ids.append(create_post(client, author_headers, "new"))
+    assert timeline_post_ids(app_db, viewer.id) == set(ids[3:])
+    assert walk_feed(client, headers, 2) == ids[::-1]
+    assert client.get("/api/posts?skip=2&limit=3", headers=headers).json()[0]["id"] == ids[3]
+
+    # 置頂已被修剪的貼文後重新推送；取消置頂後成為最舊項目的移除
+    client.put(f"/api/posts/{ids[0]}/pin", headers=author_headers)
+    assert timeline_post_ids(app_db, viewer.id) == {ids[0]} | set(ids[4:])
+    assert walk_feed(client, headers, 4) == [ids[0]] + ids[:0:-1]
+    client.put(f"/api/posts/{ids[0]}/unpin", headers=author_headers)
+    assert timeline_post_ids(app_db, viewer.id) == set(ids[4:])
+    assert walk_feed(client, headers, 4) == ids[::-1]
+
+
+def test_trim_only_touches_timelines_that_received_the_post(client, app_db, override_settings):
+    override_settings(timeline_max_entries=2)
+    author, author_headers = make_user(app_db, "author")
+    blocked, blocked_headers = make_user(app_db, "blocked")
+    viewer, headers = make_user(app_db, "viewer")
+    other, other_headers = make_user(app_db, "other")
+    client.post("/api/blacklist", json={"blocked_user_id": blocked.id}, headers=headers)
+    ids = [create_post(client, author_headers, f"post {i}") for i in range(2)]
+    feed_ids(client, headers)
+    feed_ids(client, other_headers)
+
+    new_id = create_post(client, blocked_headers)
+
+    # viewer 封鎖作者，沒有收到貼文，時報不受影響；other 的時報只修剪掉超出的一筆
+    assert timeline_post_ids(app_db, viewer.id) == set(ids)
+    assert timeline_post_ids(app_db, other.id) == {new_id, ids[1]}
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+測試寫入管線（WRITE_PIPELINE_ENABLED）：並發的建立貼文 / 留言 / 按讚合併為少數幾次 commit，
+每個請求得到自己的結果；批次中有寫入失敗時只影響該請求
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import make_user
+
+
+@pytest.fixture
+def pipeline_client(app_db, override_settings, monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+    from write_pipeline import write_pipeline
+
+    override_settings(write_pipeline_enabled=True)
+    # 拉長收集時間，讓並發請求落在同一批
+    monkeypatch.setattr(write_pipeline, "max_delay", 0.05)
+    with TestClient(app) as test_client:
+        assert write_pipeline.running
+        yield test_client
+    assert not write_pipeline.running
+
+
+def concurrently(client, requests):
+    """在應用程式的事件迴圈上同時送出 [(method, url, json, headers)]"""
+    from main import app
+
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*[
+                async_client.request(method, url, json=body, headers=headers)
+                for method, url, body, headers in requests
+            ])
+
+    return client.portal.call(send)
+
+
+def test_concurrent_writes_share_commits(pipeline_client, app_db):
+    from write_pipeline import write_pipeline
+
+    users = [make_user(app_db, f"user{i}") for i in range(10)]
+    post_id = pipeline_client.post("/api/posts", json={"content": "hi"}, headers=users[0][1]).json()["id"]
+    batches = write_pipeline.batches
+
+    responses = concurrently(pipeline_client, [
+        ("POST", "/api/likes", {"target_type": "post", "target_id": post_id}, headers) for _, headers in users
+    ] + [
+        ("POST", f"/api/posts/{post_id}/comments", {"content": f"c{i}"}, headers)
+        for i, (_, headers) in enumerate(users)
+    ])
+
+    assert [response.status_code for response in responses] == [201] * 20
+    like_ids = {response.json()["id"] for response in responses[:10]}
+    comments = [response.json() for response in responses[10:]]
+    assert len(like_ids) == 10
+    assert [comment["author"]["username"] for comment in comments] == [f"user{i}" for i in range(10)]
+    assert write_pipeline.batches - batches < 20
+
+    post = pipeline_client.get(f"/api/posts/{post_id}", headers=users[0][1]).json()
+    assert (post["likes_count"], post["comments_count"]) == (10, 10)
+
+
+def test_failed_write_only_affects_its_request(pipeline_client, app_db):
+    from models import Like
+    from write_pipeline import write_pipeline
+
+    author, headers = make_user(app_db, "author")
+    other, other_headers = make_user(app_db, "other")
+    post_id = pipeline_client.post("/api/posts", json={"content": "hi"}, headers=headers).json()["id"]
+    fallbacks = write_pipeline.fallbacks
+
+    like = {"target_type": "post", "target_id": post_id}
+    responses = concurrently(pipeline_client, [
+        ("POST", "/api/likes", like, headers),
+        ("POST", "/api/likes", like, headers),
+        ("POST", "/api/likes", like, other_headers),
+    ])
+
+    assert sorted(response.status_code for response in responses) == [201, 201, 400]
+    assert write_pipeline.fallbacks == fallbacks + 1
+    app_db.expire_all()
+    assert app_db.query(Like).count() == 2
+    assert pipeline_client.get(f"/api/posts/{post_id}", headers=headers).json()["likes_count"] == 2